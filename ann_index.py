@@ -0,0 +1,159 @@
+"""
+Approximate Nearest-Neighbour Index
+Inverted-file (IVF) index over an EmbeddingStore, built with NumPy only
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+logger = logging.getLogger(__name__)
+
+ANN_MODES = ("exact", "ivf")
+
+# Rows assigned to centroids at a time, bounding temporary memory
+ASSIGN_BLOCK_ROWS = 16384
+
+
+class IVFIndex:
+    """Inverted-file index with a spherical k-means coarse quantizer
+
+    Rows are bucketed under their nearest centroid. A query scores the
+    centroids, probes the ``nprobe`` closest buckets and scores only the rows
+    in them exactly against the store. ``nprobe`` trades recall for latency
+    at query time; ``nlist`` (the number of buckets) is fixed at build time.
+    """
+
+    METADATA_FILE = "ivf.json"
+    CENTROIDS_FILE = "centroids.npy"
+    ASSIGNMENTS_FILE = "assignments.npy"
+
+    def __init__(self, centroids: np.ndarray, assignments: np.ndarray, nprobe: int = 8):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assignments = np.asarray(assignments, dtype=np.int32)
+        self.nprobe = nprobe
+        self._list_offsets: Optional[np.ndarray] = None
+        self._list_rows: Optional[np.ndarray] = None
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls,
+              store: EmbeddingStore,
+              nlist: Optional[int] = None,
+              nprobe: int = 8,
+              iterations: int = 10,
+              sample_size: int = 20000,
+              seed: int = 0) -> "IVFIndex":
+        """Train centroids on a sample of the store and bucket every row"""
+        rng = np.random.default_rng(seed)
+        total_rows = len(store)
+        if nlist is None or nlist <= 0:
+            nlist = max(1, int(4 * np.sqrt(total_rows)))
+        nlist = min(nlist, total_rows) if total_rows else 1
+
+        sample_rows = np.sort(rng.choice(total_rows, size=min(sample_size, total_rows), replace=False))
+        sample = store.get_rows(sample_rows)
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+
+            # Re-seed empty buckets with random sample points
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.maximum(norms, 1e-12)
+
+        index = cls(centroids, np.zeros(0, dtype=np.int32), nprobe)
+        index.assignments = index._assign(store, np.arange(total_rows))
+        logger.info(f"Built IVF index: {total_rows} rows in {nlist} lists")
+        return index
+
+    def search(self, store: EmbeddingStore, query_embedding: np.ndarray, top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-n rows by cosine similarity, best first"""
+        query = np.atleast_2d(query_embedding).astype(np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        centroid_scores = (query @ self.centroids.T)[0]
+        nprobe = max(1, min(self.nprobe, self.nlist))  # ANN_NPROBE=0 still probes the nearest list
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        offsets, list_rows = self._lists()
+        candidates = np.concatenate([list_rows[offsets[c]:offsets[c + 1]] for c in probe])
+        if not len(candidates):
+            return candidates.astype(np.int64), np.zeros(0, dtype=np.float32)
+
+        # Sorted rows read the (possibly memory-mapped) store sequentially
+        candidates = np.sort(candidates)
+        candidate_scores = store.scores(query, rows=candidates)[0]
+
+        top_n = min(top_n, len(candidates))
+        best = np.argpartition(-candidate_scores, top_n - 1)[:top_n]
+        best = best[np.argsort(-candidate_scores[best])]
+        return candidates[best].astype(np.int64), candidate_scores[best]
+
+    def add(self, store: EmbeddingStore, rows: np.ndarray):
+        """Bucket rows that were appended to the store"""
+        self.assignments = np.concatenate([self.assignments, self._assign(store, rows)])
+        self._list_offsets = None
+
+    def take(self, rows) -> "IVFIndex":
+        """Index restricted to the given rows (same centroids)"""
+        return IVFIndex(self.centroids, self.assignments[rows], self.nprobe)
+
+    def save(self, directory: Path):
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / self.CENTROIDS_FILE, self.centroids)
+        np.save(directory / self.ASSIGNMENTS_FILE, self.assignments)
+        with open(directory / self.METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump({"nlist": self.nlist, "rows": len(self.assignments)}, f)
+
+    @classmethod
+    def load(cls, directory: Path, nprobe: int = 8) -> "IVFIndex":
+        directory = Path(directory)
+        return cls(
+            np.load(directory / cls.CENTROIDS_FILE),
+            np.load(directory / cls.ASSIGNMENTS_FILE, mmap_mode="c"),  # one entry per chunk; shared between workers
+            nprobe
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        _, list_rows = self._lists()
+        sizes = np.bincount(self.assignments, minlength=self.nlist) if len(self.assignments) else np.zeros(1)
+        return {
+            "type": "ivf",
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "rows": len(list_rows),
+            "max_list_size": int(sizes.max())
+        }
+
+    def _assign(self, store: EmbeddingStore, rows: np.ndarray) -> np.ndarray:
+        """Nearest centroid for each row, computed in blocks"""
+        assignments = np.empty(len(rows), dtype=np.int32)
+        for start in range(0, len(rows), ASSIGN_BLOCK_ROWS):
+            block = store.get_rows(rows[start:start + ASSIGN_BLOCK_ROWS])
+            assignments[start:start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        return assignments
+
+    def _lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """CSR view of the buckets: offsets into rows sorted by bucket"""
+        if self._list_offsets is None:
+            self._list_rows = np.argsort(self.assignments, kind="stable").astype(np.int64)
+            counts = np.bincount(self.assignments, minlength=self.nlist)
+            self._list_offsets = np.concatenate([[0], np.cumsum(counts)])
+        return self._list_offsets, self._list_rows
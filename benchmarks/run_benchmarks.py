@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Retrieval Benchmarks
+Ingest a synthetic guideline corpus, then time index builds and queries
+on the BM25-only, hybrid and verified search paths. Results are written
+as JSON so two runs (e.g. two commits) can be compared.
+
+    python benchmarks/run_benchmarks.py run --chunks 10000 --output base.json
+    python benchmarks/run_benchmarks.py compare base.json new.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from guideline_metadata import find_section_headings  # noqa: E402
+from simplified_medgraph_rag import SimplifiedHybridRetriever, SimplifiedMedGraphRAG  # noqa: E402
+from stub_embedding import HashingEmbeddingModel  # noqa: E402
+from synthetic_corpus import CorpusSpec, SyntheticCorpus, benchmark_queries  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FORMAT_VERSION = 1
+WARMUP_QUERIES = 5
+
+# Metrics where a larger value is better; every other timing or size is better smaller
+HIGHER_IS_BETTER = ("qps",)
+
+
+class SyntheticCorpusRAG(SimplifiedMedGraphRAG):
+    """The production ingest pipeline fed with generated pages instead of PDFs
+
+    Term and heading extraction run in this process (the PDF path runs
+    them in the worker pool); chunking, embedding and indexing are the
+    same code as a real ingest.
+    """
+
+    def __init__(self, corpus: SyntheticCorpus, **kwargs):
+        super().__init__(**kwargs)
+        self.corpus = corpus
+
+    async def _extract_pages(self, pdf_paths: List[Path]):
+        for number, (source_doc, page_num, text) in enumerate(self.corpus.pages()):
+            yield source_doc, page_num, text, self.medical_extractor.extract_medical_terms(text), find_section_headings(text)
+            if number % 64 == 0:
+                await asyncio.sleep(0)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def measure_latency(run_query: Callable[[str], Any], queries: List[str]) -> Dict[str, float]:
+    """Per-query latency percentiles (ms) and throughput after a few warm-up queries"""
+    for query in queries[:WARMUP_QUERIES]:
+        run_query(query)
+
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        query_started = time.perf_counter()
+        run_query(query)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+        "qps": round(len(queries) / elapsed, 2)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    spec = CorpusSpec(
+        chunks=args.chunks,
+        words_per_page=args.words_per_page,
+        pages_per_document=args.pages_per_document,
+        small_to_big=args.retrieval_mode == "small_to_big",
+        seed=args.seed
+    )
+    corpus = SyntheticCorpus(spec)
+    queries = benchmark_queries(args.queries)
+
+    stub = args.embeddings == "stub"
+    settings = {
+        "parent_chunk_size": spec.parent_chunk_size,
+        "child_chunk_size": spec.child_chunk_size,
+        "embedding_model_name": "hashing-stub-384" if stub else args.model,
+        "embedding_model": HashingEmbeddingModel() if stub else None,
+        "ingest_workers": args.ingest_workers,
+        "embedding_precision": args.precision,
+        "ann_mode": args.ann_mode,
+        "retrieval_mode": args.retrieval_mode,
+        "verification_mode": args.verification_mode,
+        # Every query is measured uncached
+        "result_cache_size": 0,
+        "query_cache_size": 0,
+        "query_batch_size": 1
+    }
+    results: Dict[str, Any] = {}
+
+    with tempfile.TemporaryDirectory(prefix="esc-benchmark-") as workdir:
+        workdir = Path(workdir)
+        if args.source == "pdf":
+            started = time.perf_counter()
+            pdf_directory = corpus.write_pdfs(workdir / "pdfs")
+            results["corpus_generation_seconds"] = round(time.perf_counter() - started, 3)
+            rag = SimplifiedMedGraphRAG(**settings)
+        else:
+            pdf_directory = workdir
+            rag = SyntheticCorpusRAG(corpus, **settings)
+
+        print(f"Ingesting {spec.pages} pages in {spec.documents} documents ({args.source}, about {spec.chunks} chunks)...")
+        started = time.perf_counter()
+        asyncio.run(rag.initialize_system(pdf_directory))
+        results["ingest_seconds"] = round(time.perf_counter() - started, 3)
+        results["chunks"] = len(rag.chunks)
+        results["peak_rss_mb_after_ingest"] = peak_rss_mb()
+        if not rag.retriever:
+            raise RuntimeError("Ingest produced no chunks")
+
+        # Index build alone: BM25, embedding matrix and ANN index from the ingested chunks
+        print("Building the index from the ingested chunks...")
+        started = time.perf_counter()
+        SimplifiedHybridRetriever(
+            rag.chunks,
+            model_name=rag.embedding_model_name,
+            embedding_precision=rag.embedding_precision,
+            embedding_model=rag.retriever.embedding_model,
+            **rag.ann_settings
+        )
+        results["index_build_seconds"] = round(time.perf_counter() - started, 3)
+
+        print(f"Timing {len(queries)} queries per path...")
+        retriever = rag.retriever
+        results["queries"] = {
+            "bm25": measure_latency(lambda query: retriever.bm25.top_k(query.lower().split(), args.top_k), queries),
+            "hybrid": measure_latency(lambda query: retriever.retrieve(query, args.top_k), queries),
+            "verified": measure_latency(lambda query: rag.search_sync(query, args.top_k, use_verification=True), queries)
+        }
+
+        # Changes in this digest between runs mean the ranking changed, not just its speed
+        rankings = [[result.chunk.id for result in retriever.retrieve(query, args.top_k)] for query in queries]
+        results["hybrid_ranking_digest"] = hashlib.sha256(json.dumps(rankings).encode("utf-8")).hexdigest()[:16]
+        results["peak_rss_mb"] = peak_rss_mb()
+
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "timestamp": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "chunks": args.chunks,
+            "source": args.source,
+            "embeddings": "stub" if stub else args.model,
+            "queries": len(queries),
+            "top_k": args.top_k,
+            "words_per_page": spec.words_per_page,
+            "pages_per_document": spec.pages_per_document,
+            "seed": spec.seed,
+            "ingest_workers": args.ingest_workers,
+            "embedding_precision": args.precision,
+            "ann_mode": args.ann_mode,
+            "retrieval_mode": args.retrieval_mode,
+            "verification_mode": args.verification_mode
+        },
+        "results": results
+    }
+
+
+def flatten(values: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare_results(baseline: Dict[str, Any], candidate: Dict[str, Any], threshold: float) -> List[str]:
+    """Print both runs side by side; return the metrics that regressed by more than threshold"""
+    if baseline.get("config") != candidate.get("config"):
+        print("Warning: the runs used different configurations; the comparison may not be meaningful")
+        for key, value in flatten(candidate.get("config", {})).items():
+            if flatten(baseline.get("config", {})).get(key) != value:
+                print(f"  config.{key}: {flatten(baseline['config']).get(key)} -> {value}")
+
+    base_metrics = flatten(baseline["results"])
+    new_metrics = flatten(candidate["results"])
+    print(f"\n{'metric':<36} {baseline.get('commit') or 'baseline':>14} {candidate.get('commit') or 'candidate':>14} {'change':>9}")
+
+    regressions = []
+    for name, base_value in base_metrics.items():
+        new_value = new_metrics.get(name)
+        if not isinstance(base_value, (int, float)) or not isinstance(new_value, (int, float)):
+            if base_value != new_value:
+                print(f"{name:<36} {str(base_value):>14} {str(new_value):>14} {'changed':>9}")
+            continue
+
+        change = (new_value - base_value) / base_value if base_value else 0.0
+        worse = -change if name.endswith(HIGHER_IS_BETTER) else change
+        flag = ""
+        if name != "chunks" and worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<36} {base_value:>14} {new_value:>14} {change:>+8.1%}{flag}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Retrieval benchmarks on a synthetic guideline corpus")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the benchmark and write JSON results")
+    run.add_argument("--chunks", type=int, default=10_000, help="Indexed chunks to aim for (1k to 1M)")
+    run.add_argument("--source", choices=("text", "pdf"), default="text",
+                     help="text feeds generated pages to the ingest pipeline; pdf writes real PDFs first")
+    run.add_argument("--embeddings", choices=("stub", "model"), default="stub",
+                     help="stub: offline hashing embeddings; model: load --model with sentence-transformers")
+    run.add_argument("--model", default="all-MiniLM-L6-v2")
+    run.add_argument("--queries", type=int, default=200)
+    run.add_argument("--top-k", type=int, default=10)
+    run.add_argument("--words-per-page", type=int, default=1200)
+    run.add_argument("--pages-per-document", type=int, default=200)
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--ingest-workers", type=int, default=None)
+    run.add_argument("--precision", choices=("float32", "float16", "int8"), default="float32")
+    run.add_argument("--ann-mode", choices=("exact", "ivf"), default="exact")
+    run.add_argument("--retrieval-mode", choices=("all", "small_to_big"), default="all")
+    run.add_argument("--verification-mode", choices=("lexical", "semantic"), default="lexical")
+    run.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    run.add_argument("--verbose", action="store_true", help="Show the system's own log output")
+
+    compare = commands.add_parser("compare", help="Compare two result files")
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("candidate", type=Path)
+    compare.add_argument("--threshold", type=float, default=0.10, help="Relative change counted as a regression")
+
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        with open(args.candidate, "r", encoding="utf-8") as f:
+            candidate = json.load(f)
+        regressions = compare_results(baseline, candidate, args.threshold)
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1 if regressions else 0
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    report = run_benchmark(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report["results"], indent=2))
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""
+Stub Embedding Model
+Deterministic feature-hashing embeddings for offline benchmarks; no model
+download, and texts sharing words still get similar vectors
+"""
+
+import re
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class HashingEmbeddingModel:
+    """Stands in for SentenceTransformer: ``encode(texts)`` returns unit vectors
+
+    Each lowercase word is hashed to a dimension and a sign; a text's
+    vector is the signed count of its words, normalized.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+        self._slots: Dict[str, Tuple[int, float]] = {}
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for word in WORD_PATTERN.findall(text.lower()):
+                column, sign = self._slot(word)
+                rows.append(row)
+                columns.append(column)
+                signs.append(sign)
+
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(embeddings, (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)), np.asarray(signs, dtype=np.float32))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def _slot(self, word: str) -> Tuple[int, float]:
+        slot = self._slots.get(word)
+        if slot is None:
+            digest = zlib.crc32(word.encode("utf-8"))
+            slot = (digest % self.dimensions, 1.0 if digest & 0x80000000 else -1.0)
+            self._slots[word] = slot
+        return slot
@@ -0,0 +1,207 @@
+"""
+Synthetic Guideline Corpus
+Seeded generator of guideline-like pages (numbered sections, graded
+recommendations, drug doses) at any scale, plus a fixed query set
+"""
+
+import logging
+import math
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from term_matcher import DEFAULT_VOCABULARY, TermMatcher  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+QUERY_SEED = 1234  # the query set never depends on the corpus size or seed
+
+FILLER_WORDS = (
+    "the of and in to with for patients is be a or are should that on by as was were this at "
+    "from not an treatment risk may have been therapy clinical trial trials evidence data study "
+    "studies recommended recommendation considered outcomes mortality hospitalization events "
+    "reduction increased decreased follow-up years months dose daily initial target monitoring "
+    "assessment diagnosis management symptoms severe moderate mild chronic acute elderly women "
+    "men age associated benefit harm randomized observational cohort analysis population high "
+    "low level class guideline guidelines task force committee section table figure update "
+    "compared placebo primary secondary prevention endpoint safety efficacy adverse bleeding "
+    "renal function impairment contraindicated indicated selected individual decision shared "
+    "care pathway referral specialist centre imaging invasive non-invasive first-line second-line"
+).split()
+
+SOCIETIES = ("ESC", "ESC", "ESC", "ACC_AHA", "ESH")
+CLASSES = ("I", "IIa", "IIb", "III")
+LEVELS = ("A", "B", "C")
+OUTCOMES = ("mortality", "hospitalization", "stroke", "bleeding", "recurrence", "symptoms", "cardiovascular death")
+SECTION_ASPECTS = ("Diagnosis", "Risk assessment", "Pharmacological treatment", "Interventional treatment", "Follow-up", "Special populations")
+
+
+@dataclass
+class CorpusSpec:
+    """Size and shape of a synthetic corpus; ``chunks`` is the indexed chunk count aimed for"""
+    chunks: int = 10_000
+    words_per_page: int = 1200
+    pages_per_document: int = 200
+    parent_chunk_size: int = 1200
+    child_chunk_size: int = 300
+    small_to_big: bool = False
+    seed: int = 0
+
+    @property
+    def chunks_per_page(self) -> int:
+        """Indexed chunks one page produces (parents and children, or children only)"""
+        parents = 0
+        children = 0
+        for start in range(0, self.words_per_page, self.parent_chunk_size):
+            parents += 1
+            children += math.ceil(min(self.parent_chunk_size, self.words_per_page - start) / self.child_chunk_size)
+        return children if self.small_to_big else parents + children
+
+    @property
+    def pages(self) -> int:
+        return max(1, math.ceil(self.chunks / self.chunks_per_page))
+
+    @property
+    def documents(self) -> int:
+        return max(1, math.ceil(self.pages / self.pages_per_document))
+
+
+class SyntheticCorpus:
+    """Deterministic guideline-like text built from the medical vocabulary
+
+    Pages mix graded recommendations ("... is recommended (Class I,
+    Level A)") with Zipf-distributed filler words, under numbered section
+    headings, so term extraction, section tracking, BM25 and verification
+    all see realistic input. The same spec always yields the same text.
+    """
+
+    def __init__(self, spec: CorpusSpec, vocabulary_path: Path = DEFAULT_VOCABULARY):
+        self.spec = spec
+        self.vocabulary = _vocabulary_by_category(vocabulary_path)
+        ranks = np.arange(1, len(FILLER_WORDS) + 1)
+        self._filler_weights = (1.0 / ranks) / (1.0 / ranks).sum()
+
+    def documents(self) -> List[Tuple[str, str]]:
+        """(file name, topic) of every document"""
+        rng = np.random.default_rng(self.spec.seed)
+        conditions = self.vocabulary["condition"]
+        documents = []
+        for number in range(self.spec.documents):
+            topic = conditions[int(rng.integers(len(conditions)))]
+            society = SOCIETIES[number % len(SOCIETIES)]
+            year = 2010 + number % 15
+            slug = "_".join(topic.split()).replace("/", "-")
+            documents.append((f"{year}_{society}_Guidelines_{slug}_{number}.pdf", topic))
+        return documents
+
+    def pages(self) -> Iterator[Tuple[str, int, str]]:
+        """Yield (source_doc, page_num, text) for the whole corpus in document order"""
+        rng = np.random.default_rng(self.spec.seed + 1)
+        remaining = self.spec.pages
+        for source_doc, topic in self.documents():
+            section = [0, 0]
+            for page_num in range(1, min(self.spec.pages_per_document, remaining) + 1):
+                yield source_doc, page_num, self._page_text(rng, topic, section, page_num)
+            remaining -= self.spec.pages_per_document
+            if remaining <= 0:
+                break
+
+    def write_pdfs(self, directory: Path) -> Path:
+        """Write the corpus as PDFs (one text page per PDF page) and return the directory"""
+        import fitz  # PyMuPDF
+
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        doc = None
+        current = None
+        for source_doc, page_num, text in self.pages():
+            if source_doc != current:
+                if doc is not None:
+                    doc.save(directory / current)
+                    doc.close()
+                doc = fitz.open()
+                current = source_doc
+            page = doc.new_page(width=595, height=842 * max(1, math.ceil(self.spec.words_per_page / 1200)))
+            page.insert_textbox(page.rect + (20, 20, -20, -20), text, fontsize=5)
+        if doc is not None:
+            doc.save(directory / current)
+            doc.close()
+        return directory
+
+    def _page_text(self, rng: np.random.Generator, topic: str, section: List[int], page_num: int) -> str:
+        """One page: an optional section heading, then sentences up to the page's word budget"""
+        lines = []
+        if page_num == 1:
+            lines.append(f"Guidelines for the management of {topic}")
+        if page_num == 1 or rng.random() < 0.3:
+            if section[1] >= 4 or page_num == 1:
+                section[0] += 1
+                section[1] = 0
+            section[1] += 1
+            aspect = SECTION_ASPECTS[(section[0] + section[1]) % len(SECTION_ASPECTS)]
+            if section[1] == 1:
+                lines.append(f"{section[0]} {topic.capitalize()}")
+            lines.append(f"{section[0]}.{section[1]} {aspect}")
+
+        # Filler sentences never use more words than the page budget plus one sentence
+        filler = rng.choice(len(FILLER_WORDS), size=self.spec.words_per_page + 25, p=self._filler_weights)
+        filler_position = 0
+        sentences = []
+        words = 0
+        budget = self.spec.words_per_page - sum(len(line.split()) for line in lines)
+        while words < budget:
+            kind = int(rng.integers(4))
+            if kind == 3:
+                length = int(rng.integers(8, 25))
+                picked = filler[filler_position:filler_position + length]
+                filler_position += length
+                sentence = " ".join(FILLER_WORDS[i] for i in picked).capitalize() + "."
+            else:
+                sentence = self._recommendation(rng, kind, topic)
+            sentences.append(sentence)
+            words += sentence.count(" ") + 1
+
+        # Pages break mid-sentence, so every page has exactly words_per_page words
+        lines.append(" ".join(" ".join(sentences).split()[:budget]))
+        return "\n".join(lines)
+
+    def _recommendation(self, rng: np.random.Generator, kind: int, topic: str) -> str:
+        pick = lambda category: self.vocabulary[category][int(rng.integers(len(self.vocabulary[category])))]  # noqa: E731
+        grade = f"(Class {CLASSES[int(rng.integers(len(CLASSES)))]}, Level {LEVELS[int(rng.integers(len(LEVELS)))]})"
+        outcome = OUTCOMES[int(rng.integers(len(OUTCOMES)))]
+        if kind == 0:
+            dose = int(rng.choice([1, 2, 5, 10, 20, 25, 40, 50, 100]))
+            return f"In patients with {topic}, {pick('medication')} {dose} mg daily is recommended to reduce {outcome} {grade}."
+        if kind == 1:
+            return f"{pick('procedure').capitalize()} should be considered in {pick('condition')} when {pick('measurement')} is abnormal {grade}."
+        return f"{pick('drug_class').capitalize()} are not recommended in patients with {topic} and {pick('condition')} {grade}."
+
+
+def benchmark_queries(count: int = 200, vocabulary_path: Path = DEFAULT_VOCABULARY) -> List[str]:
+    """A fixed set of clinical questions (the same for every corpus size)"""
+    vocabulary = _vocabulary_by_category(vocabulary_path)
+    rng = np.random.default_rng(QUERY_SEED)
+    pick = lambda category: vocabulary[category][int(rng.integers(len(vocabulary[category])))]  # noqa: E731
+    templates = (
+        lambda: f"{pick('medication')} dose in {pick('condition')}",
+        lambda: f"treatment of {pick('condition')}",
+        lambda: f"when is {pick('procedure')} recommended",
+        lambda: f"{pick('drug_class')} contraindications {pick('condition')}",
+        lambda: f"{pick('measurement')} target in {pick('condition')}",
+        lambda: f"class I recommendations for {pick('condition')} with {pick('condition')}",
+    )
+    return [templates[int(rng.integers(len(templates)))]() for _ in range(count)]
+
+
+def _vocabulary_by_category(vocabulary_path: Path) -> Dict[str, List[str]]:
+    """Lowercase multi-letter vocabulary terms grouped by category"""
+    by_category: Dict[str, List[str]] = {}
+    for term in TermMatcher.load(vocabulary_path).terms:
+        if not term.case_sensitive:
+            by_category.setdefault(term.category, []).append(term.surface)
+    return by_category
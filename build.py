@@ -6,7 +6,9 @@ Enhanced ESC Guidelines Search System
 
 import os
 import sys
+import asyncio
 import subprocess
+from pathlib import Path
 
 def run_command(command, description):
     """Run a command and handle errors"""
@@ -25,6 +27,25 @@ def run_command(command, description):
             print(f"stderr: {e.stderr}")
         return False
 
+def build_index_snapshot(guidelines_dir):
+    """Pre-build the search index so the server can load it at startup"""
+    if not any(name.lower().endswith(".pdf") for name in os.listdir(guidelines_dir)):
+        print("ℹ️  No guideline PDFs found - skipping index snapshot")
+        return True
+    
+    print("📚 Building search index snapshot...")
+    try:
+        from simplified_medgraph_rag import SimplifiedMedGraphRAG
+        
+        medgraph = SimplifiedMedGraphRAG.from_environment()
+        asyncio.run(medgraph.initialize_system(Path(guidelines_dir)))
+        print(f"✅ Index snapshot ready in {medgraph.snapshot.snapshot_dir} ({len(medgraph.chunks)} chunks)")
+        return True
+    except Exception as e:
+        # Not fatal: the server builds the index itself on first start
+        print(f"⚠️  Could not build index snapshot: {e}")
+        return False
+
 def main():
     """Main build process"""
     print("🚀 Starting Enhanced ESC Guidelines Search System build process...")
@@ -52,6 +73,9 @@ Supported formats: PDF
 Recommended: ESC cardiovascular guidelines
 """)
     
+    # Pre-build the search index
+    build_index_snapshot(guidelines_dir)
+    
     # Verify Python version
     python_version = sys.version_info
     print(f"🐍 Python version: {python_version.major}.{python_version.minor}.{python_version.micro}")
@@ -0,0 +1,409 @@
+"""
+Chunk Table
+Columnar storage of chunk metadata; MedicalChunk objects are small views
+onto one row of the table
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from text_arena import TextArena, TextStore
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TYPES = ("parent", "child")
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Per-row columns and their dtypes (chunk ids are a list parallel to the rows)
+COLUMNS = {
+    "doc": np.int32,          # index into docs / arenas
+    "page": np.int32,
+    "section": np.int32,      # index into sections (interned hierarchies)
+    "chunk_type": np.int8,    # index into CHUNK_TYPES
+    "parent": np.int32,       # row of the parent chunk, -1 for none
+    "start": np.int64,        # byte span in the document's text arena
+    "end": np.int64,
+    "terms_start": np.int64,  # range of term_ids holding the chunk's medical terms
+    "terms_end": np.int64,
+    "tokens_start": np.int64, # range of token_ids holding the chunk's distinct words
+    "tokens_end": np.int64,
+}
+
+
+def word_tokens(text: str) -> List[str]:
+    """Lowercase words of a text, split on word boundaries"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+class StringTable:
+    """Interned strings addressed by integer id"""
+
+    def __init__(self, strings: Optional[List[str]] = None):
+        self.strings: List[str] = list(strings or [])
+        self._ids: Dict[str, int] = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, value: str) -> int:
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(value)
+            self._ids[value] = string_id
+        return string_id
+
+    def lookup(self, value: str) -> int:
+        """Id of a string, or -1 if it was never interned"""
+        return self._ids.get(value, -1)
+
+    def __getitem__(self, string_id: int) -> str:
+        return self.strings[string_id]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class IdBuffer:
+    """Growable flat int32 array; rows reference (start, end) ranges of it"""
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        self._values = np.zeros(0, dtype=np.int32) if values is None else values.astype(np.int32, copy=False)
+        self.count = len(self._values)
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.count]
+
+    def extend(self, ids: Sequence[int]) -> Tuple[int, int]:
+        start = self.count
+        end = start + len(ids)
+        if end > len(self._values):
+            grown = np.zeros(max(2 * len(self._values), end, 1024), dtype=np.int32)
+            grown[:start] = self._values[:start]
+            self._values = grown
+        self._values[start:end] = ids
+        self.count = end
+        return start, end
+
+
+class MedicalChunk:
+    """Simplified medical chunk: a read-only view of one ChunkTable row
+
+    The view is two slots; every field is read from the table's columns
+    and the text is decoded from the document's arena on access.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table: "ChunkTable", row: int):
+        self.table = table
+        self.row = row
+
+    def __repr__(self) -> str:
+        return f"MedicalChunk({self.id!r})"
+
+    @property
+    def id(self) -> str:
+        return self.table.ids[self.row]
+
+    @property
+    def source_doc(self) -> str:
+        return self.table.docs[self.table.columns["doc"][self.row]]
+
+    @property
+    def document_metadata(self) -> Dict[str, Any]:
+        """Society, year and topic of the chunk's guideline"""
+        return self.table.doc_metadata[self.table.columns["doc"][self.row]]
+
+    @property
+    def page_number(self) -> int:
+        return int(self.table.columns["page"][self.row])
+
+    @property
+    def section_hierarchy(self) -> List[str]:
+        return list(self.table.sections[self.table.columns["section"][self.row]])
+
+    @property
+    def chunk_type(self) -> str:
+        return CHUNK_TYPES[self.table.columns["chunk_type"][self.row]]
+
+    @property
+    def parent_chunk_id(self) -> Optional[str]:
+        parent = self.table.columns["parent"][self.row]
+        return self.table.ids[parent] if parent >= 0 else None
+
+    @property
+    def medical_terms(self) -> List[str]:
+        columns = self.table.columns
+        term_ids = self.table.term_ids.values[columns["terms_start"][self.row]:columns["terms_end"][self.row]]
+        return [self.table.terms[term_id] for term_id in term_ids]
+
+    @property
+    def token_ids(self) -> np.ndarray:
+        """Sorted ids (in the table's ``tokens``) of the distinct words of the text"""
+        columns = self.table.columns
+        return self.table.token_ids.values[columns["tokens_start"][self.row]:columns["tokens_end"][self.row]]
+
+    @property
+    def arena(self) -> TextArena:
+        return self.table.arenas[self.table.columns["doc"][self.row]]
+
+    @property
+    def start(self) -> int:
+        return int(self.table.columns["start"][self.row])
+
+    @property
+    def end(self) -> int:
+        return int(self.table.columns["end"][self.row])
+
+    @property
+    def text(self) -> str:
+        return self.arena.text(self.start, self.end)
+
+    @property
+    def text_lower(self) -> str:
+        return self.arena.lower_text(self.start, self.end)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "source_doc": self.source_doc,
+            "page_number": self.page_number,
+            "section_hierarchy": self.section_hierarchy,
+            "chunk_type": self.chunk_type,
+            "parent_chunk_id": self.parent_chunk_id,
+            "medical_terms": self.medical_terms,
+            "start": self.start,
+            "end": self.end
+        }
+
+
+class ChunkTable:
+    """Append-only columnar chunk metadata
+
+    Page numbers, chunk types, parent links and text spans are NumPy
+    columns; document names (with each document's metadata), section
+    hierarchies and medical terms are
+    interned once and referenced by integer ids. Chunks of a page share
+    one range of ``term_ids`` instead of each holding the page's term
+    list. The distinct words of each chunk are stored the same way
+    (``token_ids``, built once when the row is added) for verification.
+    Rows are never moved, so views stay valid while the table
+    grows; rows of removed documents are dropped by ``take()`` when the
+    snapshot is written. A loaded table memory-maps its columns
+    copy-on-write, so processes serving the same snapshot share them.
+    """
+
+    ID_ARRAYS = ("term_ids", "token_ids")
+    STRINGS_FILE = "strings.json"
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = {name: np.zeros(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.term_ids = IdBuffer()
+        self.token_ids = IdBuffer()
+
+        self.ids: List[str] = []
+        self.docs: List[str] = []
+        self.doc_metadata: List[Dict[str, Any]] = []  # per doc: society, year, topic
+        self.arenas: List[TextArena] = []
+        self.sections: List[Tuple[str, ...]] = []
+        self.terms = StringTable()
+        self.tokens = StringTable()
+
+        self._doc_ids: Dict[str, int] = {}
+        self._section_ids: Dict[Tuple[str, ...], int] = {}
+        self._last_terms: Optional[Tuple[List[str], int, int]] = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def document(self, source_doc: str, arena: TextArena, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Doc id for a document's arena; a replaced document gets a new id
+
+        ``metadata`` is recorded when the id is issued.
+        """
+        doc = self._doc_ids.get(source_doc)
+        if doc is None or self.arenas[doc] is not arena:
+            doc = len(self.docs)
+            self.docs.append(source_doc)
+            self.doc_metadata.append(dict(metadata or {}))
+            self.arenas.append(arena)
+            self._doc_ids[source_doc] = doc
+        return doc
+
+    def append(self,
+               chunk_id: str,
+               doc: int,
+               page_number: int,
+               section_hierarchy: Sequence[str],
+               chunk_type: str,
+               start: int,
+               end: int,
+               medical_terms: Optional[List[str]] = None) -> MedicalChunk:
+        """Add a row and return its view"""
+        terms_start, terms_end = self._intern_terms(medical_terms or [])
+        tokens_start, tokens_end = self._intern_tokens(doc, start, end)
+        return self._append_row(chunk_id, {
+            "doc": doc,
+            "page": page_number,
+            "section": self._intern_section(tuple(section_hierarchy)),
+            "chunk_type": CHUNK_TYPES.index(chunk_type),
+            "parent": -1,
+            "start": start,
+            "end": end,
+            "terms_start": terms_start,
+            "terms_end": terms_end,
+            "tokens_start": tokens_start,
+            "tokens_end": tokens_end
+        })
+
+    def append_child(self, parent: MedicalChunk, chunk_id: str, start: int, end: int) -> MedicalChunk:
+        """Add a child row sharing the parent's document, page, section and terms"""
+        values = {name: self.columns[name][parent.row] for name in COLUMNS}
+        values["tokens_start"], values["tokens_end"] = self._intern_tokens(values["doc"], start, end)
+        values.update({
+            "chunk_type": CHUNK_TYPES.index("child"),
+            "parent": parent.row,
+            "start": start,
+            "end": end
+        })
+        return self._append_row(chunk_id, values)
+
+    def view(self, row: int) -> MedicalChunk:
+        return MedicalChunk(self, row)
+
+    def take(self, rows: Sequence[int]) -> "ChunkTable":
+        """New compact table with the given rows, in that order
+
+        Parent links are remapped; a parent that is not taken becomes -1.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        table = ChunkTable(capacity=max(len(rows), 1))
+        table.size = len(rows)
+        for name in COLUMNS:
+            table.columns[name][:len(rows)] = self.columns[name][rows]
+
+        new_rows = np.full(self.size, -1, dtype=np.int32)
+        new_rows[rows] = np.arange(len(rows), dtype=np.int32)
+        parents = table.columns["parent"][:len(rows)]
+        parents[parents >= 0] = new_rows[parents[parents >= 0]]
+
+        table.ids = [self.ids[row] for row in rows]
+
+        # Keep only the documents that still have rows (drops replaced and removed ones)
+        used_docs, doc_ids = np.unique(table.columns["doc"][:len(rows)], return_inverse=True)
+        table.columns["doc"][:len(rows)] = doc_ids
+        table.docs = [self.docs[doc] for doc in used_docs]
+        table.doc_metadata = [self.doc_metadata[doc] for doc in used_docs]
+        table.arenas = [self.arenas[doc] for doc in used_docs]
+        table._doc_ids = {doc: i for i, doc in enumerate(table.docs)}
+        table.sections = list(self.sections)
+        table._section_ids = dict(self._section_ids)
+        table.terms = StringTable(self.terms.strings)
+        table.term_ids = IdBuffer(self.term_ids.values)
+        table.tokens = StringTable(self.tokens.strings)
+        table.token_ids = IdBuffer(self.token_ids.values)
+        return table
+
+    @property
+    def nbytes(self) -> int:
+        columns = sum(column[:self.size].nbytes for column in self.columns.values())
+        return columns + self.term_ids.values.nbytes + self.token_ids.values.nbytes
+
+    def save(self, directory: Path):
+        """Write the columns and string tables (arenas are saved by the TextStore)"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        # One .npy per array so a loaded table can memory-map them
+        for name, column in self.columns.items():
+            np.save(directory / f"{name}.npy", column[:self.size])
+        for name in self.ID_ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name).values)
+        with open(directory / self.STRINGS_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": self.ids,
+                "docs": self.docs,
+                "doc_metadata": self.doc_metadata,
+                "sections": self.sections,
+                "terms": self.terms.strings,
+                "tokens": self.tokens.strings
+            }, f)
+
+    @classmethod
+    def load(cls, directory: Path, text_store: TextStore) -> "ChunkTable":
+        """Load a table written by save(), attaching each document's arena"""
+        directory = Path(directory)
+        with open(directory / cls.STRINGS_FILE, "r", encoding="utf-8") as f:
+            strings = json.load(f)
+
+        # Copy-on-write maps: pages are shared until written, and appends grow into new arrays
+        table = cls(capacity=0)
+        table.size = len(strings["ids"])
+        for name in COLUMNS:
+            table.columns[name] = _load_array(directory / f"{name}.npy")
+        for name in cls.ID_ARRAYS:
+            setattr(table, name, IdBuffer(_load_array(directory / f"{name}.npy")))
+
+        table.ids = strings["ids"]
+        table.docs = strings["docs"]
+        table.doc_metadata = strings["doc_metadata"]
+        table.arenas = [text_store.arenas[doc] for doc in table.docs]
+        table._doc_ids = {doc: i for i, doc in enumerate(table.docs)}
+        table.sections = [tuple(section) for section in strings["sections"]]
+        table._section_ids = {section: i for i, section in enumerate(table.sections)}
+        table.terms = StringTable(strings["terms"])
+        table.tokens = StringTable(strings["tokens"])
+        return table
+
+    def _append_row(self, chunk_id: str, values: Dict[str, int]) -> MedicalChunk:
+        if self.size == len(self.columns["doc"]):
+            self._grow()
+
+        row = self.size
+        for name, value in values.items():
+            self.columns[name][row] = value
+        self.ids.append(chunk_id)
+
+        self.size += 1
+        return MedicalChunk(self, row)
+
+    def _grow(self):
+        capacity = max(2 * len(self.columns["doc"]), 1024)
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+
+    def _intern_section(self, section: Tuple[str, ...]) -> int:
+        section_id = self._section_ids.get(section)
+        if section_id is None:
+            section_id = len(self.sections)
+            self.sections.append(section)
+            self._section_ids[section] = section_id
+        return section_id
+
+    def _intern_terms(self, medical_terms: List[str]) -> Tuple[int, int]:
+        """Range of term_ids for a term list; consecutive chunks passing the same list share it"""
+        if self._last_terms is not None and self._last_terms[0] is medical_terms:
+            return self._last_terms[1], self._last_terms[2]
+
+        start, end = self.term_ids.extend([self.terms.intern(term) for term in medical_terms])
+        self._last_terms = (medical_terms, start, end)
+        return start, end
+
+    def _intern_tokens(self, doc: int, start: int, end: int) -> Tuple[int, int]:
+        """Range of token_ids holding the distinct words of a text span"""
+        words = set(word_tokens(self.arenas[doc].lower_text(start, end)))
+        return self.token_ids.extend(sorted(self.tokens.intern(word) for word in words))
+
+
+def _load_array(path: Path) -> np.ndarray:
+    """Copy-on-write memory map of a .npy file (mmap cannot map an empty array)"""
+    array = np.load(path, mmap_mode="c")
+    return np.array(array) if array.size == 0 else array
@@ -0,0 +1,132 @@
+"""
+Query Embedding Micro-Batcher
+Coalesces query encodings from concurrent requests into one model call
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    """Micro-batching scheduler in front of an embedding model
+
+    Worker threads call ``encode()`` and block until their rows are ready.
+    A dispatcher thread takes the first waiting request, then keeps
+    collecting requests until ``max_batch_size`` texts are gathered or
+    ``max_wait_ms`` has passed, and encodes all of them in one call. Under
+    load, requests that arrive while the model is busy are also picked up
+    by the next batch, so batching grows with concurrency while a lone
+    query waits at most ``max_wait_ms``.
+    """
+
+    def __init__(self, encoder: Callable[[List[str]], Any], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._requests: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        self._lock = threading.Lock()  # orders enqueues against close()
+        self._closed = False
+
+        self.batches = 0
+        self.texts_encoded = 0
+        self.requests = 0
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts, sharing a model call with concurrent callers"""
+        future: Optional[Future] = None
+        if len(texts) < self.max_batch_size:
+            # Enqueued under the lock, so every request lands before close()'s sentinel
+            with self._lock:
+                if not self._closed:
+                    self._ensure_started()
+                    future = Future()
+                    self._requests.put((texts, future))
+
+        if future is None:
+            # Already a full batch (nothing to gain from waiting), or closed
+            return np.asarray(self.encoder(texts), dtype=np.float32)
+        return future.result()
+
+    def close(self):
+        """Stop the dispatcher once the queued requests are served; later calls encode directly"""
+        with self._lock:
+            self._closed = True
+            if self._dispatcher is not None:
+                self._requests.put(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": round(self.texts_encoded / self.batches, 2) if self.batches else 0.0
+        }
+
+    def _ensure_started(self):
+        """Start the dispatcher thread; called with the lock held"""
+        if self._dispatcher is None:
+            self._dispatcher = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+            self._dispatcher.start()
+
+    def _run(self):
+        """Dispatcher loop: gather a batch, encode it, hand each caller its rows"""
+        stopping = False
+        while not stopping:
+            first = self._requests.get()
+            if first is None:
+                break
+
+            batch = [first]
+            size = len(first[0])
+            deadline = time.monotonic() + self.max_wait_ms / 1000.0
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                try:
+                    request = self._requests.get(timeout=timeout) if timeout > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+                size += len(request[0])
+
+            self._encode_batch(batch)
+
+        # Serve requests that were queued while closing
+        while True:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                return
+            if request is not None:
+                self._encode_batch([request])
+
+    def _encode_batch(self, batch: List[Tuple[List[str], Future]]):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        try:
+            embeddings = np.asarray(self.encoder(texts), dtype=np.float32)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.requests += len(batch)
+        self.texts_encoded += len(texts)
+
+        start = 0
+        for request_texts, future in batch:
+            future.set_result(embeddings[start:start + len(request_texts)])
+            start += len(request_texts)
@@ -0,0 +1,180 @@
+"""
+Content-Addressed Embedding Cache
+Persistent chunk embeddings keyed by (model name, hash of chunk text)
+"""
+
+import hashlib
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """Persistent embedding cache with least-recently-used eviction
+
+    Entries live in one compact ``.npz`` file per model: a ``(N, 16)`` uint8
+    array of BLAKE2b keys, the ``(N, dim)`` float32 vectors and a last-used
+    tick per entry. When the cache exceeds ``max_bytes`` the least recently
+    used entries are dropped.
+    """
+
+    def __init__(self, cache_dir: Path, model_name: str, max_bytes: int = 512 * 1024 * 1024):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        self.path = Path(cache_dir) / f"{slug}.npz"
+
+        self._keys = np.zeros((0, KEY_BYTES), dtype=np.uint8)
+        self._vectors: Optional[np.ndarray] = None
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._index: Dict[bytes, int] = {}
+        self._clock = 0
+        self._dirty = False
+
+        self.hits = 0
+        self.misses = 0
+
+        self._load()
+
+    def key(self, text: str) -> bytes:
+        """Cache key for a chunk text under this cache's model"""
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode("utf-8"), digest_size=KEY_BYTES).digest()
+
+    def encode(self, texts: List[str], encoder: Callable[[List[str]], Any]) -> np.ndarray:
+        """Return embeddings for texts, calling encoder only for unseen text"""
+        self._clock += 1
+        keys = [self.key(text) for text in texts]
+
+        # Collect distinct misses so duplicate texts are encoded once
+        missing: Dict[bytes, str] = {}
+        miss_count = 0
+        for key, text in zip(keys, texts):
+            if key not in self._index:
+                miss_count += 1
+                missing.setdefault(key, text)
+
+        self.misses += miss_count
+        self.hits += len(keys) - miss_count
+
+        if missing:
+            new_vectors = np.asarray(encoder(list(missing.values())), dtype=np.float32)
+            self._insert(list(missing.keys()), new_vectors)
+
+        rows = np.fromiter((self._index[key] for key in keys), dtype=np.int64, count=len(keys))
+        self._last_used[rows] = self._clock
+        result = self._vectors[rows] if len(rows) else np.zeros((0, self.dimension), dtype=np.float32)
+
+        self._evict()
+        return result
+
+    def save(self):
+        """Write the cache to disk if it changed"""
+        if not self._dirty or self._vectors is None:
+            return
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.stem}.tmp-{os.getpid()}.npz")
+        try:
+            np.savez(
+                tmp_path,
+                model_name=np.array(self.model_name),
+                keys=self._keys,
+                vectors=self._vectors,
+                last_used=self._last_used
+            )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except Exception as e:
+            logger.warning(f"Could not write embedding cache {self.path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+
+    @property
+    def dimension(self) -> int:
+        return self._vectors.shape[1] if self._vectors is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate size of the cache contents"""
+        vector_bytes = self._vectors.nbytes if self._vectors is not None else 0
+        return self._keys.nbytes + vector_bytes + self._last_used.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, size and hit/miss counters"""
+        return {
+            "entries": len(self._index),
+            "size_bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+    def _load(self):
+        """Load the cache file if present and compatible"""
+        if not self.path.exists():
+            return
+
+        try:
+            with np.load(self.path) as data:
+                if str(data["model_name"]) != self.model_name:
+                    logger.warning(f"Embedding cache {self.path} belongs to another model, ignoring it")
+                    return
+                self._keys = data["keys"]
+                self._vectors = data["vectors"]
+                self._last_used = data["last_used"]
+        except Exception as e:
+            logger.warning(f"Could not read embedding cache {self.path}: {e}")
+            return
+
+        self._clock = int(self._last_used.max()) if len(self._last_used) else 0
+        self._index = {bytes(key): row for row, key in enumerate(self._keys)}
+        logger.info(f"Loaded embedding cache with {len(self._index)} entries from {self.path}")
+
+    def _insert(self, keys: List[bytes], vectors: np.ndarray):
+        """Append new entries"""
+        if self._vectors is not None and vectors.shape[1] != self._vectors.shape[1]:
+            # Model output changed shape; the cached vectors are unusable
+            logger.warning("Embedding dimension changed, clearing embedding cache")
+            self._keys = np.zeros((0, KEY_BYTES), dtype=np.uint8)
+            self._vectors = None
+            self._last_used = np.zeros(0, dtype=np.int64)
+            self._index = {}
+
+        start = len(self._index)
+        new_keys = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), KEY_BYTES)
+
+        self._keys = np.concatenate([self._keys, new_keys])
+        self._vectors = vectors if self._vectors is None else np.concatenate([self._vectors, vectors])
+        self._last_used = np.concatenate([self._last_used, np.full(len(keys), self._clock, dtype=np.int64)])
+        for offset, key in enumerate(keys):
+            self._index[key] = start + offset
+
+        self._dirty = True
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        if self.nbytes <= self.max_bytes or not len(self._index):
+            return
+
+        entry_bytes = self.nbytes / len(self._index)
+        keep_count = max(int(self.max_bytes // entry_bytes), 0)
+
+        # Most recently used first; stable so ties keep insertion order
+        order = np.argsort(-self._last_used, kind="stable")
+        keep = np.sort(order[:keep_count])
+
+        evicted = len(self._index) - len(keep)
+        self._keys = self._keys[keep]
+        self._vectors = self._vectors[keep]
+        self._last_used = self._last_used[keep]
+        self._index = {bytes(key): row for row, key in enumerate(self._keys)}
+        self._dirty = True
+
+        logger.info(f"Evicted {evicted} embedding cache entries")
@@ -0,0 +1,262 @@
+"""
+Embedding Store
+Row-normalized embedding matrix, memory-mapped from disk, with optional
+float16 or int8 storage
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Rows converted to float32 at a time when scoring reduced-precision storage
+SCORE_BLOCK_ROWS = 16384
+
+
+def _normalize_rows(embeddings: np.ndarray) -> np.ndarray:
+    """L2-normalize rows so a dot product equals cosine similarity"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class EmbeddingStore:
+    """Embedding matrix scored by cosine similarity
+
+    Rows are L2-normalized on the way in. ``float16`` halves and ``int8``
+    quarters the footprint of ``float32``; int8 rows carry a per-row scale
+    (symmetric quantization) that is applied after the dot product. A store
+    loaded from disk is memory-mapped read-only, so processes that open the
+    same files share one copy in the page cache.
+    """
+
+    METADATA_FILE = "store.json"
+    VECTORS_FILE = "vectors.bin"
+    SCALES_FILE = "scales.bin"
+
+    def __init__(self, vectors: np.ndarray, precision: str = "float32", scales: Optional[np.ndarray] = None):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported embedding precision: {precision}")
+        self.vectors = vectors
+        self.precision = precision
+        self.scales = scales
+
+    @classmethod
+    def from_array(cls, embeddings: np.ndarray, precision: str = "float32") -> "EmbeddingStore":
+        """Normalize and encode a float matrix at the requested precision"""
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported embedding precision: {precision}")
+
+        normalized = _normalize_rows(embeddings)
+
+        if precision == "int8":
+            scales = np.abs(normalized).max(axis=1) / 127.0
+            scales = np.maximum(scales, 1e-12).astype(np.float32)
+            quantized = np.round(normalized / scales[:, None]).astype(np.int8)
+            return cls(quantized, precision, scales)
+
+        return cls(normalized.astype(precision), precision)
+
+    @classmethod
+    def load(cls, directory: Path) -> "EmbeddingStore":
+        """Memory-map a store written by save()"""
+        directory = Path(directory)
+        with open(directory / cls.METADATA_FILE, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+
+        shape = (metadata["count"], metadata["dimension"])
+        precision = metadata["precision"]
+
+        vectors = cls._map(directory / cls.VECTORS_FILE, precision, shape)
+        scales = None
+        if precision == "int8":
+            scales = cls._map(directory / cls.SCALES_FILE, "float32", (shape[0],))
+
+        return cls(vectors, precision, scales)
+
+    @staticmethod
+    def _map(path: Path, dtype: str, shape) -> np.ndarray:
+        """Read-only memory map (mmap cannot map an empty file)"""
+        if not shape[0]:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def save(self, directory: Path):
+        """Write raw little-endian rows plus a small metadata file"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.ascontiguousarray(self.vectors).tofile(directory / self.VECTORS_FILE)
+        if self.scales is not None:
+            np.ascontiguousarray(self.scales).tofile(directory / self.SCALES_FILE)
+
+        with open(directory / self.METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "precision": self.precision,
+                "count": len(self),
+                "dimension": self.dimension
+            }, f)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dimension(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def nbytes(self) -> int:
+        scale_bytes = self.scales.nbytes if self.scales is not None else 0
+        return self.vectors.nbytes + scale_bytes
+
+    @property
+    def is_memory_mapped(self) -> bool:
+        return isinstance(self.vectors, np.memmap)
+
+    def scores(self, query_embeddings: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of each query against every row (or the given rows)
+
+        Returns a ``(num_queries, num_rows)`` float32 array.
+        """
+        queries = _normalize_rows(np.atleast_2d(query_embeddings))
+
+        if rows is not None:
+            return self._block_scores(queries, self.vectors[rows], None if self.scales is None else self.scales[rows])
+
+        if self.precision == "float32":
+            return queries @ self.vectors.T
+
+        results = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, len(self))
+            scales = None if self.scales is None else self.scales[start:end]
+            results[:, start:end] = self._block_scores(queries, self.vectors[start:end], scales)
+        return results
+
+    def _block_scores(self, queries: np.ndarray, block: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        """Score a block of stored rows, widening it to float32 first"""
+        block_scores = queries @ np.asarray(block, dtype=np.float32).T
+        if scales is not None:
+            block_scores *= scales[None, :]
+        return block_scores
+
+    def get_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Dequantized float32 copy of the given rows"""
+        block = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows][:, None]
+        return block
+
+    def append(self, embeddings: np.ndarray) -> "EmbeddingStore":
+        """New in-memory store with extra rows; memory-mapped files are never modified"""
+        addition = EmbeddingStore.from_array(embeddings, self.precision)
+        scales = None
+        if self.scales is not None:
+            scales = np.concatenate([self.scales, addition.scales])
+        return EmbeddingStore(np.concatenate([self.vectors, addition.vectors]), self.precision, scales)
+
+    def take(self, rows) -> "EmbeddingStore":
+        """New in-memory store holding only the given rows"""
+        scales = None if self.scales is None else np.asarray(self.scales[rows])
+        return EmbeddingStore(np.asarray(self.vectors[rows]), self.precision, scales)
+
+    def to_memory(self) -> "EmbeddingStore":
+        """Copy of the store held in RAM, independent of any mapped files"""
+        scales = None if self.scales is None else np.array(self.scales)
+        return EmbeddingStore(np.array(self.vectors), self.precision, scales)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self),
+            "dimension": self.dimension,
+            "precision": self.precision,
+            "size_bytes": self.nbytes,
+            "memory_mapped": self.is_memory_mapped
+        }
+
+
+class EmbeddingStoreWriter:
+    """Build a store on disk one batch of rows at a time
+
+    Used by streaming ingestion: each batch is normalized, encoded at the
+    store's precision and appended to the raw files, so the full float32
+    matrix never has to be held in memory. ``close()`` returns the finished
+    store memory-mapped from ``directory``.
+    """
+
+    def __init__(self, directory: Path, precision: str = "float32"):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported embedding precision: {precision}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.precision = precision
+        self.count = 0
+        self.dimension = 0
+
+        self._vectors_file = open(self.directory / EmbeddingStore.VECTORS_FILE, "wb")
+        self._scales_file = open(self.directory / EmbeddingStore.SCALES_FILE, "wb") if precision == "int8" else None
+
+    def append(self, embeddings: np.ndarray):
+        """Append a batch of float embeddings"""
+        block = EmbeddingStore.from_array(embeddings, self.precision)
+        if not len(block):
+            return
+        if self.count and block.dimension != self.dimension:
+            raise ValueError(f"Embedding dimension changed from {self.dimension} to {block.dimension}")
+
+        block.vectors.tofile(self._vectors_file)
+        if self._scales_file is not None:
+            block.scales.tofile(self._scales_file)
+
+        self.count += len(block)
+        self.dimension = block.dimension
+
+    def close(self) -> EmbeddingStore:
+        """Flush the files, write the metadata and map the finished store"""
+        self._vectors_file.close()
+        if self._scales_file is not None:
+            self._scales_file.close()
+
+        with open(self.directory / EmbeddingStore.METADATA_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "precision": self.precision,
+                "count": self.count,
+                "dimension": self.dimension
+            }, f)
+
+        return EmbeddingStore.load(self.directory)
+
+
+def measure_ranking_recall(reference: EmbeddingStore,
+                           candidate: EmbeddingStore,
+                           query_embeddings: np.ndarray,
+                           top_k: int = 10) -> float:
+    """Mean overlap of the top-k rows ranked by two stores for the same queries"""
+    if not len(reference) or not len(query_embeddings):
+        return 1.0
+
+    top_k = min(top_k, len(reference))
+    reference_top = np.argsort(-reference.scores(query_embeddings), axis=1)[:, :top_k]
+    candidate_top = np.argsort(-candidate.scores(query_embeddings), axis=1)[:, :top_k]
+
+    overlaps = [
+        len(set(ref_row.tolist()) & set(cand_row.tolist())) / top_k
+        for ref_row, cand_row in zip(reference_top, candidate_top)
+    ]
+    return float(np.mean(overlaps))
+
+
+def measure_precision_recall(embeddings: np.ndarray, store: EmbeddingStore, sample_size: int = 100) -> float:
+    """Recall@10 of a reduced-precision store against float32
+
+    A sample of the embedded chunks serves as pseudo-queries.
+    """
+    reference = EmbeddingStore.from_array(embeddings, "float32")
+    sample = np.random.default_rng(0).choice(len(reference), size=min(sample_size, len(reference)), replace=False)
+    return measure_ranking_recall(reference, store, reference.get_rows(sample))
@@ -11,6 +11,7 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime
 import json
 import os
+import secrets
 
 # Disable telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -19,10 +20,15 @@ os.environ["CHROMA_TELEMETRY"] = "False"
 # FastAPI imports
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
+from index_manager import IndexManager, RebuildFailed
+from readiness import FAILED, READY, UNAVAILABLE, Readiness
+from sampling_profiler import MAX_SECONDS as MAX_PROFILE_SECONDS, ProfilerBusy, SamplingProfiler
+from worker_pool import BoundedWorkerPool, WorkerPoolSaturated
+
 # Import existing components
 try:
     from simplified_medgraph_rag import SimplifiedMedGraphRAG
@@ -44,10 +50,36 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global system state
-medgraph_system: Optional[SimplifiedMedGraphRAG] = None
+# Blocking search and verification work runs here, never on the event loop
+search_pool = BoundedWorkerPool(
+    max_workers=int(os.environ.get("SEARCH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.environ.get("SEARCH_QUEUE_SIZE", "32")),
+    retry_after=float(os.environ.get("SEARCH_RETRY_AFTER", "1"))
+)
+
+# On-demand statistical profiler behind /admin/profile
+profiler = SamplingProfiler()
+
+async def build_index(previous: Optional[SimplifiedMedGraphRAG]) -> SimplifiedMedGraphRAG:
+    """Build a search system from the guidelines, sharing the embedding model of the one served"""
+    system = SimplifiedMedGraphRAG.from_environment(embedding_model=previous.embedding_model if previous else None)
+    guidelines_dir = Path("ESC_Guidelines")
+    
+    if guidelines_dir.exists() and list(guidelines_dir.glob("*.pdf")):
+        await system.initialize_system(guidelines_dir)
+        logger.info("MedGraphRAG system initialized")
+    else:
+        logger.warning("No guidelines found")
+    return system
+
+# Global system state; searches pin an index generation, rebuilds swap in the next one
+index_manager = IndexManager(build_index, min_chunk_ratio=float(os.environ.get("INDEX_MIN_CHUNK_RATIO", "0.5")))
 safety_validator: Optional[EnhancedSafetyValidator] = None
-system_initialized = False
+system_initialized = False  # the search index is loaded; other components may still be warming up
+startup_task: Optional[asyncio.Task] = None
+
+# Background warm-up: the index first (searches need it), then the optional components
+readiness = Readiness(["index", "embedding_model", "safety_validator"], required=["index"])
 
 # Pydantic models
 class SearchQuery(BaseModel):
@@ -94,30 +126,78 @@ app.add_middleware(
 )
 
 async def initialize_system():
-    """Initialize the system"""
-    global medgraph_system, safety_validator, system_initialized
+    """Initialize the system: load the search index, then warm up the optional components"""
+    global safety_validator, system_initialized
     
     try:
-        if SimplifiedMedGraphRAG:
-            medgraph_system = SimplifiedMedGraphRAG()
-            guidelines_dir = Path("ESC_Guidelines")
-            
-            if guidelines_dir.exists() and list(guidelines_dir.glob("*.pdf")):
-                await medgraph_system.initialize_system(guidelines_dir)
-                logger.info("MedGraphRAG system initialized")
+        with readiness.loading("index") as index_status:
+            if not SimplifiedMedGraphRAG:
+                readiness.mark("index", UNAVAILABLE, "simplified_medgraph_rag could not be imported")
             else:
-                logger.warning("No guidelines found")
-        
-        if EnhancedSafetyValidator:
-            safety_validator = EnhancedSafetyValidator()
-            logger.info("Safety validator initialized")
+                generation = await index_manager.rebuild()
+                if not generation.system.chunks:
+                    index_status.detail = "No guidelines found - the index is empty"
         
         system_initialized = True
-        logger.info("System initialization complete")
+        if index_manager.current:
+            warm = index_manager.current.warm_components()
+            readiness.mark("embedding_model", READY if warm["embedding_model"] else UNAVAILABLE,
+                           None if warm["embedding_model"] else "Keyword (BM25) search only")
         
     except Exception as e:
         logger.error(f"System initialization failed: {e}")
         raise
+    
+    # Safety validation is not needed to serve searches; its NLP model loads after the index
+    try:
+        with readiness.loading("safety_validator"):
+            if not EnhancedSafetyValidator:
+                readiness.mark("safety_validator", UNAVAILABLE, "enhanced_safety_validator could not be imported")
+            else:
+                validator = EnhancedSafetyValidator()
+                if not await asyncio.to_thread(validator.warm_up):
+                    readiness.mark("safety_validator", READY, "No spaCy model - pattern-based extraction only")
+                safety_validator = validator
+                logger.info("Safety validator initialized")
+    except Exception as e:
+        logger.error(f"Safety validator initialization failed: {e}")
+    
+    logger.info("System initialization complete")
+
+async def _initialize_in_background():
+    try:
+        await initialize_system()
+    except Exception as e:
+        logger.error(f"Startup initialization failed: {e}")
+
+def start_initialization() -> asyncio.Task:
+    """Start initialization in the background unless it is running or has succeeded"""
+    global startup_task
+    
+    if startup_task is None or (startup_task.done() and readiness.components["index"].state == FAILED):
+        startup_task = asyncio.create_task(_initialize_in_background())
+    return startup_task
+
+def require_initialized():
+    """Answer 503 with Retry-After while the index is still loading, instead of blocking the request"""
+    if system_initialized and index_manager.current:
+        return
+    
+    start_initialization()
+    raise HTTPException(
+        status_code=503,
+        detail="System is starting up - the search index is still loading",
+        headers={"Retry-After": "10"}
+    )
+
+@app.exception_handler(WorkerPoolSaturated)
+async def worker_pool_saturated_handler(request: Request, exc: WorkerPoolSaturated):
+    """Shed load with a fast 429 instead of queueing without bound"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
 
 # API Endpoints
 
@@ -141,7 +221,7 @@ async def get_system_status():
     if guidelines_dir.exists():
         available_guidelines = [f.name for f in guidelines_dir.glob("*.pdf")]
     
-    total_chunks = len(medgraph_system.chunks) if medgraph_system else 0
+    total_chunks = len(index_manager.current.chunks) if index_manager.current else 0
     
     return SystemStatus(
         initialized=system_initialized,
@@ -152,12 +232,24 @@ async def get_system_status():
     )
 
 @app.post("/system/initialize")
-async def initialize_system_endpoint(background_tasks: BackgroundTasks):
-    """Initialize the system"""
-    global system_initialized
+async def initialize_system_endpoint(background_tasks: BackgroundTasks,
+                                     force: bool = Query(default=False, description="Swap in a rebuilt index that lost most of its chunks")):
+    """Initialize the system; once initialized, rebuild the index and hot-swap it in
     
+    Searches keep using the current index until the new one is built and validated.
+    """
     if system_initialized:
-        return {"message": "System already initialized", "status": "success"}
+        try:
+            generation = await index_manager.rebuild(force)
+        except RebuildFailed as e:
+            raise HTTPException(status_code=500, detail=f"Rebuild failed, still serving generation {index_manager.generation}: {e}")
+        
+        return {
+            "message": "Index rebuilt and swapped in",
+            "status": "success",
+            "generation": generation.number,
+            "total_chunks": len(generation.system.chunks)
+        }
     
     try:
         # Check for guidelines
@@ -172,12 +264,16 @@ async def initialize_system_endpoint(background_tasks: BackgroundTasks):
                 guidelines_dir.mkdir(exist_ok=True)
                 logger.info("Created guidelines directory - please add PDF files")
         
-        await initialize_system()
+        # Join a startup load that is already running rather than loading twice
+        if startup_task is not None and not startup_task.done():
+            await asyncio.shield(startup_task)
+        if not system_initialized:
+            await initialize_system()
         
         return {
             "message": "System initialized successfully",
             "status": "success",
-            "total_chunks": len(medgraph_system.chunks) if medgraph_system else 0
+            "total_chunks": len(index_manager.current.chunks) if index_manager.current else 0
         }
         
     except Exception as e:
@@ -187,16 +283,18 @@ async def initialize_system_endpoint(background_tasks: BackgroundTasks):
 @app.post("/search/enhanced")
 async def enhanced_search(query: SearchQuery):
     """Enhanced search using simplified MedGraphRAG"""
-    if not system_initialized or not medgraph_system:
-        raise HTTPException(status_code=503, detail="System not initialized")
+    require_initialized()
     
     try:
         start_time = time.time()
         
-        result = await medgraph_system.search(
+        result = await search_pool.run(
+            index_manager.call,
+            "search_sync",
             query=query.query,
             top_k=query.top_k,
-            use_verification=query.use_verification
+            use_verification=query.use_verification,
+            filters={"society": query.society_filter, "year": query.year_filter}
         )
         
         # Add performance metrics
@@ -207,6 +305,8 @@ async def enhanced_search(query: SearchQuery):
         
         return result
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
@@ -214,8 +314,7 @@ async def enhanced_search(query: SearchQuery):
 @app.post("/search/clinical")
 async def clinical_search(query: ClinicalQuery):
     """Clinical question answering"""
-    if not system_initialized or not medgraph_system:
-        raise HTTPException(status_code=503, detail="System not initialized")
+    require_initialized()
     
     try:
         # Enhanced clinical search
@@ -225,7 +324,9 @@ async def clinical_search(query: ClinicalQuery):
             context_str = ", ".join([f"{k}: {v}" for k, v in query.patient_context.items()])
             search_query += f" (Patient context: {context_str})"
         
-        result = await medgraph_system.search(
+        result = await search_pool.run(
+            index_manager.call,
+            "search_sync",
             query=search_query,
             top_k=15,
             use_verification=True
@@ -236,6 +337,8 @@ async def clinical_search(query: ClinicalQuery):
         
         return result
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Clinical search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Clinical search failed: {str(e)}")
@@ -276,8 +379,8 @@ async def validate_safety(request: SafetyValidationRequest):
             # Basic safety check using search
             safety_query = f"Safety considerations contraindications: {request.recommendation}"
             
-            if medgraph_system:
-                result = await medgraph_system.search(safety_query, top_k=5, use_verification=True)
+            if index_manager.current:
+                result = await search_pool.run(index_manager.call, "search_sync", safety_query, top_k=5, use_verification=True)
                 
                 return {
                     "recommendation": request.recommendation,
@@ -292,10 +395,30 @@ async def validate_safety(request: SafetyValidationRequest):
             else:
                 raise HTTPException(status_code=503, detail="Safety validation not available")
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Safety validation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Safety validation failed: {str(e)}")
 
+@app.post("/admin/profile")
+async def profile_endpoint(request: Request, seconds: float = Query(default=10.0, gt=0, le=MAX_PROFILE_SECONDS),
+                           include_idle: bool = Query(default=False)):
+    """Sample every thread for ``seconds`` and return collapsed stacks (flamegraph.pl / speedscope input)"""
+    token = os.environ.get("PROFILER_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILER_TOKEN)")
+    if not secrets.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(stacks, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @app.get("/guidelines/list")
 async def list_guidelines():
     """List available guidelines"""
@@ -318,6 +441,20 @@ async def list_guidelines():
         "total_count": len(guidelines)
     }
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop answers, even while models load"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """Readiness probe: 200 once the search index is loaded, 503 before; lists which components are warm"""
+    report = readiness.report()
+    report["index_generation"] = index_manager.stats()
+    if index_manager.current:
+        report["search"] = index_manager.current.warm_components()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -326,7 +463,7 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "system_initialized": system_initialized,
         "components": {
-            "medgraph_rag": medgraph_system is not None,
+            "medgraph_rag": index_manager.current is not None,
             "safety_validator": safety_validator is not None
         }
     }
@@ -355,13 +492,16 @@ async def startup_event():
     """Initialize system on startup"""
     logger.info("Starting Enhanced Cardiovascular Guidelines Search System...")
     
-    # Check if guidelines exist and initialize
+    # Load in the background so the server answers health checks immediately
     guidelines_dir = Path("ESC_Guidelines")
     if guidelines_dir.exists() and list(guidelines_dir.glob("*.pdf")):
-        try:
-            await initialize_system()
-        except Exception as e:
-            logger.error(f"Startup initialization failed: {e}")
+        start_initialization()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the search worker threads and close the served index"""
+    search_pool.shutdown()
+    index_manager.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -10,10 +10,9 @@ from dataclasses import dataclass
 from datetime import datetime
 import json
 import re
+import threading
 
-# Medical NLP and knowledge
-import spacy
-from transformers import pipeline
+from metrics import stage
 
 logger = logging.getLogger(__name__)
 
@@ -197,12 +196,10 @@ class DrugExtractor:
     """Extract drug names and dosages from text"""
     
     def __init__(self):
-        # Load medical NLP model
-        try:
-            self.nlp = spacy.load("en_core_sci_md")
-        except OSError:
-            # Fallback to basic model
-            self.nlp = spacy.load("en_core_web_sm")
+        # Medical NLP model, loaded on first use (spaCy import and model load take seconds)
+        self._nlp = None
+        self._nlp_loaded = False
+        self._nlp_lock = threading.Lock()
         
         # Common drug name patterns
         self.drug_patterns = [
@@ -219,6 +216,33 @@ class DrugExtractor:
         # Dosage patterns
         self.dose_pattern = r'(\d+(?:\.\d+)?)\s*(mg|g|mcg|units?)\s*(?:daily|twice daily|three times daily|q\d+h|bid|tid|qid)?'
     
+    @property
+    def nlp(self):
+        """The spaCy pipeline, or None when spaCy or its models are not installed"""
+        if not self._nlp_loaded:
+            with self._nlp_lock:
+                if not self._nlp_loaded:
+                    self._nlp = self._load_nlp()
+                    self._nlp_loaded = True
+        return self._nlp
+    
+    def _load_nlp(self):
+        try:
+            import spacy
+        except ImportError:
+            logger.warning("spaCy not installed - medication extraction uses patterns only")
+            return None
+        
+        for model_name in ("en_core_sci_md", "en_core_web_sm"):
+            try:
+                nlp = spacy.load(model_name)
+                logger.info(f"Loaded spaCy model {model_name}")
+                return nlp
+            except OSError:
+                continue
+        logger.warning("No spaCy model installed - medication extraction uses patterns only")
+        return None
+    
     def extract_medications(self, text: str) -> List[Dict[str, Any]]:
         """Extract medications and dosages from text"""
         medications = []
@@ -244,8 +268,8 @@ class DrugExtractor:
                 })
         
         # Use NLP for additional extraction
-        doc = self.nlp(text)
-        for ent in doc.ents:
+        nlp = self.nlp
+        for ent in nlp(text).ents if nlp is not None else ():
             if ent.label_ in ["CHEMICAL", "DRUG"]:
                 medications.append({
                     "name": ent.text.lower(),
@@ -269,13 +293,10 @@ class EnhancedSafetyValidator:
     def __init__(self):
         self.knowledge_base = MedicalKnowledgeBase()
         self.drug_extractor = DrugExtractor()
-        
-        # Initialize medical classification model if available
-        try:
-            self.classifier = pipeline("text-classification", 
-                                     model="emilyalsentzer/Bio_ClinicalBERT")
-        except Exception:
-            self.classifier = None
+    
+    def warm_up(self) -> bool:
+        """Load the NLP model now instead of on the first validation (blocking); True if it loaded"""
+        return self.drug_extractor.nlp is not None
     
     async def validate_recommendation(self, 
                                     recommendation: str, 
@@ -285,7 +306,8 @@ class EnhancedSafetyValidator:
         """Comprehensive safety validation"""
         
         # Extract medications from recommendation
-        extracted_meds = self.drug_extractor.extract_medications(recommendation)
+        with stage("safety_medication_extraction"):
+            extracted_meds = self.drug_extractor.extract_medications(recommendation)
         
         # Combine with patient medications
         all_medications = extracted_meds.copy()
@@ -303,14 +325,17 @@ class EnhancedSafetyValidator:
         
         # Check drug interactions
         if check_interactions:
-            drug_interactions = await self._check_drug_interactions(all_medications)
+            with stage("safety_interactions"):
+                drug_interactions = await self._check_drug_interactions(all_medications)
         
         # Check contraindications
         if check_contraindications:
-            contraindications = await self._check_contraindications(extracted_meds, patient_profile)
+            with stage("safety_contraindications"):
+                contraindications = await self._check_contraindications(extracted_meds, patient_profile)
         
         # Check dosing
-        dosing_alerts = await self._check_dosing(extracted_meds, patient_profile)
+        with stage("safety_dosing"):
+            dosing_alerts = await self._check_dosing(extracted_meds, patient_profile)
         
         # Generate safety warnings and recommendations
         safety_warnings, recommendations, requires_monitoring = await self._generate_safety_guidance(
@@ -0,0 +1,194 @@
+"""
+Guideline Metadata
+Society, year and topic of each guideline and the section hierarchy of
+each page, extracted at ingest, plus the boolean-mask index that turns
+search filters into the set of chunks to score
+"""
+
+import logging
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METADATA_FIELDS = ("society", "year", "topic")
+
+# Society codes (as sent by the frontend) and how they appear in file names and title pages
+SOCIETY_PATTERNS = [
+    ("ACC_AHA", re.compile(r"\bACC[\s/_-]+AHA\b|\bAHA[\s/_-]+ACC\b|American College of Cardiology|American Heart Association", re.IGNORECASE)),
+    ("ESC", re.compile(r"(?<![A-Za-z])ESC(?![A-Za-z])|European Society of Cardiology")),
+    ("ESH", re.compile(r"(?<![A-Za-z])ESH(?![A-Za-z])|European Society of Hypertension")),
+    ("EAS", re.compile(r"(?<![A-Za-z])EAS(?![A-Za-z])|European Atherosclerosis Society")),
+    ("HRS", re.compile(r"(?<![A-Za-z])HRS(?![A-Za-z])|Heart Rhythm Society")),
+]
+
+YEAR_PATTERN = re.compile(r"(?<!\d)(19[89]\d|20\d\d)(?!\d)")
+TITLE_PATTERN = re.compile(r"Guidelines?\s+(?:for|on)\s+(?:the\s+)?([^\n.]{5,120})", re.IGNORECASE)
+FILENAME_NOISE = re.compile(r"\b(?:guidelines?|full[ _-]?text|focused[ _-]?update|" + "|".join(code for code, _ in SOCIETY_PATTERNS) + r"|acc|aha)\b", re.IGNORECASE)
+
+# Numbered section headings on a line of their own ("3.2 Diagnosis of heart failure")
+HEADING_PATTERN = re.compile(r"^[ \t]*(\d{1,2}(?:\.\d{1,2}){0,3})\.?[ \t]+([A-Z][^\n]{2,100}?)[ \t]*$", re.MULTILINE)
+MAX_HEADING_WORDS = 14
+
+
+def extract_document_metadata(source_doc: str, first_page_text: str) -> Dict[str, Any]:
+    """Society code, year and topic of a guideline from its file name and first page"""
+    stem = Path(source_doc).stem
+    name = stem.replace("_", " ")
+
+    society = next((code for code, pattern in SOCIETY_PATTERNS if pattern.search(name)), None)
+    if society is None:
+        society = next((code for code, pattern in SOCIETY_PATTERNS if pattern.search(first_page_text)), "")
+
+    year_match = YEAR_PATTERN.search(name) or YEAR_PATTERN.search(first_page_text)
+
+    title_match = TITLE_PATTERN.search(first_page_text)
+    if title_match:
+        topic = title_match.group(1)
+    else:
+        topic = FILENAME_NOISE.sub(" ", YEAR_PATTERN.sub(" ", name))
+    topic = " ".join(re.sub(r"[-_]", " ", topic).split()).lower()
+
+    return {
+        "society": society,
+        "year": int(year_match.group(1)) if year_match else 0,
+        "topic": topic or stem.lower()
+    }
+
+
+def find_section_headings(text: str) -> List[Tuple[Tuple[int, ...], str]]:
+    """Numbered headings of a page as (number parts, "number title"), in page order"""
+    headings = []
+    for match in HEADING_PATTERN.finditer(text):
+        number, title = match.groups()
+        if len(title.split()) > MAX_HEADING_WORDS or title.endswith((".", ",", ";")):
+            continue
+        headings.append((tuple(int(part) for part in number.split(".")), f"{number} {title}"))
+    return headings
+
+
+class SectionTracker:
+    """Current section hierarchy of each document while its pages are chunked in order"""
+
+    def __init__(self):
+        self._stacks: Dict[str, List[Tuple[Tuple[int, ...], str]]] = {}
+
+    def page_sections(self, source_doc: str, headings: List[Tuple[Tuple[int, ...], str]]) -> List[str]:
+        """Hierarchy in effect at the top of the page, then advance past the page's headings
+
+        A page before any heading takes the hierarchy of its first heading.
+        Headings must number past the current one, which skips numbered
+        lists and reference entries that look like headings.
+        """
+        stack = self._stacks.setdefault(source_doc, [])
+        hierarchy = [title for _, title in stack]
+
+        for number, title in headings:
+            current = stack[-1][0] if stack else ()
+            if number <= current:
+                continue
+            while stack and (len(stack[-1][0]) >= len(number) or number[:len(stack[-1][0])] != stack[-1][0]):
+                stack.pop()
+            stack.append((number, title))
+            if not hierarchy:
+                hierarchy = [title for _, title in stack]
+
+        return hierarchy
+
+
+class MetadataIndex:
+    """Boolean masks over the retriever's chunk positions for metadata filters
+
+    Society, year and topic are per-document, so each distinct value gets
+    one prebuilt mask. Sections have many values; their chunk positions
+    are kept as sorted postings and turned into a mask when filtered on.
+    ``positions(filters)`` ANDs the masks and returns the chunk positions
+    to score, so filtered searches only touch matching chunks.
+    """
+
+    def __init__(self, chunks: List[Any]):
+        self.size = len(chunks)
+        self.masks: Dict[str, Dict[Any, np.ndarray]] = {field: {} for field in METADATA_FIELDS}
+        self.section_names: List[Tuple[str, ...]] = []
+        self._section_order = np.zeros(0, dtype=np.int64)
+        self._section_offsets = np.zeros(1, dtype=np.int64)
+        if not chunks:
+            return
+
+        table = chunks[0].table
+        rows = np.fromiter((chunk.row for chunk in chunks), dtype=np.int64, count=len(chunks))
+        docs = table.columns["doc"][rows]
+
+        for field in METADATA_FIELDS:
+            doc_values: Dict[Any, List[int]] = {}
+            for doc in np.unique(docs):
+                doc_values.setdefault(table.doc_metadata[doc].get(field), []).append(doc)
+            for value, value_docs in doc_values.items():
+                self.masks[field][value] = np.isin(docs, value_docs)
+
+        sections = table.columns["section"][rows]
+        self.section_names = list(table.sections)
+        self._section_order = np.argsort(sections, kind="stable")
+        self._section_offsets = np.concatenate([[0], np.cumsum(np.bincount(sections, minlength=len(self.section_names)))])
+
+    def values(self) -> Dict[str, List[Any]]:
+        """Filterable values with at least one chunk"""
+        return {field: sorted(value for value in masks if value) for field, masks in self.masks.items()}
+
+    def positions(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Sorted positions of the chunks matching every filter, or None when nothing is filtered
+
+        society matches the code case-insensitively ("acc/aha" = "ACC_AHA"),
+        year matches exactly, topic and section match substrings of the
+        guideline topic or of any level of the section hierarchy.
+        """
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in filters.items():
+            if field == "section":
+                mask &= self._section_mask(value)
+            elif field == "topic":
+                mask &= self._any_mask(topic_mask for topic, topic_mask in self.masks["topic"].items() if value in topic)
+            else:
+                mask &= self._any_mask([self.masks[field][value]] if value in self.masks[field] else [])
+        return np.flatnonzero(mask)
+
+    def _section_mask(self, value: str) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        for section_id, names in enumerate(self.section_names):
+            if any(value in name.lower() for name in names):
+                mask[self._section_order[self._section_offsets[section_id]:self._section_offsets[section_id + 1]]] = True
+        return mask
+
+    def _any_mask(self, masks) -> np.ndarray:
+        result = np.zeros(self.size, dtype=bool)
+        for mask in masks:
+            result |= mask
+        return result
+
+
+def normalize_filters(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Drop empty filters and bring values to the form stored in the index
+
+    A year that is not a number can match no guideline and becomes -1.
+    """
+    normalized: Dict[str, Any] = {}
+    for field, value in (filters or {}).items():
+        if value is None or str(value).strip() == "":
+            continue
+        value = str(value).strip()
+        if field == "society":
+            normalized[field] = re.sub(r"[^A-Z0-9]+", "_", value.upper())
+        elif field == "year":
+            normalized[field] = int(value) if value.isdigit() else -1
+        elif field in ("topic", "section"):
+            normalized[field] = value.lower()
+        else:
+            raise ValueError(f"Unsupported filter: {field}")
+    return normalized
@@ -0,0 +1,258 @@
+"""
+Index Manager
+Double-buffered search index: the next generation is built and validated
+in the background while the current one keeps serving, then swapped in
+atomically
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Asked of every new generation before it is swapped in
+PROBE_QUERY = "heart failure treatment recommendations"
+
+
+class RebuildFailed(RuntimeError):
+    """A new generation could not be built or failed validation; the current one keeps serving"""
+
+
+@dataclass
+class IndexGeneration:
+    number: int
+    system: Any
+    created_at: float = field(default_factory=time.time)
+    refs: int = 0  # requests holding this generation
+    retired: bool = False  # replaced by a newer generation
+
+
+class IndexManager:
+    """Serve searches from one index generation while the next one is built
+
+    ``builder(previous_system)`` creates and initializes a new system; the
+    previous one is passed so it can share the embedding model. Document
+    updates go through ``update()``, which applies them to a copy rather
+    than to the served system. Requests pin the generation they start with
+    through ``acquire()`` (or ``call()`` from a worker thread), so a swap
+    never changes the index under a running search. A replaced generation
+    is closed when its last request releases it.
+    """
+
+    def __init__(self, builder: Callable[[Optional[Any]], Awaitable[Any]], min_chunk_ratio: float = 0.5):
+        self.builder = builder
+        self.min_chunk_ratio = min_chunk_ratio  # reject a rebuild that loses more chunks than this (unless forced)
+        self._lock = threading.Lock()  # released from worker threads as well as the event loop
+        self._current: Optional[IndexGeneration] = None
+        self._retired: Dict[int, IndexGeneration] = {}  # replaced but still held by requests
+        self._generations = 0
+        self._rebuild_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()  # one rebuild or update builds a generation at a time
+        self.rebuilds = {"succeeded": 0, "failed": 0}
+        self.updates = {"succeeded": 0, "failed": 0}
+        self.last_error: Optional[str] = None
+        self.last_rebuild_seconds: Optional[float] = None
+
+    @property
+    def current(self) -> Optional[Any]:
+        """The system new requests are served from"""
+        generation = self._current
+        return generation.system if generation else None
+
+    @property
+    def generation(self) -> int:
+        generation = self._current
+        return generation.number if generation else 0
+
+    @property
+    def building(self) -> bool:
+        return self._rebuild_task is not None and not self._rebuild_task.done()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Any]:
+        """Pin the current generation for the block and yield its system"""
+        with self._lock:
+            generation = self._current
+            if generation is None:
+                raise RuntimeError("No index generation has been built yet")
+            generation.refs += 1
+        try:
+            yield generation.system
+        finally:
+            with self._lock:
+                generation.refs -= 1
+                release = generation.retired and generation.refs == 0
+                if release:
+                    self._retired.pop(generation.number, None)
+            if release:
+                self._release(generation)
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        """Call a method of the current system with its generation pinned until it returns
+
+        Meant to be submitted to a worker pool as a whole: the pin is taken
+        and released in the worker thread, so a request cancelled while the
+        thread still runs (a client disconnect) cannot release the
+        generation under it.
+        """
+        with self.acquire() as system:
+            return getattr(system, method)(*args, **kwargs)
+
+    async def rebuild(self, force: bool = False) -> IndexGeneration:
+        """Build, validate and swap in a new generation; joins a rebuild already running
+
+        Raises RebuildFailed if the build or validation fails. The build
+        keeps going if the caller is cancelled (e.g. a client disconnect).
+        """
+        return await asyncio.shield(self.start_rebuild(force))
+
+    def start_rebuild(self, force: bool = False) -> asyncio.Task:
+        """Start a rebuild in the background (or return the one running)"""
+        if not self.building:
+            self._rebuild_task = asyncio.create_task(self._rebuild(force))
+            # Nobody may await it; failures are reported through last_error
+            self._rebuild_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._rebuild_task
+
+    async def update(self, change: Callable[[Any], Awaitable[Tuple[Any, Any]]]) -> Tuple[IndexGeneration, Any]:
+        """Apply an incremental change as a new generation and swap it in
+
+        ``change(current_system)`` builds the next system from the current
+        one without modifying it (the current one keeps serving) and returns
+        ``(new_system, result)``; it closes the new system itself if it
+        fails. The new system is validated like a rebuild, except that it
+        may lose chunks (a removal is meant to). Returns the new generation
+        and ``result``; raises RebuildFailed, still serving the current
+        generation, if the change or validation fails. Like a rebuild, the
+        update keeps going if the caller is cancelled.
+        """
+        update_task = asyncio.create_task(self._update(change))
+        # Nobody awaits it after a cancellation; failures are reported through last_error
+        update_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(update_task)
+
+    async def _update(self, change: Callable[[Any], Awaitable[Tuple[Any, Any]]]) -> Tuple[IndexGeneration, Any]:
+        async with self._write_lock:
+            current = self._current
+            if current is None:
+                raise RebuildFailed("No index generation has been built yet")
+
+            system = None
+            try:
+                system, result = await change(current.system)
+                await asyncio.to_thread(self._validate, system, None)
+            except Exception as e:
+                self.updates["failed"] += 1
+                self.last_error = str(e)
+                logger.error(f"Index update failed, still serving generation {current.number}: {e}")
+                if system is not None:
+                    system.close()
+                raise RebuildFailed(str(e)) from e
+
+            generation = self._swap(system)
+            self.updates["succeeded"] += 1
+            self.last_error = None
+            logger.info(f"Index generation {generation.number} serving after an update ({len(system.chunks)} chunks)")
+            return generation, result
+
+    async def _rebuild(self, force: bool) -> IndexGeneration:
+        async with self._write_lock:
+            return await self._build_and_swap(force)
+
+    async def _build_and_swap(self, force: bool) -> IndexGeneration:
+        previous = self._current
+        previous_system = previous.system if previous else None
+        started = time.monotonic()
+        logger.info(f"Building index generation {self._generations + 1}...")
+
+        system = None
+        try:
+            system = await self.builder(previous_system)
+            await asyncio.to_thread(self._validate, system, None if force else previous_system)
+        except Exception as e:
+            self.rebuilds["failed"] += 1
+            self.last_error = str(e)
+            logger.error(f"Index rebuild failed, still serving generation {self.generation}: {e}")
+            if system is not None:
+                system.close()
+            raise RebuildFailed(str(e)) from e
+
+        generation = self._swap(system)
+        self.rebuilds["succeeded"] += 1
+        self.last_error = None
+        self.last_rebuild_seconds = round(time.monotonic() - started, 3)
+        logger.info(f"Index generation {generation.number} serving ({len(system.chunks)} chunks, "
+                    f"built in {self.last_rebuild_seconds}s)")
+        return generation
+
+    def _validate(self, system: Any, previous: Optional[Any]):
+        """Raise ValueError unless the new system can serve in place of ``previous``
+
+        The probe search also warms the new generation (page cache, query
+        encoder) before it takes traffic.
+        """
+        chunks = len(system.chunks)
+        if chunks == 0:
+            if previous is not None and previous.chunks:
+                raise ValueError(f"The new index is empty (serving {len(previous.chunks)} chunks)")
+            return  # no guidelines yet; nothing to search either way
+
+        if system.retriever is None:
+            raise ValueError("The new index has no retriever")
+        if previous is not None and chunks < self.min_chunk_ratio * len(previous.chunks):
+            raise ValueError(f"The new index has {chunks} chunks against {len(previous.chunks)} served "
+                             f"- rebuild with force to accept it")
+
+        # Must run end to end; a keyword-only index may find nothing for it
+        system.search_sync(PROBE_QUERY, top_k=1, use_verification=True)
+
+    def _swap(self, system: Any) -> IndexGeneration:
+        """Make ``system`` the current generation; retire the previous one"""
+        with self._lock:
+            self._generations += 1
+            generation = IndexGeneration(self._generations, system)
+            previous, self._current = self._current, generation
+            release = False
+            if previous is not None:
+                previous.retired = True
+                release = previous.refs == 0
+                if not release:
+                    self._retired[previous.number] = previous
+        if release:
+            self._release(previous)
+        elif previous is not None:
+            logger.info(f"Index generation {previous.number} retired, {previous.refs} requests still using it")
+        return generation
+
+    def _release(self, generation: IndexGeneration):
+        """Close a retired generation nobody holds any more"""
+        generation.system.close()
+        generation.system = None
+        logger.info(f"Index generation {generation.number} released")
+
+    def close(self):
+        """Close the current generation (shutdown)"""
+        with self._lock:
+            generation, self._current = self._current, None
+        if generation is not None:
+            generation.system.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            current = self._current
+            return {
+                "generation": current.number if current else 0,
+                "state": "building" if self.building else "serving" if current else "empty",
+                "in_flight": current.refs if current else 0,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(current.created_at)) if current else None,
+                "retired_in_use": {number: generation.refs for number, generation in self._retired.items()},
+                "rebuilds": dict(self.rebuilds),
+                "updates": dict(self.updates),
+                "last_rebuild_seconds": self.last_rebuild_seconds,
+                "last_error": self.last_error
+            }
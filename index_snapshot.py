@@ -0,0 +1,199 @@
+"""
+Persistent Index Snapshot
+Versioned on-disk copy of the chunked corpus, BM25 statistics and embeddings
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from ann_index import IVFIndex
+from chunk_store import ChunkTable
+from embedding_store import EmbeddingStore
+from text_arena import TextStore
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the on-disk layout changes so stale snapshots are rebuilt
+SNAPSHOT_FORMAT_VERSION = 10
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compute_fingerprint(pdf_directory: Path, settings: Dict[str, Any], embedding_model: str) -> Dict[str, Any]:
+    """Describe everything a snapshot depends on
+
+    Any change to the PDF set (added, removed or edited files), the index
+    settings (chunking parameters, embedding precision) or the embedding
+    model yields a different fingerprint.
+    """
+    pdfs = [
+        {"name": pdf_path.name, "sha256": _file_digest(pdf_path)}
+        for pdf_path in sorted(pdf_directory.glob("*.pdf"))
+    ]
+
+    return {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "pdfs": pdfs,
+        "settings": settings,
+        "embedding_model": embedding_model
+    }
+
+
+class IndexSnapshot:
+    """Versioned index snapshot stored in a directory"""
+
+    MANIFEST_FILE = "manifest.json"
+    CHUNKS_DIR = "chunks"
+    BM25_DIR = "bm25"
+    EMBEDDINGS_DIR = "embeddings"
+    ANN_DIR = "ann"
+    TEXT_DIR = "text"
+
+    def __init__(self, snapshot_dir: Path):
+        self.snapshot_dir = Path(snapshot_dir)
+
+    def read_manifest(self) -> Optional[Dict[str, Any]]:
+        """Read the manifest, or None if there is no usable snapshot"""
+        manifest_path = self.snapshot_dir / self.MANIFEST_FILE
+        if not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read snapshot manifest {manifest_path}: {e}")
+            return None
+
+    def is_valid(self, fingerprint: Dict[str, Any]) -> bool:
+        """Check whether the stored snapshot matches the current corpus"""
+        manifest = self.read_manifest()
+        if not manifest:
+            return False
+
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            logger.info("Index snapshot has an outdated format, rebuilding")
+            return False
+
+        if manifest.get("fingerprint") != fingerprint:
+            logger.info("Index snapshot does not match current PDFs or settings, rebuilding")
+            return False
+
+        return True
+
+    def is_current(self) -> bool:
+        """Check that a snapshot exists in the current format, without comparing it to the PDFs
+
+        Read-only serving trusts the build step that wrote the snapshot.
+        """
+        manifest = self.read_manifest()
+        return bool(manifest) and manifest.get("format_version") == SNAPSHOT_FORMAT_VERSION
+
+    def save(self,
+             chunk_table: ChunkTable,
+             indexed_chunks: int,
+             bm25: Any,
+             embedding_store: Optional[EmbeddingStore],
+             fingerprint: Dict[str, Any],
+             ann_index: Optional[IVFIndex] = None,
+             text_store: Optional[TextStore] = None):
+        """Write a snapshot atomically
+
+        Files are written to a staging directory first and swapped in as a
+        whole, so a crash mid-write never leaves a half-written snapshot.
+        The first ``indexed_chunks`` rows of the chunk table are the indexed
+        chunks; any rows after them are parents that are not indexed
+        themselves (small-to-big retrieval).
+        """
+        staging_dir = self.snapshot_dir.with_name(f"{self.snapshot_dir.name}.tmp-{os.getpid()}")
+        if staging_dir.exists():
+            shutil.rmtree(staging_dir)
+        staging_dir.mkdir(parents=True)
+
+        try:
+            chunk_table.save(staging_dir / self.CHUNKS_DIR)
+
+            # Chunk text lives in per-document arenas; chunks only store offsets
+            (text_store or TextStore()).save(staging_dir / self.TEXT_DIR)
+
+            bm25.save(staging_dir / self.BM25_DIR)
+
+            if embedding_store is not None:
+                embedding_store.save(staging_dir / self.EMBEDDINGS_DIR)
+
+            if ann_index is not None:
+                ann_index.save(staging_dir / self.ANN_DIR)
+
+            manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "created_at": datetime.now().isoformat(),
+                "total_chunks": indexed_chunks,
+                "has_embeddings": embedding_store is not None,
+                "fingerprint": fingerprint
+            }
+            with open(staging_dir / self.MANIFEST_FILE, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+
+            self._swap_in(staging_dir)
+
+        except Exception:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            raise
+
+        logger.info(f"Index snapshot written to {self.snapshot_dir} ({indexed_chunks} chunks)")
+
+    def load(self, bm25_loader: Callable[[Path], Any], ann_nprobe: int = 8) -> Dict[str, Any]:
+        """Load the chunk table, the memory-mapped text and embedding stores, the BM25 index and the ANN index
+
+        bm25_loader restores the BM25 index from its directory (the index
+        class lives with the retriever).
+        """
+        manifest = self.read_manifest()
+        text_store = TextStore.load(self.snapshot_dir / self.TEXT_DIR)
+        chunk_table = ChunkTable.load(self.snapshot_dir / self.CHUNKS_DIR, text_store)
+
+        bm25 = bm25_loader(self.snapshot_dir / self.BM25_DIR)
+
+        ann_index = None
+        ann_dir = self.snapshot_dir / self.ANN_DIR
+        if ann_dir.exists():
+            ann_index = IVFIndex.load(ann_dir, nprobe=ann_nprobe)
+
+        return {
+            "chunk_table": chunk_table,
+            "indexed_chunks": manifest["total_chunks"],
+            "text_store": text_store,
+            "bm25": bm25,
+            "embedding_store": self.load_embedding_store(),
+            "ann_index": ann_index
+        }
+
+    def load_embedding_store(self) -> Optional[EmbeddingStore]:
+        """Memory-map just the embedding store of the current snapshot"""
+        embeddings_dir = self.snapshot_dir / self.EMBEDDINGS_DIR
+        return EmbeddingStore.load(embeddings_dir) if embeddings_dir.exists() else None
+
+    def _swap_in(self, staging_dir: Path):
+        """Replace the current snapshot directory with the staging directory"""
+        self.snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+        retired_dir = self.snapshot_dir.with_name(f"{self.snapshot_dir.name}.old-{os.getpid()}")
+
+        if self.snapshot_dir.exists():
+            os.replace(self.snapshot_dir, retired_dir)
+        os.replace(staging_dir, self.snapshot_dir)
+
+        if retired_dir.exists():
+            shutil.rmtree(retired_dir, ignore_errors=True)
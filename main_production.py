@@ -7,10 +7,11 @@ import asyncio
 import logging
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
 import json
 import os
+import secrets
 
 # Disable telemetry
 os.environ["ANONYMIZED_TELEMETRY"] = "False"
@@ -19,10 +20,16 @@ os.environ["CHROMA_TELEMETRY"] = "False"
 # FastAPI imports
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Request, File, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse, HTMLResponse
+from fastapi.responses import JSONResponse, FileResponse, HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
+from index_manager import IndexManager, RebuildFailed
+from metrics import REGISTRY
+from readiness import FAILED, READY, UNAVAILABLE, Readiness
+from sampling_profiler import MAX_SECONDS as MAX_PROFILE_SECONDS, ProfilerBusy, SamplingProfiler
+from worker_pool import BoundedWorkerPool, WorkerPoolSaturated
+
 # Import existing components
 try:
     from simplified_medgraph_rag import SimplifiedMedGraphRAG
@@ -39,10 +46,39 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Global system state
-medgraph_system: Optional[SimplifiedMedGraphRAG] = None
+# Largest accepted /search/batch request
+MAX_BATCH_QUERIES = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", "1000"))
+
+# Blocking search, verification and safety work runs here, never on the event loop
+search_pool = BoundedWorkerPool(
+    max_workers=int(os.environ.get("SEARCH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.environ.get("SEARCH_QUEUE_SIZE", "32")),
+    retry_after=float(os.environ.get("SEARCH_RETRY_AFTER", "1"))
+)
+
+# On-demand statistical profiler behind /admin/profile
+profiler = SamplingProfiler()
+
+async def build_index(previous: Optional[SimplifiedMedGraphRAG]) -> SimplifiedMedGraphRAG:
+    """Build a search system from the guidelines (or the snapshot), sharing the embedding model of the one served"""
+    system = SimplifiedMedGraphRAG.from_environment(embedding_model=previous.embedding_model if previous else None)
+    guidelines_dir = Path("ESC_Guidelines")
+    
+    if guidelines_dir.exists() and list(guidelines_dir.glob("*.pdf")):
+        await system.initialize_system(guidelines_dir)
+        logger.info(f"MedGraphRAG system initialized with {len(system.chunks)} chunks")
+    else:
+        logger.warning("No guidelines found")
+    return system
+
+# Global system state; searches pin an index generation, rebuilds swap in the next one
+index_manager = IndexManager(build_index, min_chunk_ratio=float(os.environ.get("INDEX_MIN_CHUNK_RATIO", "0.5")))
 safety_validator: Optional[EnhancedSafetyValidator] = None
-system_initialized = False
+system_initialized = False  # the search index is loaded; other components may still be warming up
+startup_task: Optional[asyncio.Task] = None
+
+# Background warm-up: the index first (searches need it), then the optional components
+readiness = Readiness(["index", "embedding_model", "safety_validator"], required=["index"])
 
 # Pydantic models
 class SearchQuery(BaseModel):
@@ -50,6 +86,18 @@ class SearchQuery(BaseModel):
     top_k: int = Field(default=10, ge=1, le=50, description="Number of results to return")
     society_filter: Optional[str] = Field(default=None, description="Filter by society")
     year_filter: Optional[str] = Field(default=None, description="Filter by year")
+    topic_filter: Optional[str] = Field(default=None, description="Filter by guideline topic (substring)")
+    section_filter: Optional[str] = Field(default=None, description="Filter by section heading (substring)")
+    use_verification: bool = Field(default=True, description="Enable verification")
+    include_timings: bool = Field(default=False, description="Add a per-stage latency breakdown to the response")
+
+class BatchSearchQuery(BaseModel):
+    queries: List[str] = Field(..., description="Search queries for guidelines")
+    top_k: int = Field(default=10, ge=1, le=50, description="Number of results to return per query")
+    society_filter: Optional[str] = Field(default=None, description="Filter every query by society")
+    year_filter: Optional[str] = Field(default=None, description="Filter every query by year")
+    topic_filter: Optional[str] = Field(default=None, description="Filter every query by guideline topic (substring)")
+    section_filter: Optional[str] = Field(default=None, description="Filter every query by section heading (substring)")
     use_verification: bool = Field(default=True, description="Enable verification")
 
 class ClinicalQuery(BaseModel):
@@ -69,6 +117,13 @@ class SystemStatus(BaseModel):
     available_guidelines: List[str]
     last_update: Optional[str]
     system_health: str
+    ingest_progress: Optional[Dict[str, Any]] = None
+    caches: Optional[Dict[str, Any]] = None
+    worker_pool: Optional[Dict[str, Any]] = None
+    query_batching: Optional[Dict[str, Any]] = None
+    metadata_filters: Optional[Dict[str, Any]] = None
+    slow_query_log: Optional[Dict[str, Any]] = None
+    index_generation: Optional[Dict[str, Any]] = None
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -89,30 +144,108 @@ app.add_middleware(
 )
 
 async def initialize_system():
-    """Initialize the system"""
-    global medgraph_system, safety_validator, system_initialized
+    """Initialize the system: load the search index, then warm up the optional components"""
+    global safety_validator, system_initialized
     
     try:
-        if SimplifiedMedGraphRAG:
-            medgraph_system = SimplifiedMedGraphRAG()
-            guidelines_dir = Path("ESC_Guidelines")
-            
-            if guidelines_dir.exists() and list(guidelines_dir.glob("*.pdf")):
-                await medgraph_system.initialize_system(guidelines_dir)
-                logger.info(f"MedGraphRAG system initialized with {len(medgraph_system.chunks)} chunks")
+        with readiness.loading("index") as index_status:
+            if not SimplifiedMedGraphRAG:
+                readiness.mark("index", UNAVAILABLE, "simplified_medgraph_rag could not be imported")
             else:
-                logger.warning("No guidelines found")
-        
-        if EnhancedSafetyValidator:
-            safety_validator = EnhancedSafetyValidator()
-            logger.info("Safety validator initialized")
+                generation = await index_manager.rebuild()
+                if not generation.system.chunks:
+                    index_status.detail = "No guidelines found - the index is empty"
         
         system_initialized = True
-        logger.info("System initialization complete")
+        if index_manager.current:
+            warm = index_manager.current.warm_components()
+            readiness.mark("embedding_model", READY if warm["embedding_model"] else UNAVAILABLE,
+                           None if warm["embedding_model"] else "Keyword (BM25) search only")
         
     except Exception as e:
         logger.error(f"System initialization failed: {e}")
         # Don't raise - allow system to start without full initialization
+        return
+    
+    # Safety validation is not needed to serve searches; its NLP model loads after the index
+    try:
+        with readiness.loading("safety_validator"):
+            if not EnhancedSafetyValidator:
+                readiness.mark("safety_validator", UNAVAILABLE, "enhanced_safety_validator could not be imported")
+            else:
+                validator = EnhancedSafetyValidator()
+                if not await asyncio.to_thread(validator.warm_up):
+                    readiness.mark("safety_validator", READY, "No spaCy model - pattern-based extraction only")
+                safety_validator = validator
+                logger.info("Safety validator initialized")
+    except Exception as e:
+        logger.error(f"Safety validator initialization failed: {e}")
+    
+    logger.info("System initialization complete")
+
+def start_initialization() -> asyncio.Task:
+    """Start initialization in the background unless it is running or has succeeded"""
+    global startup_task
+    
+    if startup_task is None or (startup_task.done() and readiness.components["index"].state == FAILED):
+        startup_task = asyncio.create_task(initialize_system())
+    return startup_task
+
+def require_initialized():
+    """Answer 503 with Retry-After while the index is still loading, instead of blocking the request"""
+    if system_initialized and index_manager.current:
+        return
+    
+    start_initialization()
+    raise HTTPException(
+        status_code=503,
+        detail="System is starting up - the search index is still loading",
+        headers={"Retry-After": "10"}
+    )
+
+@app.exception_handler(WorkerPoolSaturated)
+async def worker_pool_saturated_handler(request: Request, exc: WorkerPoolSaturated):
+    """Shed load with a fast 429 instead of queueing without bound"""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": str(max(1, round(exc.retry_after)))}
+    )
+
+def _cache_metrics(field: str) -> Dict[str, float]:
+    """One field of every cache's stats, by cache name"""
+    system = index_manager.current
+    if not system:
+        return {}
+    caches = {
+        "query_embeddings": system.query_embedding_cache.stats(),
+        "results": system.result_cache.stats()
+    }
+    if system.embedding_cache:
+        caches["chunk_embeddings"] = system.embedding_cache.stats()
+    return {name: stats.get(field) for name, stats in caches.items()}
+
+def _cache_hit_ratio() -> Dict[str, float]:
+    hits = _cache_metrics("hits")
+    misses = _cache_metrics("misses")
+    return {name: hits[name] / (hits[name] + misses[name]) for name in hits if hits[name] + misses[name]}
+
+# State owned by the search system and worker pool is read when /metrics is scraped
+REGISTRY.gauge("esc_index_size", "Size of each index component (counts, or bytes for *_bytes)", ["component"],
+               callback=lambda: index_manager.current.index_stats() if index_manager.current else {})
+REGISTRY.counter("esc_cache_hits_total", "Cache hits", ["cache"], callback=lambda: _cache_metrics("hits"))
+REGISTRY.counter("esc_cache_misses_total", "Cache misses", ["cache"], callback=lambda: _cache_metrics("misses"))
+REGISTRY.gauge("esc_cache_hit_ratio", "Cache hits over lookups since start", ["cache"], callback=_cache_hit_ratio)
+REGISTRY.gauge("esc_cache_entries", "Entries held by each cache", ["cache"], callback=lambda: _cache_metrics("entries"))
+REGISTRY.gauge("esc_worker_pool_queue_depth", "Searches waiting for a worker thread", callback=lambda: search_pool.stats()["queued"])
+REGISTRY.gauge("esc_worker_pool_in_flight", "Searches running or queued", callback=lambda: search_pool.stats()["in_flight"])
+REGISTRY.counter("esc_worker_pool_completed_total", "Searches completed by the worker pool", callback=lambda: search_pool.stats()["completed"])
+REGISTRY.counter("esc_worker_pool_rejected_total", "Searches rejected with 429 because the queue was full", callback=lambda: search_pool.stats()["rejected"])
+REGISTRY.gauge("esc_index_generation", "Number of the index generation being served", callback=lambda: index_manager.generation)
+REGISTRY.counter("esc_index_rebuilds_total", "Index rebuilds by outcome", ["outcome"], callback=lambda: dict(index_manager.rebuilds))
+REGISTRY.gauge("esc_system_initialized", "1 once the index is loaded", callback=lambda: int(system_initialized))
+REGISTRY.gauge("esc_component_ready", "1 once a background-loaded component is ready", ["component"],
+               callback=lambda: {name: int(status.state == READY) for name, status in readiness.components.items()})
 
 # Mount static files
 static_path = Path("static")
@@ -168,7 +301,8 @@ async def health_check():
     if guidelines_dir.exists():
         available_guidelines = [f.name for f in guidelines_dir.glob("*.pdf")]
     
-    total_chunks = len(medgraph_system.chunks) if medgraph_system else 0
+    system = index_manager.current
+    total_chunks = len(system.chunks) if system else 0
     
     return {
         "status": "healthy" if system_initialized else "initializing",
@@ -177,12 +311,31 @@ async def health_check():
         "total_chunks": total_chunks,
         "available_guidelines": len(available_guidelines),
         "components": {
-            "medgraph_rag": medgraph_system is not None,
+            "medgraph_rag": system is not None,
             "safety_validator": safety_validator is not None,
             "static_files": static_path.exists()
         }
     }
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and the event loop answers, even while models load"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+@app.get("/health/ready")
+async def readiness_probe():
+    """Readiness probe: 200 once the search index is loaded, 503 before; lists which components are warm"""
+    report = readiness.report()
+    report["index_generation"] = index_manager.stats()
+    if index_manager.current:
+        report["search"] = index_manager.current.warm_components()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text-format metrics: per-stage latency histograms, caches, queue depth, index size"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/system/status", response_model=SystemStatus)
 async def get_system_status():
     """Get detailed system status"""
@@ -192,53 +345,213 @@ async def get_system_status():
     if guidelines_dir.exists():
         available_guidelines = [f.name for f in guidelines_dir.glob("*.pdf")]
     
-    total_chunks = len(medgraph_system.chunks) if medgraph_system else 0
+    system = index_manager.current
+    total_chunks = len(system.chunks) if system else 0
     
     return SystemStatus(
         initialized=system_initialized,
         total_chunks=total_chunks,
         available_guidelines=available_guidelines,
         last_update=datetime.now().isoformat() if system_initialized else None,
-        system_health="healthy" if system_initialized else "initializing"
+        system_health="healthy" if system_initialized else "initializing",
+        ingest_progress=system.ingest_progress if system else None,
+        caches=system.cache_stats() if system else None,
+        worker_pool=search_pool.stats(),
+        query_batching=system.query_batcher.stats() if system and system.query_batcher else None,
+        metadata_filters=system.metadata_index.values() if system else None,
+        slow_query_log=system.slow_query_log.stats() if system and system.slow_query_log else None,
+        index_generation=index_manager.stats()
     )
 
 @app.post("/system/initialize")
-async def initialize_system_endpoint():
-    """Initialize the system"""
-    global system_initialized
+async def initialize_system_endpoint(wait: bool = Query(default=True, description="Wait for a rebuild to finish"),
+                                     force: bool = Query(default=False, description="Swap in a rebuilt index that lost most of its chunks")):
+    """Initialize the system; once initialized, rebuild the index and hot-swap it in
     
-    if system_initialized:
-        return {"message": "System already initialized", "status": "success"}
+    Searches keep using the current index while the new one is built and
+    validated; requests that started before the swap finish on the index
+    they started with.
+    """
+    if not system_initialized:
+        try:
+            await asyncio.shield(start_initialization())
+            
+            return {
+                "message": "System initialized successfully",
+                "status": "success",
+                "total_chunks": len(index_manager.current.chunks) if index_manager.current else 0
+            }
+            
+        except Exception as e:
+            logger.error(f"Initialization failed: {e}")
+            raise HTTPException(status_code=500, detail=f"Initialization failed: {str(e)}")
+    
+    if not wait:
+        index_manager.start_rebuild(force)
+        return JSONResponse(status_code=202, content={
+            "message": "Index rebuild started - the current index serves until it is swapped in",
+            "status": "rebuilding",
+            "generation": index_manager.generation
+        })
     
     try:
-        await initialize_system()
+        generation = await index_manager.rebuild(force)
+    except RebuildFailed as e:
+        raise HTTPException(status_code=500, detail=f"Rebuild failed, still serving generation {index_manager.generation}: {e}")
+    
+    return {
+        "message": "Index rebuilt and swapped in",
+        "status": "success",
+        "generation": generation.number,
+        "total_chunks": len(generation.system.chunks)
+    }
+
+def document_update(apply: Callable[[SimplifiedMedGraphRAG], Awaitable[Dict[str, Any]]]):
+    """An IndexManager.update() change: copy the served index and apply a document update to the copy"""
+    async def change(current: SimplifiedMedGraphRAG):
+        system = SimplifiedMedGraphRAG.from_environment(embedding_model=current.embedding_model)
+        try:
+            await system.initialize_copy(current)
+            return system, await apply(system)
+        except Exception:
+            system.close()
+            raise
+    return change
+
+async def update_guideline(pdf_path: Path, replacement: Optional[Path],
+                           apply: Callable[[SimplifiedMedGraphRAG], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """Put ``replacement`` (None = nothing) in place of a guideline PDF and update the index to match
+    
+    The previous file is kept aside until the updated index is swapped
+    in, and put back if the update fails, so the directory never drifts
+    from the index that is served (a later rebuild would silently pick up
+    the difference). Runs as its own task, so a client disconnect cannot
+    separate the two either.
+    """
+    async def run() -> Dict[str, Any]:
+        previous = pdf_path.with_name(f".{pdf_path.name}.previous")
+        had_previous = pdf_path.exists()
+        try:
+            if had_previous:
+                os.replace(pdf_path, previous)
+            if replacement is not None:
+                os.replace(replacement, pdf_path)
+            _, result = await index_manager.update(document_update(apply))
+        except BaseException:
+            if replacement is not None:
+                replacement.unlink(missing_ok=True)
+            if had_previous and previous.exists():
+                os.replace(previous, pdf_path)
+            elif not had_previous and replacement is not None:
+                pdf_path.unlink(missing_ok=True)
+            raise
+        
+        if had_previous:
+            previous.unlink(missing_ok=True)
+        return result
+    
+    task = asyncio.create_task(run())
+    # Nobody awaits it after a cancellation; the update logs its own failures
+    task.add_done_callback(lambda task: task.cancelled() or task.exception())
+    return await asyncio.shield(task)
+
+def check_admin_token(request: Request, variable: str, feature: str):
+    """404 while the token variable is unset (the feature is disabled), 403 unless X-Admin-Token matches it"""
+    token = os.environ.get(variable)
+    if not token:
+        raise HTTPException(status_code=404, detail=f"{feature} is disabled (set {variable})")
+    if not secrets.compare_digest(request.headers.get("X-Admin-Token", ""), token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def check_index_writable():
+    """Document updates build a new generation from the served one; refuse them when that is not possible"""
+    system = index_manager.current
+    if not system:
+        raise HTTPException(status_code=503, detail="System not initialized")
+    if system.read_only:
+        raise HTTPException(status_code=409, detail="The index is read-only (multi-worker serving) - rebuild it with build.py and restart")
+    if index_manager.building:
+        raise HTTPException(status_code=409, detail="An index rebuild is in progress - retry once it has been swapped in",
+                            headers={"Retry-After": "30"})
+
+@app.post("/system/documents")
+async def add_document_endpoint(request: Request, file: UploadFile = File(...)):
+    """Add or replace a single guideline PDF without a full re-index (needs ADMIN_TOKEN)"""
+    check_admin_token(request, "ADMIN_TOKEN", "Document updates")
+    check_index_writable()
+    
+    filename = Path(file.filename or "").name
+    if not filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Only PDF guidelines can be added")
+    
+    try:
+        guidelines_dir = Path("ESC_Guidelines")
+        guidelines_dir.mkdir(exist_ok=True)
+        
+        # Write to a temporary name first so a failed upload never clobbers the existing file
+        pdf_path = guidelines_dir / filename
+        upload_path = guidelines_dir / f".{filename}.upload"
+        upload_path.write_bytes(await file.read())
+        
+        # Searches keep using the current index until the updated copy is swapped in
+        result = await update_guideline(pdf_path, upload_path, lambda system: system.add_document(pdf_path))
         
         return {
-            "message": "System initialized successfully",
+            "message": f"Guideline {result['action']}",
             "status": "success",
-            "total_chunks": len(medgraph_system.chunks) if medgraph_system else 0
+            **result
         }
         
     except Exception as e:
-        logger.error(f"Initialization failed: {e}")
-        raise HTTPException(status_code=500, detail=f"Initialization failed: {str(e)}")
+        logger.error(f"Adding document failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Adding document failed: {str(e)}")
+
+@app.delete("/system/documents/{filename}")
+async def remove_document_endpoint(request: Request, filename: str):
+    """Remove a single guideline PDF from the index and the guidelines directory (needs ADMIN_TOKEN)"""
+    check_admin_token(request, "ADMIN_TOKEN", "Document updates")
+    check_index_writable()
+    
+    filename = Path(filename).name
+    pdf_path = Path("ESC_Guidelines") / filename
+    
+    if not pdf_path.exists() and not any(chunk.source_doc == filename for chunk in index_manager.current.chunks):
+        raise HTTPException(status_code=404, detail=f"Guideline not found: {filename}")
+    
+    try:
+        result = await update_guideline(pdf_path, None, lambda system: system.remove_document(filename))
+        
+        return {
+            "message": "Guideline removed",
+            "status": "success",
+            **result
+        }
+        
+    except Exception as e:
+        logger.error(f"Removing document failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Removing document failed: {str(e)}")
 
 @app.post("/search/enhanced")
 async def enhanced_search(query: SearchQuery):
     """Enhanced search using MedGraphRAG"""
-    if not system_initialized or not medgraph_system:
-        # Try to initialize if not done
-        await initialize_system()
-        if not system_initialized or not medgraph_system:
-            raise HTTPException(status_code=503, detail="System not initialized - please wait for initialization to complete")
+    require_initialized()
     
     try:
         start_time = time.time()
         
-        result = await medgraph_system.search(
+        result = await search_pool.run(
+            index_manager.call,
+            "search_sync",
             query=query.query,
             top_k=query.top_k,
-            use_verification=query.use_verification
+            use_verification=query.use_verification,
+            filters={
+                "society": query.society_filter,
+                "year": query.year_filter,
+                "topic": query.topic_filter,
+                "section": query.section_filter
+            },
+            include_timings=query.include_timings
         )
         
         # Add performance metrics
@@ -246,20 +559,65 @@ async def enhanced_search(query: SearchQuery):
             "search_time_ms": round((time.time() - start_time) * 1000, 2),
             "verification_enabled": query.use_verification
         }
+        if query.include_timings:
+            result["performance"]["stages_ms"] = result["metadata"].pop("stages_ms", {})
         
         return result
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@app.post("/search/batch")
+async def batch_search(query: BatchSearchQuery):
+    """Search many queries in one call (one embedding batch, vectorized scoring)"""
+    require_initialized()
+    
+    if not query.queries:
+        raise HTTPException(status_code=400, detail="No queries given")
+    if len(query.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+    
+    try:
+        start_time = time.time()
+        
+        results = await search_pool.run(
+            index_manager.call,
+            "search_batch_sync",
+            queries=query.queries,
+            top_k=query.top_k,
+            use_verification=query.use_verification,
+            filters={
+                "society": query.society_filter,
+                "year": query.year_filter,
+                "topic": query.topic_filter,
+                "section": query.section_filter
+            }
+        )
+        
+        elapsed_ms = (time.time() - start_time) * 1000
+        return {
+            "results": results,
+            "performance": {
+                "total_queries": len(results),
+                "search_time_ms": round(elapsed_ms, 2),
+                "time_per_query_ms": round(elapsed_ms / len(results), 2),
+                "verification_enabled": query.use_verification
+            }
+        }
+        
+    except WorkerPoolSaturated:
+        raise
+    except Exception as e:
+        logger.error(f"Batch search failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch search failed: {str(e)}")
+
 @app.post("/search/clinical")
 async def clinical_search(query: ClinicalQuery):
     """Clinical question answering"""
-    if not system_initialized or not medgraph_system:
-        await initialize_system()
-        if not system_initialized or not medgraph_system:
-            raise HTTPException(status_code=503, detail="System not initialized")
+    require_initialized()
     
     try:
         # Enhanced clinical search
@@ -269,7 +627,9 @@ async def clinical_search(query: ClinicalQuery):
             context_str = ", ".join([f"{k}: {v}" for k, v in query.patient_context.items()])
             search_query += f" (Patient context: {context_str})"
         
-        result = await medgraph_system.search(
+        result = await search_pool.run(
+            index_manager.call,
+            "search_sync",
             query=search_query,
             top_k=15,
             use_verification=True
@@ -280,6 +640,8 @@ async def clinical_search(query: ClinicalQuery):
         
         return result
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Clinical search failed: {e}")
         raise HTTPException(status_code=500, detail=f"Clinical search failed: {str(e)}")
@@ -291,8 +653,8 @@ async def validate_safety(request: SafetyValidationRequest):
         # Basic safety check using search
         safety_query = f"Safety considerations contraindications warnings: {request.recommendation}"
         
-        if medgraph_system:
-            result = await medgraph_system.search(safety_query, top_k=5, use_verification=True)
+        if index_manager.current:
+            result = await search_pool.run(index_manager.call, "search_sync", safety_query, top_k=5, use_verification=True)
             
             # Simple safety scoring based on verification
             verification_score = result.get("verification", {}).get("overall_score", 0.5)
@@ -313,10 +675,26 @@ async def validate_safety(request: SafetyValidationRequest):
         else:
             raise HTTPException(status_code=503, detail="Safety validation not available - system not initialized")
         
+    except WorkerPoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Safety validation failed: {e}")
         raise HTTPException(status_code=500, detail=f"Safety validation failed: {str(e)}")
 
+@app.post("/admin/profile")
+async def profile_endpoint(request: Request, seconds: float = Query(default=10.0, gt=0, le=MAX_PROFILE_SECONDS),
+                           include_idle: bool = Query(default=False)):
+    """Sample every thread for ``seconds`` and return collapsed stacks (flamegraph.pl / speedscope input)"""
+    check_admin_token(request, "PROFILER_TOKEN", "Profiling")
+    
+    try:
+        stacks = await asyncio.to_thread(profiler.profile, seconds, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(stacks, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
 @app.get("/guidelines/list")
 async def list_guidelines():
     """List available guidelines"""
@@ -372,8 +750,14 @@ async def startup_event():
     """Initialize system on startup"""
     logger.info("Starting Enhanced Cardiovascular Guidelines Search System...")
     
-    # Initialize in background
-    asyncio.create_task(initialize_system())
+    # Load in the background so the server answers health checks immediately
+    start_initialization()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the search worker threads and close the served index"""
+    search_pool.shutdown()
+    index_manager.close()
 
 if __name__ == "__main__":
     import uvicorn
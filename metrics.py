@@ -0,0 +1,252 @@
+"""
+Metrics
+In-process counters, gauges and histograms rendered in the Prometheus
+text exposition format, and stage timers that also fill an optional
+per-request breakdown
+"""
+
+import bisect
+import contextvars
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds; search stages range from tens of microseconds (BM25 on a filtered subset) to seconds (cold model)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named metric family with optional labels
+
+    Values are either recorded as they happen or, for state owned by
+    another component (cache counters, queue depth), read from
+    ``callback`` at scrape time. A callback returns a number, or a dict of
+    label value (a string, or a tuple for several labels) -> number.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        """(name suffix, label values, value) for every series"""
+        if self.callback is None:
+            with self._lock:
+                values = dict(self._values)
+        else:
+            values = self._collect()
+        for key, value in sorted(values.items()):
+            yield "", key, value
+
+    def _collect(self) -> Dict[LabelValues, float]:
+        try:
+            result = self.callback()
+        except Exception as e:
+            logger.warning(f"Metric callback for {self.name} failed: {e}")
+            return {}
+        if result is None:
+            return {}
+        if not isinstance(result, dict):
+            return {(): float(result)}
+        return {
+            (key if isinstance(key, tuple) else (str(key),)): float(value)
+            for key, value in result.items()
+            if value is not None
+        }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(Metric):
+    """Bucketed observations; buckets are upper bounds in the observed unit"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}  # per-bucket counts, then +Inf count, then sum
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[position] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+
+        for key, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (math.inf,), values[:-1]):
+                cumulative += count
+                bucket_labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class MetricsRegistry:
+    """Metric families by name, rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                callback: Optional[Callable[[], Any]] = None) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              callback: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: Metric) -> Any:
+        """Add a metric; registering a name again returns the existing metric (a callback replaces the old one)"""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+            if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                raise ValueError(f"Metric {metric.name} already registered with another type or labels")
+            if metric.callback is not None:
+                existing.callback = metric.callback
+            return existing
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "esc_stage_duration_seconds", "Time spent in each search pipeline stage", ["stage"]
+)
+
+class RequestTrace:
+    """Stages timed while one request ran: spans in start order and total ms per stage"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float, float]] = []  # (stage, start offset ms, duration ms)
+        self.stages_ms: Dict[str, float] = {}
+
+    def add(self, name: str, started: float, elapsed: float):
+        self.spans.append((name, (started - self.started) * 1000, elapsed * 1000))
+        self.stages_ms[name] = self.stages_ms.get(name, 0.0) + elapsed * 1000
+
+    def span_dicts(self) -> List[Dict[str, Any]]:
+        """Spans sorted by start, rounded for logging or a response"""
+        return [
+            {"stage": name, "start_ms": round(start, 3), "duration_ms": round(duration, 3)}
+            for name, start, duration in sorted(self.spans, key=lambda span: span[1])
+        ]
+
+
+# Trace of the request being handled in this thread or task, if one is being traced
+_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the stage histogram (and the current request's trace, if any)
+
+    A stage entered several times in one request adds up in the trace's stages_ms.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=name)
+        trace = _trace.get()
+        if trace is not None:
+            trace.add(name, started, elapsed)
+
+
+@contextmanager
+def trace_request():
+    """Collect the stages timed inside the block (this thread or task) into a RequestTrace"""
+    trace = RequestTrace()
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
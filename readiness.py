@@ -0,0 +1,78 @@
+"""
+Readiness
+Warm-up state of the components a server loads in the background, for
+liveness and readiness probes
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+UNAVAILABLE = "unavailable"  # not installed or nothing to load; the server runs without it
+
+
+@dataclass
+class ComponentStatus:
+    state: str = PENDING
+    detail: Optional[str] = None
+    load_seconds: Optional[float] = None
+
+
+class Readiness:
+    """Track components through pending -> loading -> ready/failed/unavailable
+
+    The server is ready once every ``required`` component is ready; the
+    others (e.g. the safety validator's NLP model) only add features.
+    """
+
+    def __init__(self, components: List[str], required: List[str]):
+        self.started = time.monotonic()
+        self.components: Dict[str, ComponentStatus] = {name: ComponentStatus() for name in components}
+        self.required = list(required)
+
+    @contextmanager
+    def loading(self, name: str):
+        """Mark a component loading for the block; ready when it finishes, failed if it raises
+
+        A block that marks the component itself (e.g. unavailable) keeps that state.
+        """
+        status = self.components[name]
+        status.state, status.detail = LOADING, None
+        started = time.monotonic()
+        try:
+            yield status
+        except Exception as e:
+            status.state, status.detail = FAILED, str(e)
+            raise
+        finally:
+            status.load_seconds = round(time.monotonic() - started, 3)
+        if status.state == LOADING:
+            status.state = READY
+        logger.info(f"{name} {status.state} after {status.load_seconds}s")
+
+    def mark(self, name: str, state: str, detail: Optional[str] = None):
+        status = self.components[name]
+        status.state, status.detail = state, detail
+
+    @property
+    def ready(self) -> bool:
+        return all(self.components[name].state == READY for name in self.required)
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - self.started, 1),
+            "required": self.required,
+            "components": {
+                name: {key: value for key, value in vars(status).items() if value is not None}
+                for name, status in self.components.items()
+            }
+        }
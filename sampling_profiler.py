@@ -0,0 +1,99 @@
+"""
+Sampling Profiler
+Statistical profiler over every thread of this process, producing
+collapsed stacks ("frame;frame;frame count") for flamegraph tools
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAX_SECONDS = 60.0
+
+# Leaf frames of threads that are waiting, not working (idle workers, the event loop's selector)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running"""
+
+
+class SamplingProfiler:
+    """Sample the Python stacks of all threads at a fixed interval
+
+    Sampling reads ``sys._current_frames()`` from a background thread, so
+    the profiled code runs unmodified; the cost is one stack walk per
+    thread per interval. Only one profile runs at a time.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, include_idle: bool = False) -> str:
+        """Sample for ``seconds`` (blocking) and return the collapsed stacks"""
+        seconds = min(max(seconds, self.interval), MAX_SECONDS)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+
+        try:
+            samples = self._sample(seconds, include_idle)
+        finally:
+            self._lock.release()
+
+        total = sum(samples.values())
+        logger.info(f"Profiled {seconds:.1f}s: {total} samples, {len(samples)} distinct stacks")
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+    def _sample(self, seconds: float, include_idle: bool) -> Counter:
+        samples: Counter = Counter()
+        names: Dict[int, str] = {}
+        own_id = threading.get_ident()
+        deadline = time.perf_counter() + seconds
+
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            frames = sys._current_frames()
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = _collapse(frame, include_idle)
+                if stack is not None:
+                    samples[f"{names.get(thread_id, thread_id)};{stack}"] += 1
+            del frames
+
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - started)))
+
+        return samples
+
+
+def _collapse(frame, include_idle: bool) -> Optional[str]:
+    """Root-first "function (file:line)" frames joined by ";", or None for an idle thread"""
+    if not include_idle and _frame_key(frame) in IDLE_FRAMES:
+        return None
+
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+def _frame_key(frame) -> Tuple[str, str]:
+    return Path(frame.f_code.co_filename).name, frame.f_code.co_name
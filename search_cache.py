@@ -0,0 +1,123 @@
+"""
+Search Caches
+Thread-safe LRU caches with TTL expiry, invalidated when the index changes
+"""
+
+import copy
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used as a cache key"""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class LRUCache:
+    """Least-recently-used cache with optional time-to-live
+
+    ``version_source`` returns the current index version. Whenever it
+    differs from the version the entries were stored under, the cache is
+    cleared before the lookup, so no entry computed against an older index
+    is ever returned. With ``copy_values`` stored and returned values are
+    deep-copied, so callers can mutate results freely.
+    """
+
+    def __init__(self,
+                 max_size: int = 1024,
+                 ttl_seconds: Optional[float] = None,
+                 version_source: Optional[Callable[[], Any]] = None,
+                 copy_values: bool = False,
+                 name: str = "cache"):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds  # None = entries never expire
+        self.version_source = version_source
+        self.copy_values = copy_values
+        self.name = name
+
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = version_source() if version_source else None
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, stored_at = entry
+            if self.ttl_seconds is not None and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        return copy.deepcopy(value) if self.copy_values else value
+
+    def put(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond max_size"""
+        if self.max_size <= 0:
+            return
+
+        if self.copy_values:
+            value = copy.deepcopy(value)
+
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+    def _check_version(self):
+        """Drop every entry if the index version moved on (caller holds the lock)"""
+        if self.version_source is None:
+            return
+
+        version = self.version_source()
+        if version != self._version:
+            if self._entries:
+                logger.info(f"Index version changed, clearing {self.name} ({len(self._entries)} entries)")
+                self._entries.clear()
+            self._version = version
+            self.invalidations += 1
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Server
+Prepare the index snapshot once, then start WEB_CONCURRENCY uvicorn
+workers that attach to it read-only. The snapshot's text, chunk columns,
+BM25 postings and embeddings are memory-mapped, so the workers share one
+copy through the page cache instead of each parsing the PDFs and holding
+its own index.
+
+    WEB_CONCURRENCY=4 python serve.py
+"""
+
+import logging
+import multiprocessing
+import os
+import sys
+from pathlib import Path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GUIDELINES_DIR = Path("ESC_Guidelines")
+
+# Native thread pools that would otherwise each start one thread per core in every worker
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def limit_threads(workers: int):
+    """Split the cores between the workers (explicit settings win)
+
+    Each worker's NumPy/BLAS and torch pools, and its search thread pool,
+    get cores / workers threads, so N workers do not oversubscribe the CPU.
+    Workers are spawned processes and read these before importing NumPy.
+    """
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    for name in THREAD_ENV_VARS:
+        os.environ.setdefault(name, str(threads))
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    os.environ.setdefault("SEARCH_WORKERS", str(max(2, min(4, threads))))
+    logger.info(f"{workers} workers, {threads} native threads each")
+
+
+def _prepare_snapshot(guidelines_dir: str):
+    """Build the snapshot if it is missing or stale (runs in a child process)"""
+    import asyncio
+
+    from simplified_medgraph_rag import SimplifiedMedGraphRAG
+
+    system = SimplifiedMedGraphRAG.from_environment()
+    if not system.snapshot:
+        raise SystemExit(1)
+    if system.snapshot_is_current(Path(guidelines_dir)):
+        logger.info("Index snapshot is current")
+        return
+
+    logger.info("Building the index snapshot...")
+    asyncio.run(system.initialize_system(Path(guidelines_dir)))
+    if not system.snapshot.is_current():
+        raise SystemExit(1)
+
+
+def prepare_snapshot(guidelines_dir: Path) -> bool:
+    """Make sure a current snapshot exists; True when workers can attach to it
+
+    The check (and any build) runs in a separate process, so the server
+    process that supervises the workers never holds the index or the
+    embedding model itself.
+    """
+    if not guidelines_dir.exists() or not any(guidelines_dir.glob("*.pdf")):
+        logger.warning(f"No guideline PDFs in {guidelines_dir}")
+        return False
+
+    process = multiprocessing.get_context("spawn").Process(target=_prepare_snapshot, args=(str(guidelines_dir),))
+    process.start()
+    process.join()
+    return process.exitcode == 0
+
+
+def main() -> int:
+    import uvicorn
+
+    workers = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", "8000"))
+
+    if workers > 1:
+        if prepare_snapshot(GUIDELINES_DIR):
+            os.environ["INDEX_READ_ONLY"] = "1"
+        else:
+            # Without a shared snapshot every worker would ingest the PDFs on its own
+            logger.warning("No index snapshot to share - starting a single worker")
+            workers = 1
+        os.environ["WEB_CONCURRENCY"] = str(workers)
+        limit_threads(workers)
+
+    uvicorn.run("main_production:app", host=host, port=port, workers=workers, access_log=True, log_level="info")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
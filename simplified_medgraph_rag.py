@@ -5,38 +5,51 @@ Working with existing dependencies in the system
 
 import logging
 import asyncio
+import os
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass
 from pathlib import Path
+import copy
 import json
-import re
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
 # Core ML and NLP (using existing dependencies)
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 # PDF processing
 import fitz  # PyMuPDF
 
-# Hybrid search
-from rank_bm25 import BM25Okapi
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from ann_index import IVFIndex
+from chunk_store import ChunkTable, MedicalChunk, word_tokens
+from embedding_batcher import EmbeddingBatcher
+from embedding_cache import EmbeddingCache
+from embedding_store import EmbeddingStore, EmbeddingStoreWriter, measure_precision_recall
+from guideline_metadata import MetadataIndex, SectionTracker, extract_document_metadata, find_section_headings, normalize_filters
+from index_snapshot import IndexSnapshot, compute_fingerprint
+from metrics import REGISTRY, RequestTrace, stage, trace_request
+from slow_query_log import SlowQueryLog
+from search_cache import LRUCache, normalize_query
+from term_matcher import DEFAULT_VOCABULARY, TermMatch, TermMatcher
+from text_arena import TextStore
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class MedicalChunk:
-    """Simplified medical chunk"""
-    id: str
-    text: str
-    source_doc: str
-    page_number: int
-    section_hierarchy: List[str]
-    chunk_type: str  # parent or child
-    parent_chunk_id: Optional[str] = None
-    medical_terms: List[str] = None
+SEARCHES = REGISTRY.counter("esc_searches_total", "Searches handled, by whether the result cache answered them", ["cached"])
+HALLUCINATION_RISK = REGISTRY.counter("esc_verifications_total", "Verified responses by hallucination risk", ["risk"])
+
+def load_sentence_transformer(model_name: str) -> Any:
+    """Load a sentence embedding model; sentence-transformers (and torch) are imported on first use"""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+class IndexReadOnlyError(RuntimeError):
+    """Raised when a read-only (serving) system is asked to change its index"""
 
 @dataclass
 class RetrievalResult:
@@ -45,111 +58,785 @@ class RetrievalResult:
     score: float
     retrieval_method: str
     verification_score: Optional[float] = None
+    parent: Optional[MedicalChunk] = None  # parent chunk hydrated in small-to-big mode
+    index: Optional[int] = None  # row of the chunk in the retriever (and its embedding store)
 
 class SimplifiedMedicalExtractor:
-    """Simplified medical term extraction using regex patterns"""
-    
-    def __init__(self):
-        # Common medical term patterns
-        self.medical_patterns = [
-            # Cardiovascular conditions
-            r'\b(heart failure|atrial fibrillation|myocardial infarction|angina|arrhythmia|cardiomyopathy)\b',
-            # Medications
-            r'\b(metoprolol|atenolol|warfarin|aspirin|lisinopril|amlodipine|digoxin|amiodarone)\b',
-            # Procedures
-            r'\b(angioplasty|bypass|stent|catheterization|echocardiogram|ECG|EKG)\b',
-            # Measurements
-            r'\b(blood pressure|heart rate|ejection fraction|cholesterol)\b',
-            # Dosages
-            r'\b\d+\s*(mg|g|mcg|units?)\b',
-        ]
-        
+    """Medical term extraction with a compiled vocabulary matcher
+    
+    The vocabulary (``MEDICAL_VOCABULARY``, else the starter list in
+    ``data/medical_terms.tsv``) is loaded once into a TermMatcher, so a
+    page is scanned in one pass however many terms the vocabulary holds.
+    """
+    
+    def __init__(self, vocabulary_path: Optional[Path] = None):
+        self.matcher = TermMatcher.load(vocabulary_path or Path(os.environ.get("MEDICAL_VOCABULARY", DEFAULT_VOCABULARY)))
+    
+    def find_terms(self, text: str) -> List[TermMatch]:
+        """Every term occurrence with its id, span and category"""
+        return self.matcher.find(text)
+    
     def extract_medical_terms(self, text: str) -> List[str]:
-        """Extract medical terms from text"""
-        terms = []
-        text_lower = text.lower()
+        """Extract medical terms from text (distinct canonical forms, in order of first occurrence)"""
+        terms = self.matcher.terms
+        return list(dict.fromkeys(terms[match.term_id].canonical for match in self.matcher.find(text)))
+
+class BM25Index:
+    """Inverted-index BM25 (Okapi variant)
+    
+    Produces the same scores as ``rank_bm25.BM25Okapi`` with the same
+    ``k1``, ``b`` and ``epsilon``, but keeps term statistics in flat NumPy
+    arrays: a forward index (per-chunk term counts, CSR) that supports cheap
+    appends and deletes, and postings lists (per-term chunk IDs and term
+    frequencies, CSR) derived from it. Queries only touch the postings of
+    their terms, and ``top_k`` skips low-impact postings MaxScore-style.
+    """
+    
+    ARRAY_NAMES = (
+        "doc_offsets", "doc_terms", "doc_tfs", "doc_len",
+        "doc_freq", "idf", "length_norms",
+        "post_offsets", "post_docs", "post_tfs", "upper_bounds"
+    )
+    
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocabulary: Dict[str, int] = {}
+        
+        # Forward index: chunk i owns entries doc_offsets[i]:doc_offsets[i + 1]
+        self.doc_offsets = np.zeros(1, dtype=np.int64)
+        self.doc_terms = np.zeros(0, dtype=np.int32)
+        self.doc_tfs = np.zeros(0, dtype=np.int32)
+        self.doc_len = np.zeros(0, dtype=np.float64)
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        
+        # Derived statistics, rebuilt lazily after updates
+        self.avgdl = 0.0
+        self.idf = np.zeros(0, dtype=np.float64)
+        self.length_norms = np.zeros(0, dtype=np.float64)
+        self.post_offsets = np.zeros(1, dtype=np.int64)
+        self.post_docs = np.zeros(0, dtype=np.int32)
+        self.post_tfs = np.zeros(0, dtype=np.int32)
+        self.upper_bounds = np.zeros(0, dtype=np.float64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._dirty = False
+        self._refresh_lock = threading.Lock()  # concurrent searches may trigger the lazy refresh
+    
+    @classmethod
+    def build(cls, tokenized_corpus: List[List[str]], **params) -> "BM25Index":
+        index = cls(**params)
+        index.add_documents(tokenized_corpus)
+        return index
+    
+    @property
+    def corpus_size(self) -> int:
+        self._merge_pending()
+        return len(self.doc_len)
+    
+    def add_documents(self, tokenized_corpus: List[List[str]]):
+        """Append chunks; statistics are refreshed on the next query
+        
+        New chunks are buffered as blocks and merged into the forward index
+        once, when it is next read, so appending batch by batch during
+        streaming ingestion costs time linear in the batch, not the corpus.
+        """
+        if not tokenized_corpus:
+            return
+        
+        terms: List[int] = []
+        tfs: List[int] = []
+        offsets = []
+        lengths = []
+        for tokens in tokenized_corpus:
+            frequencies: Dict[int, int] = {}
+            for word in tokens:
+                term_id = self.vocabulary.setdefault(word, len(self.vocabulary))
+                frequencies[term_id] = frequencies.get(term_id, 0) + 1
+            terms.extend(frequencies.keys())
+            tfs.extend(frequencies.values())
+            offsets.append(len(frequencies))
+            lengths.append(len(tokens))
+        
+        self._pending.append((
+            np.array(offsets, dtype=np.int64),
+            np.array(terms, dtype=np.int32),
+            np.array(tfs, dtype=np.int32),
+            np.array(lengths, dtype=np.float64)
+        ))
+        self._dirty = True
+    
+    def remove_documents(self, keep: np.ndarray):
+        """Keep only the given chunk positions (in order)"""
+        self._merge_pending()
+        keep = np.asarray(keep, dtype=np.int64)
+        entry_counts = np.diff(self.doc_offsets)
+        keep_mask = np.zeros(self.corpus_size, dtype=bool)
+        keep_mask[keep] = True
+        entry_mask = np.repeat(keep_mask, entry_counts)
+        
+        self.doc_terms = self.doc_terms[entry_mask]
+        self.doc_tfs = self.doc_tfs[entry_mask]
+        self.doc_offsets = np.concatenate([[0], np.cumsum(entry_counts[keep])]).astype(np.int64)
+        self.doc_len = self.doc_len[keep]
+        self.doc_freq = np.bincount(self.doc_terms, minlength=len(self.vocabulary)).astype(np.int64)
+        self._dirty = True
+    
+    def get_scores(self, query: List[str]) -> np.ndarray:
+        """Dense BM25 scores for every chunk"""
+        self._ensure_ready()
+        scores = np.zeros(self.corpus_size)
+        for term_id, count in self._query_terms(query):
+            docs, contributions = self._term_contributions(term_id)
+            scores[docs] += count * contributions
+        return scores
+    
+    def get_scores_batch(self, queries: List[List[str]]) -> np.ndarray:
+        """Dense BM25 scores for several queries, shape (num_queries, corpus_size)
+        
+        Each distinct term's postings are read and scored once, then added
+        to every query in the batch that contains the term.
+        """
+        self._ensure_ready()
+        scores = np.zeros((len(queries), self.corpus_size))
+        
+        term_uses: Dict[int, List[Tuple[int, int]]] = {}
+        for row, query in enumerate(queries):
+            for term_id, count in self._query_terms(query):
+                term_uses.setdefault(term_id, []).append((row, count))
+        
+        for term_id, uses in term_uses.items():
+            docs, contributions = self._term_contributions(term_id)
+            rows = np.array([row for row, _ in uses])
+            counts = np.array([count for _, count in uses], dtype=np.float64)
+            scores[rows[:, None], docs[None, :]] += counts[:, None] * contributions[None, :]
+        
+        return scores
+    
+    def score_documents(self, query: List[str], doc_ids: np.ndarray) -> np.ndarray:
+        """BM25 scores for the given chunks only (doc_ids must be sorted)"""
+        self._ensure_ready()
+        scores = np.zeros(len(doc_ids))
+        for term_id, count in self._query_terms(query):
+            docs, contributions = self._term_contributions(term_id)
+            positions = np.searchsorted(docs, doc_ids)
+            positions[positions == len(docs)] = 0
+            found = docs[positions] == doc_ids if len(docs) else np.zeros(len(doc_ids), dtype=bool)
+            scores[found] += count * contributions[positions[found]]
+        return scores
+    
+    def min_score(self, query: List[str]) -> float:
+        """Lowest score over all chunks (0 unless every chunk has a query term)"""
+        self._ensure_ready()
+        term_ids = [term_id for term_id, _ in self._query_terms(query)]
+        if any(self.idf[term_id] < 0 for term_id in term_ids):
+            return float(self.get_scores(query).min())
+        if not term_ids or int(self.doc_freq[term_ids].sum()) < self.corpus_size:
+            return 0.0
+        
+        matched = np.unique(np.concatenate([
+            self.post_docs[self.post_offsets[t]:self.post_offsets[t + 1]] for t in term_ids
+        ]))
+        if len(matched) < self.corpus_size:
+            return 0.0
+        return float(self.get_scores(query).min())
+    
+    def top_k(self, query: List[str], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k chunks with a non-zero score, best first
+        
+        Terms are processed in decreasing order of their maximum impact.
+        Once the k-th best partial score exceeds the summed upper bounds of
+        the remaining terms, no unseen chunk can enter the top k, so the
+        remaining postings are only probed for the existing candidates, and
+        candidates that cannot reach the threshold are dropped.
+        """
+        self._ensure_ready()
+        terms = sorted(
+            self._query_terms(query),
+            key=lambda item: -self.upper_bounds[item[0]] * item[1]
+        )
+        if not terms or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        
+        if any(self.idf[term_id] < 0 for term_id, _ in terms):
+            # The epsilon floor is negative when the average IDF is (tiny or
+            # degenerate corpora); bounds no longer hold, so rank densely
+            dense_scores = self.get_scores(query)
+            k = min(k, self.corpus_size)
+            best = np.argsort(dense_scores)[::-1][:k]
+            return best, dense_scores[best]
+        
+        bounds = np.array([self.upper_bounds[term_id] * count for term_id, count in terms])
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1][1:], [0.0]])
+        
+        candidates = np.zeros(0, dtype=np.int64)
+        scores = np.zeros(0)
+        pruning = False
+        
+        for position, (term_id, count) in enumerate(terms):
+            docs, contributions = self._term_contributions(term_id)
+            contributions = count * contributions
+            
+            if not pruning:
+                # Union: every chunk in this postings list may still enter the top k
+                merged = np.concatenate([candidates, docs.astype(np.int64)])
+                candidates, inverse = np.unique(merged, return_inverse=True)
+                scores = np.bincount(inverse, weights=np.concatenate([scores, contributions]), minlength=len(candidates))
+            elif len(docs):
+                # Probe: only existing candidates can still gain score
+                positions = np.searchsorted(docs, candidates)
+                positions[positions == len(docs)] = 0
+                found = docs[positions] == candidates
+                scores[found] += contributions[positions[found]]
+            
+            if len(candidates) >= k:
+                threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+                if remaining[position] < threshold:
+                    pruning = True
+                    keep = scores + remaining[position] >= threshold
+                    candidates = candidates[keep]
+                    scores = scores[keep]
+        
+        k = min(k, len(candidates))
+        best = np.argpartition(-scores, k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return candidates[best], scores[best]
+    
+    def save(self, directory: Path):
+        """Write every array as .npy (memory-mappable) plus vocabulary and parameters"""
+        self._ensure_ready()
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        
+        for name in self.ARRAY_NAMES:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        
+        # Tokens come from str.split(), so they never contain a newline
+        words = sorted(self.vocabulary, key=self.vocabulary.get)
+        (directory / "vocabulary.txt").write_text("\n".join(words), encoding="utf-8")
+        
+        with open(directory / "params.json", "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "epsilon": self.epsilon, "avgdl": self.avgdl}, f)
+    
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        directory = Path(directory)
+        with open(directory / "params.json", "r", encoding="utf-8") as f:
+            params = json.load(f)
+        
+        index = cls(k1=params["k1"], b=params["b"], epsilon=params["epsilon"])
+        index.avgdl = params["avgdl"]
+        for name in cls.ARRAY_NAMES:
+            setattr(index, name, np.load(directory / f"{name}.npy", mmap_mode="r"))
+        
+        vocabulary_text = (directory / "vocabulary.txt").read_text(encoding="utf-8")
+        words = vocabulary_text.split("\n") if vocabulary_text else []
+        index.vocabulary = {word: term_id for term_id, word in enumerate(words)}
+        return index
+    
+    def _query_terms(self, query: List[str]) -> List[Tuple[int, int]]:
+        """Known query terms with their repeat counts (repeats add up, as in BM25Okapi)"""
+        counts: Dict[int, int] = {}
+        for word in query:
+            term_id = self.vocabulary.get(word)
+            if term_id is not None and self.doc_freq[term_id]:
+                counts[term_id] = counts.get(term_id, 0) + 1
+        return list(counts.items())
+    
+    def _term_contributions(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Chunks containing a term (sorted) and the term's score in each"""
+        start, end = self.post_offsets[term_id], self.post_offsets[term_id + 1]
+        docs = self.post_docs[start:end]
+        tfs = self.post_tfs[start:end].astype(np.float64)
+        contributions = self.idf[term_id] * (tfs * (self.k1 + 1) / (tfs + self.length_norms[docs]))
+        return docs, contributions
+    
+    def _merge_pending(self):
+        """Fold buffered (entry counts, terms, tfs, lengths) blocks into the forward index"""
+        if not self._pending:
+            return
+        
+        entry_counts, terms, tfs, lengths = (np.concatenate(parts) for parts in zip(*self._pending))
+        self._pending = []
+        
+        self.doc_offsets = np.concatenate([self.doc_offsets, self.doc_offsets[-1] + np.cumsum(entry_counts)])
+        self.doc_terms = np.concatenate([self.doc_terms, terms])
+        self.doc_tfs = np.concatenate([self.doc_tfs, tfs])
+        self.doc_len = np.concatenate([self.doc_len, lengths])
+        
+        doc_freq = np.zeros(len(self.vocabulary), dtype=np.int64)
+        doc_freq[:len(self.doc_freq)] = self.doc_freq
+        doc_freq += np.bincount(terms, minlength=len(self.vocabulary))
+        self.doc_freq = doc_freq
+    
+    def _ensure_ready(self):
+        """Recompute IDF, length norms, postings and bounds after updates"""
+        if not self._dirty:
+            return
+        
+        with self._refresh_lock:
+            if self._dirty:
+                self._refresh()
+    
+    def _refresh(self):
+        """Rebuild the derived arrays (caller holds the refresh lock)"""
+        self._merge_pending()
+        corpus_size = self.corpus_size
+        self.avgdl = float(self.doc_len.sum() / corpus_size) if corpus_size else 0.0
         
-        for pattern in self.medical_patterns:
-            matches = re.findall(pattern, text_lower, re.IGNORECASE)
-            terms.extend(matches)
+        # Okapi IDF with an epsilon floor, computed only over terms present in the corpus
+        present = self.doc_freq > 0
+        idf = np.zeros(len(self.doc_freq))
+        df = self.doc_freq[present].astype(np.float64)
+        idf[present] = np.log(corpus_size - df + 0.5) - np.log(df + 0.5)
+        if present.any():
+            average_idf = idf[present].sum() / present.sum()
+            idf[present & (idf < 0)] = self.epsilon * average_idf
+        self.idf = idf
         
-        return list(set(terms))  # Remove duplicates
+        if corpus_size:
+            self.length_norms = self.k1 * (1 - self.b + self.b * self.doc_len / self.avgdl)
+        else:
+            self.length_norms = np.zeros(0)
+        
+        # Postings: forward entries regrouped by term, chunk IDs ascending within a term
+        entry_docs = np.repeat(np.arange(corpus_size, dtype=np.int32), np.diff(self.doc_offsets))
+        order = np.argsort(self.doc_terms, kind="stable")
+        self.post_docs = entry_docs[order]
+        self.post_tfs = self.doc_tfs[order]
+        self.post_offsets = np.concatenate([[0], np.cumsum(np.bincount(self.doc_terms, minlength=len(self.doc_freq)))]).astype(np.int64)
+        
+        # Per-term maximum contribution, used to prune top-k queries
+        entry_terms = self.doc_terms[order]
+        tfs = self.post_tfs.astype(np.float64)
+        contributions = self.idf[entry_terms] * (tfs * (self.k1 + 1) / (tfs + self.length_norms[self.post_docs]))
+        upper_bounds = np.zeros(len(self.doc_freq))
+        np.maximum.at(upper_bounds, entry_terms, contributions)
+        self.upper_bounds = upper_bounds
+        
+        self._dirty = False
+
+# Query-by-chunk score entries held at once by retrieve_batch
+BATCH_SCORE_ENTRIES = 4_000_000
 
 class SimplifiedHybridRetriever:
     """Simplified hybrid search"""
     
-    def __init__(self, chunks: List[MedicalChunk]):
-        self.chunks = chunks
-        self.chunk_texts = [chunk.text for chunk in chunks]
+    def __init__(self,
+                 chunks: List[MedicalChunk],
+                 model_name: str = 'all-MiniLM-L6-v2',
+                 bm25: Optional[BM25Index] = None,
+                 embedding_store: Optional[EmbeddingStore] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 embedding_precision: str = "float32",
+                 ann_mode: str = "exact",
+                 ann_nlist: int = 0,
+                 ann_nprobe: int = 8,
+                 semantic_candidates: int = 200,
+                 ann_index: Optional[IVFIndex] = None,
+                 embedding_model: Optional[Any] = None,
+                 query_cache: Optional[LRUCache] = None,
+                 query_batcher: Optional[EmbeddingBatcher] = None):
+        self.chunks = list(chunks)
+        self.model_name = model_name
+        self.embedding_cache = embedding_cache
+        self.embedding_precision = embedding_precision
+        self.ann_mode = ann_mode  # exact or ivf
+        self.ann_nlist = ann_nlist  # 0 = about 4 * sqrt(rows)
+        self.ann_nprobe = ann_nprobe
+        self.semantic_candidates = semantic_candidates
+        self.query_cache = query_cache  # query string -> embedding
+        self.query_batcher = query_batcher  # coalesces concurrent query encodings
         
-        # Initialize BM25
-        tokenized_corpus = [text.lower().split() for text in self.chunk_texts]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        # Initialize BM25 (reuse the prebuilt index from a snapshot if given)
+        if bm25 is None:
+            tokenized_corpus = [chunk.text_lower.split() for chunk in self.chunks]
+            bm25 = BM25Index.build(tokenized_corpus)
+        self.bm25 = bm25
         
-        # Initialize semantic embeddings
+        # Initialize semantic embeddings (normalized, optionally reduced precision)
         try:
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-            self.embeddings = self.embedding_model.encode(self.chunk_texts)
+            self.embedding_model = embedding_model or load_sentence_transformer(model_name)
+            if embedding_store is None:
+                embedding_store = self._build_embedding_store(self._encode_texts([chunk.text for chunk in self.chunks]))
+            self.embedding_store = embedding_store
         except Exception as e:
             logger.warning(f"Could not load embedding model: {e}")
             self.embedding_model = None
-            self.embeddings = None
+            self.embedding_store = None
         
-    def retrieve(self, query: str, top_k: int = 10, bm25_weight: float = 0.4) -> List[RetrievalResult]:
-        """Hybrid retrieval"""
-        results = []
+        self.ann_index = self._prepare_ann_index(ann_index)
+        
+    def add_chunks(self, chunks: List[MedicalChunk]):
+        """Index new chunks in place, embedding only their text"""
+        if not chunks:
+            return
+        
+        # Extend BM25 term statistics
+        self.bm25.add_documents([chunk.text_lower.split() for chunk in chunks])
+        
+        # Embed only the new chunks
+        if self.embedding_model and self.embedding_store is not None:
+            first_new_row = len(self.embedding_store)
+            self.embedding_store = self.embedding_store.append(self._encode_texts([chunk.text for chunk in chunks]))
+            if self.ann_index is not None:
+                self.ann_index.add(self.embedding_store, np.arange(first_new_row, len(self.embedding_store)))
+        
+        self.chunks.extend(chunks)
+    
+    def remove_document(self, source_doc: str) -> int:
+        """Drop every chunk of a document from the index, returning how many were removed"""
+        keep = [i for i, chunk in enumerate(self.chunks) if chunk.source_doc != source_doc]
+        removed = len(self.chunks) - len(keep)
+        if not removed:
+            return 0
+        
+        self.bm25.remove_documents(np.array(keep, dtype=np.int64))
+        if self.embedding_store is not None:
+            self.embedding_store = self.embedding_store.take(keep)
+        if self.ann_index is not None:
+            self.ann_index = self.ann_index.take(keep)
+        
+        self.chunks = [self.chunks[i] for i in keep]
+        
+        return removed
+    
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed chunk texts, reusing cached vectors for text seen before"""
+        if not self.embedding_cache:
+            return self.embedding_model.encode(texts)
+        
+        embeddings = self.embedding_cache.encode(texts, self.embedding_model.encode)
+        self.embedding_cache.save()
+        logger.info(f"Embedding cache: {self.embedding_cache.stats()}")
+        return embeddings
+    
+    def _encode_query(self, query: str) -> np.ndarray:
+        """Embed a query, reusing the embedding of an identical earlier query"""
+        return self._encode_queries([query])
+    
+    def _encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed queries with one model call for those not in the query cache"""
+        encode = self.query_batcher.encode if self.query_batcher else self.embedding_model.encode
+        if self.query_cache is None:
+            return np.asarray(encode(queries), dtype=np.float32)
         
-        # BM25 scores
+        embeddings: Dict[str, np.ndarray] = {}
+        for query in queries:
+            cached = self.query_cache.get(query)
+            if cached is not None:
+                embeddings[query] = cached
+        
+        missing = [query for query in dict.fromkeys(queries) if query not in embeddings]
+        if missing:
+            new_embeddings = np.asarray(encode(missing), dtype=np.float32)
+            for query, embedding in zip(missing, new_embeddings):
+                embedding.setflags(write=False)
+                self.query_cache.put(query, embedding)
+                embeddings[query] = embedding
+        
+        return np.stack([embeddings[query] for query in queries])
+    
+    def sentence_similarities(self, sentences: List[str], indices: List[int]) -> Optional[np.ndarray]:
+        """Cosine similarity (sentences, chunks) of sentences against stored chunk embeddings
+        
+        The sentences are embedded in one call (sharing the query batcher,
+        but not the query cache); the chunks' existing rows are scored with
+        one matrix product. None when there are no embeddings.
+        """
+        if not self.embedding_model or self.embedding_store is None:
+            return None
+        
+        encode = self.query_batcher.encode if self.query_batcher else self.embedding_model.encode
+        sentence_embeddings = np.asarray(encode(sentences), dtype=np.float32)
+        return self.embedding_store.scores(sentence_embeddings, rows=np.asarray(indices, dtype=np.int64))
+    
+    def _build_embedding_store(self, embeddings: np.ndarray) -> EmbeddingStore:
+        """Store embeddings at the configured precision, logging the ranking cost"""
+        store = EmbeddingStore.from_array(embeddings, self.embedding_precision)
+        
+        if self.embedding_precision != "float32" and len(store):
+            recall = measure_precision_recall(embeddings, store)
+            logger.info(f"{self.embedding_precision} embeddings: recall@10 vs float32 = {recall:.3f}")
+        
+        return store
+    
+    def _prepare_ann_index(self, ann_index: Optional[IVFIndex]) -> Optional[IVFIndex]:
+        """Reuse a compatible ANN index or build one when ANN mode is enabled"""
+        if self.ann_mode != "ivf" or self.embedding_store is None or not len(self.embedding_store):
+            return None
+        
+        if (ann_index is not None
+                and len(ann_index.assignments) == len(self.embedding_store)
+                and (not self.ann_nlist or ann_index.nlist == self.ann_nlist)):
+            ann_index.nprobe = self.ann_nprobe
+            return ann_index
+        
+        return IVFIndex.build(self.embedding_store, nlist=self.ann_nlist, nprobe=self.ann_nprobe)
+    
+    def _semantic_scores(self, query_embedding: np.ndarray) -> np.ndarray:
+        """Cosine similarity against every chunk, or against the ANN candidates"""
+        if self.ann_index is None:
+            return self.embedding_store.scores(query_embedding)[0]
+        
+        rows, scores = self.ann_index.search(self.embedding_store, query_embedding, self.semantic_candidates)
+        if not len(rows):
+            return self.embedding_store.scores(query_embedding)[0]
+        
+        # Chunks outside the candidate set rank with the weakest candidate
+        semantic_scores = np.full(len(self.chunks), scores.min(), dtype=np.float32)
+        semantic_scores[rows] = scores
+        return semantic_scores
+    
+    def retrieve(self, query: str, top_k: int = 10, bm25_weight: float = 0.4,
+                 positions: Optional[np.ndarray] = None) -> List[RetrievalResult]:
+        """Hybrid retrieval, over all chunks or only the given (sorted) chunk positions"""
         tokenized_query = query.lower().split()
-        bm25_scores = self.bm25.get_scores(tokenized_query)
+        if positions is not None:
+            return self._retrieve_positions(query, tokenized_query, positions, top_k, bm25_weight)
         
-        if self.embedding_model and self.embeddings is not None:
+        if self.embedding_model and self.embedding_store is not None:
             # Semantic scores
-            query_embedding = self.embedding_model.encode([query])
-            semantic_scores = cosine_similarity(query_embedding, self.embeddings)[0]
+            with stage("query_embedding"):
+                query_embedding = self._encode_query(query)
+            with stage("semantic_scores"):
+                semantic_scores = self._semantic_scores(query_embedding)
             
-            # Normalize scores
-            bm25_scores = (bm25_scores - np.min(bm25_scores)) / (np.max(bm25_scores) - np.min(bm25_scores) + 1e-8)
-            semantic_scores = (semantic_scores - np.min(semantic_scores)) / (np.max(semantic_scores) - np.min(semantic_scores) + 1e-8)
-            
-            # Combine scores
-            combined_scores = bm25_weight * bm25_scores + (1 - bm25_weight) * semantic_scores
+            # Fuse with BM25 over the candidate chunks only
+            with stage("hybrid_fusion"):
+                top_indices, top_scores = self._fuse_scores(tokenized_query, semantic_scores, top_k, bm25_weight)
         else:
             # Use only BM25 if embeddings not available
-            combined_scores = bm25_scores
+            with stage("bm25"):
+                top_indices, top_scores = self._bm25_top_k(tokenized_query, top_k)
+        
+        return self._to_results(top_indices, top_scores)
+    
+    def retrieve_batch(self, queries: List[str], top_k: int = 10, bm25_weight: float = 0.4,
+                       positions: Optional[np.ndarray] = None) -> List[List[RetrievalResult]]:
+        """Hybrid retrieval for many queries, returning one result list per query
+        
+        All queries are embedded in one model call and scored against the
+        embedding matrix with one matrix multiply per block of queries; BM25
+        postings are read once per distinct term in the block. With
+        ``positions`` (sorted chunk positions, a metadata filter) only those
+        rows are scored, exactly, as in retrieve(). Scores equal
+        those of calling retrieve() for each query up to floating-point
+        rounding (the matrix product sums in a different order), so
+        near-tied chunks may come back in a different order.
+        """
+        if not queries:
+            return []
         
-        # Get top results
-        top_indices = np.argsort(combined_scores)[::-1][:top_k]
+        tokenized_queries = [query.lower().split() for query in queries]
+        if not (self.embedding_model and self.embedding_store is not None):
+            if positions is not None:
+                return [self._retrieve_positions(query, tokens, positions, top_k, bm25_weight)
+                        for query, tokens in zip(queries, tokenized_queries)]
+            return [self._to_results(*self._bm25_top_k(tokens, top_k)) for tokens in tokenized_queries]
         
-        for idx in top_indices:
-            result = RetrievalResult(
+        searchable = len(self.chunks) if positions is None else len(positions)
+        if not searchable:
+            return [[] for _ in queries]
+        
+        with stage("query_embedding"):
+            query_embeddings = self._encode_queries(queries)
+        top_k = min(top_k, searchable)
+        
+        # Queries per block, keeping the dense score matrices bounded
+        block_size = max(1, BATCH_SCORE_ENTRIES // searchable)
+        
+        results = []
+        for start in range(0, len(queries), block_size):
+            block_embeddings = query_embeddings[start:start + block_size]
+            block_tokens = tokenized_queries[start:start + block_size]
+            if positions is not None:
+                semantic_scores = self.embedding_store.scores(block_embeddings, rows=positions)
+                bm25_scores = np.stack([self.bm25.score_documents(tokens, positions) for tokens in block_tokens])
+            elif self.ann_index is None:
+                semantic_scores = self.embedding_store.scores(block_embeddings)
+                bm25_scores = self.bm25.get_scores_batch(block_tokens)
+            else:
+                semantic_scores = np.stack([self._semantic_scores(embedding[None, :]) for embedding in block_embeddings])
+                bm25_scores = self.bm25.get_scores_batch(block_tokens)
+            
+            fused = self._fuse_dense(bm25_scores, semantic_scores, bm25_weight)
+            for row_scores in fused:
+                best = np.argpartition(-row_scores, top_k - 1)[:top_k] if top_k else np.zeros(0, dtype=np.int64)
+                # Best first; exact ties go to the later chunk
+                best = best[np.lexsort((-best, -row_scores[best]))]
+                results.append(self._to_results(best if positions is None else positions[best], row_scores[best]))
+        
+        return results
+    
+    def _retrieve_positions(self,
+                            query: str,
+                            tokenized_query: List[str],
+                            positions: np.ndarray,
+                            top_k: int,
+                            bm25_weight: float) -> List[RetrievalResult]:
+        """Hybrid retrieval restricted to a subset of chunks (a metadata filter)
+        
+        BM25 and cosine scores are computed for the subset only, and both
+        legs are min-max normalized over it, as if the subset were the
+        whole corpus. The ANN index is not used: the subset is scored
+        exactly.
+        """
+        top_k = min(top_k, len(positions))
+        if not top_k:
+            return []
+        
+        with stage("bm25"):
+            scores = self.bm25.score_documents(tokenized_query, positions)
+        if self.embedding_model and self.embedding_store is not None:
+            with stage("query_embedding"):
+                query_embedding = self._encode_query(query)
+            with stage("semantic_scores"):
+                semantic_scores = self.embedding_store.scores(query_embedding, rows=positions)
+            with stage("hybrid_fusion"):
+                scores = self._fuse_dense(scores[None, :], semantic_scores, bm25_weight)[0]
+        
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        # Best first; ties go to the later chunk, as in retrieve()
+        best = best[np.lexsort((-best, -scores[best]))]
+        return self._to_results(positions[best], scores[best])
+    
+    def _to_results(self, indices: np.ndarray, scores: np.ndarray) -> List[RetrievalResult]:
+        return [
+            RetrievalResult(
                 chunk=self.chunks[idx],
-                score=float(combined_scores[idx]),
-                retrieval_method="hybrid" if self.embedding_model else "bm25"
+                score=float(score),
+                retrieval_method="hybrid" if self.embedding_model else "bm25",
+                index=int(idx)
             )
-            results.append(result)
+            for idx, score in zip(indices, scores)
+        ]
+    
+    @staticmethod
+    def _fuse_dense(bm25_scores: np.ndarray, semantic_scores: np.ndarray, bm25_weight: float) -> np.ndarray:
+        """Row-wise min-max normalize both (queries, chunks) score matrices and combine them"""
+        bm25_min = bm25_scores.min(axis=1, keepdims=True)
+        bm25_max = bm25_scores.max(axis=1, keepdims=True)
+        semantic_min = semantic_scores.min(axis=1, keepdims=True)
+        semantic_max = semantic_scores.max(axis=1, keepdims=True)
         
-        return results
+        bm25_part = (bm25_scores - bm25_min) / (bm25_max - bm25_min + 1e-8)
+        semantic_part = (semantic_scores - semantic_min) / (semantic_max - semantic_min + 1e-8)
+        return bm25_weight * bm25_part + (1 - bm25_weight) * semantic_part
+    
+    def _bm25_top_k(self, tokenized_query: List[str], top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 top-k, padded with zero-score chunks when fewer chunks match"""
+        top_indices, top_scores = self.bm25.top_k(tokenized_query, top_k)
+        
+        missing = min(top_k, len(self.chunks)) - len(top_indices)
+        if missing > 0:
+            unmatched = np.setdiff1d(np.arange(len(self.chunks)), top_indices)[:missing]
+            top_indices = np.concatenate([top_indices, unmatched])
+            top_scores = np.concatenate([top_scores, np.zeros(len(unmatched))])
+        
+        return top_indices, top_scores
+    
+    def _fuse_scores(self,
+                     tokenized_query: List[str],
+                     semantic_scores: np.ndarray,
+                     top_k: int,
+                     bm25_weight: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Min-max normalize both legs and combine them
+        
+        Only the BM25 top-n and semantic top-n chunks are scored. n grows
+        until the k-th fused score is at least the best score any chunk
+        outside the candidates could reach (threshold algorithm), so the
+        result equals fusing the full dense score arrays.
+        """
+        total = len(self.chunks)
+        top_k = min(top_k, total)
+        
+        semantic_min, semantic_max = float(np.min(semantic_scores)), float(np.max(semantic_scores))
+        bm25_min = self.bm25.min_score(tokenized_query)
+        
+        def fuse(bm25_scores, semantic):
+            bm25_part = (bm25_scores - bm25_min) / (bm25_max - bm25_min + 1e-8)
+            semantic_part = (semantic - semantic_min) / (semantic_max - semantic_min + 1e-8)
+            return bm25_weight * bm25_part + (1 - bm25_weight) * semantic_part
+        
+        depth = max(4 * top_k, 50)
+        while True:
+            depth = min(depth, total)
+            bm25_top, bm25_top_scores = self.bm25.top_k(tokenized_query, depth)
+            bm25_max = max(float(bm25_top_scores[0]), bm25_min) if len(bm25_top) else bm25_min
+            
+            semantic_top = np.argpartition(-semantic_scores, depth - 1)[:depth]
+            candidates = np.union1d(bm25_top, semantic_top)
+            combined = fuse(self.bm25.score_documents(tokenized_query, candidates), semantic_scores[candidates])
+            
+            if len(candidates) == total:
+                break
+            
+            # Best fused score a chunk outside both candidate lists could have
+            bm25_cutoff = float(bm25_top_scores[-1]) if len(bm25_top) == depth else bm25_min
+            semantic_cutoff = float(semantic_scores[semantic_top].min())
+            outside_bound = fuse(bm25_cutoff, semantic_cutoff)
+            
+            kth_score = np.partition(combined, len(combined) - top_k)[len(combined) - top_k]
+            if kth_score >= outside_bound:
+                break
+            depth *= 4
+        
+        best = np.argsort(combined)[::-1][:top_k]
+        return candidates[best], combined[best]
+
+# "lexical" checks key-word overlap; "semantic" compares sentence embeddings
+# with the stored embeddings of the retrieved chunks
+VERIFICATION_MODES = ("lexical", "semantic")
 
 class SimplifiedVerifier:
     """Simplified verification system"""
     
-    def __init__(self, chunks: List[MedicalChunk]):
+    def __init__(self,
+                 chunks: List[MedicalChunk],
+                 retriever: Optional[SimplifiedHybridRetriever] = None,
+                 mode: str = "lexical",
+                 similarity_threshold: float = 0.6):
+        if mode not in VERIFICATION_MODES:
+            raise ValueError(f"Unsupported verification mode: {mode}")
+        
         self.chunks = chunks
-        self.chunk_texts = [chunk.text.lower() for chunk in chunks]
+        self.retriever = retriever
+        self.mode = mode
+        self.similarity_threshold = similarity_threshold  # cosine similarity that counts as support
+        
+    def verify_response(self,
+                        response: str,
+                        retrieved_chunks: List[MedicalChunk],
+                        retrieved_indices: Optional[List[Optional[int]]] = None) -> Dict[str, Any]:
+        """Verify each response sentence against the retrieved chunks
         
-    def verify_response(self, response: str, retrieved_chunks: List[MedicalChunk]) -> Dict[str, Any]:
-        """Simple verification based on text overlap"""
+        ``retrieved_indices`` are the retriever rows of the retrieved
+        chunks; semantic mode needs them to reuse the stored embeddings and
+        falls back to lexical overlap without them. In small-to-big mode
+        the rows are the matched child chunks and the labels name their
+        parents.
+        """
         sentences = self._extract_sentences(response)
         
-        verified_facts = []
-        unverified_facts = []
+        similarities = None
+        if self.mode == "semantic" and sentences and retrieved_chunks and self.retriever is not None \
+                and retrieved_indices is not None and None not in retrieved_indices:
+            with stage("verification_embedding"):
+                similarities = self.retriever.sentence_similarities(sentences, retrieved_indices)
         
-        for sentence in sentences:
-            if self._verify_sentence(sentence, retrieved_chunks):
-                verified_facts.append(sentence)
-            else:
-                unverified_facts.append(sentence)
+        if similarities is not None:
+            method = "semantic"
+            best = similarities.argmax(axis=1)
+            scores = similarities[np.arange(len(sentences)), best]
+            supported = scores >= self.similarity_threshold
+        else:
+            method = "lexical"
+            with stage("verification_lexical"):
+                scores, best, supported = self._lexical_support(sentences, retrieved_chunks)
+        
+        verified_facts = [sentence for sentence, ok in zip(sentences, supported) if ok]
+        unverified_facts = [sentence for sentence, ok in zip(sentences, supported) if not ok]
         
         overall_score = len(verified_facts) / len(sentences) if sentences else 0
         
@@ -160,12 +847,23 @@ class SimplifiedVerifier:
             risk = "medium"
         else:
             risk = "high"
+        HALLUCINATION_RISK.inc(risk=risk)
         
         return {
             "overall_score": overall_score,
             "verified_facts": verified_facts,
             "unverified_facts": unverified_facts,
-            "hallucination_risk": risk
+            "hallucination_risk": risk,
+            "method": method,
+            "sentences": [
+                {
+                    "sentence": sentence,
+                    "supported": bool(ok),
+                    "score": round(float(score), 4),
+                    "chunk_id": retrieved_chunks[position].id if retrieved_chunks else None
+                }
+                for sentence, ok, score, position in zip(sentences, supported, scores, best)
+            ]
         }
     
     def _extract_sentences(self, text: str) -> List[str]:
@@ -173,142 +871,963 @@ class SimplifiedVerifier:
         sentences = text.split('. ')
         return [s.strip() for s in sentences if len(s.strip()) > 10]
     
-    def _verify_sentence(self, sentence: str, chunks: List[MedicalChunk]) -> bool:
-        """Verify if sentence is supported by chunks"""
-        sentence_lower = sentence.lower()
+    def _lexical_support(self, sentences: List[str], chunks: List[MedicalChunk]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Per sentence: best fraction of key words found, position of that chunk, supported flag
         
-        # Extract key terms from sentence
-        words = sentence_lower.split()
-        key_words = [w for w in words if len(w) > 3]
+        A sentence is supported when at least 50% of its key words (words
+        longer than 3 characters) occur as whole words in one chunk. Chunk
+        words are the sorted token ids stored in the chunk table at index
+        time, so all sentences are checked against all chunks with one
+        vectorized membership test instead of substring scans.
+        """
+        key_words = [[word for word in word_tokens(sentence) if len(word) > 3] for sentence in sentences]
+        fractions = np.zeros(len(sentences))
+        best_positions = np.zeros(len(sentences), dtype=np.int64)
+        checked = [i for i, words in enumerate(key_words) if words]
+        if not checked or not chunks:
+            return fractions, best_positions, np.zeros(len(sentences), dtype=bool)
         
-        if not key_words:
-            return False
+        lengths = np.array([len(key_words[i]) for i in checked])
+        offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        words = [word for i in checked for word in key_words[i]]
         
-        # Check if enough key words appear in any chunk
-        for chunk in chunks:
-            chunk_text = chunk.text.lower()
-            matches = sum(1 for word in key_words if word in chunk_text)
-            if matches >= len(key_words) * 0.5:  # At least 50% of key words
-                return True
+        best = np.full(len(checked), -1, dtype=np.int64)
+        tables: Dict[int, List[int]] = {}
+        for position, chunk in enumerate(chunks):
+            tables.setdefault(id(chunk.table), []).append(position)
+        
+        for positions in tables.values():
+            table_chunks = [chunks[position] for position in positions]
+            table = table_chunks[0].table
+            vocabulary = len(table.tokens)
+            
+            # Look up each distinct word once
+            distinct: Dict[str, int] = {}
+            inverse = np.array([distinct.setdefault(word, len(distinct)) for word in words])
+            word_ids = np.array([table.tokens.lookup(word) for word in distinct], dtype=np.int64)
+            
+            # Keys (chunk position, token id) are sorted because each chunk's token ids are,
+            # so membership of every (chunk, word) pair is one searchsorted
+            chunk_keys = np.concatenate([
+                position * vocabulary + chunk.token_ids.astype(np.int64)
+                for position, chunk in enumerate(table_chunks)
+            ])
+            query_keys = np.arange(len(table_chunks))[:, None] * vocabulary + word_ids[None, :]
+            slots = np.minimum(np.searchsorted(chunk_keys, query_keys), max(len(chunk_keys) - 1, 0))
+            found = (chunk_keys[slots] == query_keys) & (word_ids >= 0) if len(chunk_keys) else np.zeros(query_keys.shape, dtype=bool)
+            
+            # (chunks, sentences) matched key words, then the best chunk per sentence
+            matches = np.add.reduceat(found[:, inverse].astype(np.int64), offsets, axis=1)
+            improved = matches.max(axis=0) > best
+            best[improved] = matches.max(axis=0)[improved]
+            best_positions[np.asarray(checked)[improved]] = np.asarray(positions)[matches.argmax(axis=0)[improved]]
         
-        return False
+        fractions[checked] = best / lengths
+        return fractions, best_positions, fractions >= 0.5
+
+_worker_extractor: Optional[SimplifiedMedicalExtractor] = None
+
+def _extract_page_range(pdf_path: str, start_page: int, end_page: int) -> List[Tuple[int, str, List[str], List[Tuple[Tuple[int, ...], str]]]]:
+    """Extract (page number, text, medical terms, section headings) for a page range
+    
+    Module-level so it can run in a worker process.
+    """
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = SimplifiedMedicalExtractor()
+    
+    pages = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start_page, end_page):
+            text = doc.load_page(page_num).get_text()
+            
+            if len(text.strip()) < 50:
+                continue
+            
+            pages.append((page_num + 1, text, _worker_extractor.extract_medical_terms(text), find_section_headings(text)))
+    
+    return pages
+
+# "all" indexes parent and child chunks; "small_to_big" indexes only child
+# chunks and expands hits to their parents at result time
+RETRIEVAL_MODES = ("all", "small_to_big")
+
+def _response_header(query: str) -> str:
+    """First line of a generated response, quoting the query"""
+    return f'Based on the cardiovascular guidelines, here is the relevant information for your query: "{query}"'
 
 class SimplifiedMedGraphRAG:
     """Simplified MedGraphRAG system"""
     
-    def __init__(self):
+    def __init__(self,
+                 parent_chunk_size: int = 1200,
+                 child_chunk_size: int = 300,
+                 embedding_model_name: str = 'all-MiniLM-L6-v2',
+                 snapshot_dir: Optional[Path] = None,
+                 ingest_workers: Optional[int] = None,
+                 pages_per_task: int = 50,
+                 embedding_cache_dir: Optional[Path] = None,
+                 embedding_cache_max_bytes: int = 512 * 1024 * 1024,
+                 embedding_precision: str = "float32",
+                 ann_mode: str = "exact",
+                 ann_nlist: int = 0,
+                 ann_nprobe: int = 8,
+                 semantic_candidates: int = 200,
+                 embed_batch_size: int = 256,
+                 pipeline_queue_size: int = 4,
+                 result_cache_size: int = 256,
+                 result_cache_ttl: Optional[float] = 600.0,
+                 query_cache_size: int = 1024,
+                 query_batch_size: int = 32,
+                 query_batch_wait_ms: float = 5.0,
+                 retrieval_mode: str = "all",
+                 parent_oversample: int = 3,
+                 verification_mode: str = "lexical",
+                 verification_similarity: float = 0.6,
+                 embedding_model: Optional[Any] = None,
+                 slow_query_log: Optional[SlowQueryLog] = None,
+                 read_only: bool = False):
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unsupported retrieval mode: {retrieval_mode}")
+        if verification_mode not in VERIFICATION_MODES:
+            raise ValueError(f"Unsupported verification mode: {verification_mode}")
+        
         self.chunks: List[MedicalChunk] = []
+        self.parent_chunks: Dict[str, MedicalChunk] = {}  # side store of parents in small-to-big mode
+        self.text_store = TextStore()  # document text; chunks hold byte spans into it
+        self.chunk_table = ChunkTable()  # chunk metadata columns; chunks are views of its rows
         self.medical_extractor = SimplifiedMedicalExtractor()
         self.retriever: Optional[SimplifiedHybridRetriever] = None
         self.verifier: Optional[SimplifiedVerifier] = None
+        self.metadata_index = MetadataIndex([])  # filter masks over self.chunks
+        self.parent_chunk_size = parent_chunk_size
+        self.child_chunk_size = child_chunk_size
+        self.embedding_model_name = embedding_model_name
+        self.snapshot = IndexSnapshot(snapshot_dir) if snapshot_dir else None
+        self.ingest_workers = ingest_workers  # None = one process per CPU, 1 = in-process
+        self.pages_per_task = pages_per_task
+        self.pdf_directory: Optional[Path] = None
+        self.embedding_precision = embedding_precision  # float32, float16 or int8
+        self.ann_settings = {
+            "ann_mode": ann_mode,
+            "ann_nlist": ann_nlist,
+            "ann_nprobe": ann_nprobe,
+            "semantic_candidates": semantic_candidates
+        }
+        self.embedding_cache = (
+            EmbeddingCache(embedding_cache_dir, embedding_model_name, embedding_cache_max_bytes)
+            if embedding_cache_dir else None
+        )
+        self.embed_batch_size = embed_batch_size  # chunks per embedding batch during ingestion
+        self.pipeline_queue_size = pipeline_queue_size  # batches buffered between ingest stages
+        self.ingest_progress: Dict[str, Any] = {"state": "idle"}
+        self._embedding_model: Optional[Any] = embedding_model  # any object with encode(texts); loaded by name if None
+        self.query_batch_size = query_batch_size  # 1 disables micro-batching of query encodings
+        self.query_batch_wait_ms = query_batch_wait_ms
+        self.query_batcher: Optional[EmbeddingBatcher] = None
+        self.retrieval_mode = retrieval_mode
+        self.parent_oversample = parent_oversample  # child hits fetched per requested parent
+        self.verification_mode = verification_mode
+        self.verification_similarity = verification_similarity  # semantic mode support threshold
+        self.slow_query_log = slow_query_log  # searches over its threshold are traced to a JSONL file
+        self.read_only = read_only  # attach to a prebuilt snapshot; never ingest or write it (multi-worker serving)
+        self._snapshot_manifest: Optional[Dict[str, Any]] = None  # manifest of the snapshot this index was loaded from or saved to
+        
+        # Bumped whenever the indexed corpus changes; both caches clear themselves on a bump
+        self.index_version = 0
+        self.query_embedding_cache = LRUCache(
+            query_cache_size, version_source=lambda: self.index_version, name="query embedding cache"
+        )
+        self.result_cache = LRUCache(
+            result_cache_size, result_cache_ttl, version_source=lambda: self.index_version,
+            copy_values=True, name="result cache"
+        )
         
+    @classmethod
+    def from_environment(cls, embedding_model: Optional[Any] = None) -> "SimplifiedMedGraphRAG":
+        """Create a system configured from environment variables
+        
+        Pass the embedding model of a running system to share it instead of
+        loading a second copy (rebuilding the index next to the served one).
+        """
+        return cls(
+            snapshot_dir=Path(os.environ.get("INDEX_SNAPSHOT_DIR", "index_snapshot")),
+            embedding_cache_dir=Path(os.environ.get("EMBEDDING_CACHE_DIR", "embedding_cache")),
+            embedding_cache_max_bytes=int(os.environ.get("EMBEDDING_CACHE_MAX_MB", "512")) * 1024 * 1024,
+            embedding_precision=os.environ.get("EMBEDDING_PRECISION", "float32"),
+            ann_mode=os.environ.get("ANN_MODE", "exact"),
+            ann_nlist=int(os.environ.get("ANN_NLIST", "0")),
+            ann_nprobe=int(os.environ.get("ANN_NPROBE", "8")),
+            semantic_candidates=int(os.environ.get("ANN_CANDIDATES", "200")),
+            embed_batch_size=int(os.environ.get("INGEST_BATCH_SIZE", "256")),
+            result_cache_size=int(os.environ.get("SEARCH_CACHE_SIZE", "256")),
+            result_cache_ttl=float(os.environ.get("SEARCH_CACHE_TTL", "600")),
+            query_cache_size=int(os.environ.get("QUERY_CACHE_SIZE", "1024")),
+            query_batch_size=int(os.environ.get("QUERY_BATCH_SIZE", "32")),
+            query_batch_wait_ms=float(os.environ.get("QUERY_BATCH_WAIT_MS", "5")),
+            retrieval_mode=os.environ.get("RETRIEVAL_MODE", "all"),
+            verification_mode=os.environ.get("VERIFICATION_MODE", "lexical"),
+            verification_similarity=float(os.environ.get("VERIFICATION_SIMILARITY", "0.6")),
+            slow_query_log=SlowQueryLog.from_environment(),
+            read_only=os.environ.get("INDEX_READ_ONLY", "").lower() in ("1", "true", "yes"),
+            embedding_model=embedding_model
+        )
+    
     async def initialize_system(self, pdf_directory: Path):
         """Initialize the system"""
         logger.info("Initializing Simplified MedGraphRAG system...")
+        self.pdf_directory = pdf_directory
         
-        # Process PDFs
-        await self._process_pdfs(pdf_directory)
+        if self.read_only:
+            await self._attach_snapshot()
+            return
         
-        # Initialize retriever and verifier
-        if self.chunks:
-            self.retriever = SimplifiedHybridRetriever(self.chunks)
-            self.verifier = SimplifiedVerifier(self.chunks)
+        # Hashing the PDFs, reading the snapshot and loading the model block; keep them off the event loop
+        fingerprint = None
+        if self.snapshot:
+            fingerprint = await asyncio.to_thread(
+                compute_fingerprint, pdf_directory, self._index_settings(), self.embedding_model_name
+            )
+            if self.snapshot.is_valid(fingerprint) and await asyncio.to_thread(self._load_snapshot):
+                self.index_version += 1
+                logger.info(f"System initialized from snapshot with {len(self.chunks)} chunks")
+                return
+        
+        # Stream PDFs through chunking, embedding and indexing
+        await self._ingest_documents(sorted(pdf_directory.glob("*.pdf")), fingerprint)
+        self.index_version += 1
         
         logger.info(f"System initialized with {len(self.chunks)} chunks")
     
-    async def _process_pdfs(self, pdf_directory: Path):
-        """Process PDFs with hierarchical chunking"""
-        for pdf_path in pdf_directory.glob("*.pdf"):
-            logger.info(f"Processing {pdf_path.name}")
-            
+    async def _attach_snapshot(self):
+        """Load the snapshot a build step wrote, as is (read-only serving)
+        
+        The PDFs are not hashed and nothing is ingested or written: every
+        worker maps the same files, so the page cache holds one copy of
+        the text, chunk columns, BM25 postings and embeddings.
+        """
+        if not self.snapshot or not self.snapshot.is_current():
+            raise RuntimeError("INDEX_READ_ONLY is set but there is no current index snapshot - run build.py first")
+        if not await asyncio.to_thread(self._load_snapshot):
+            raise RuntimeError("Could not load the index snapshot")
+        
+        self.index_version += 1
+        logger.info(f"Attached read-only to index snapshot with {len(self.chunks)} chunks")
+    
+    async def initialize_copy(self, source: "SimplifiedMedGraphRAG"):
+        """Load a private, writable copy of another system's index
+        
+        Used to apply a document update to a new generation while ``source``
+        keeps serving. The copy is read from the snapshot, whose memory maps
+        are copy-on-write, so changing it never touches the arrays of
+        ``source``. If the snapshot holds another index (a rebuild or update
+        that failed validation wrote it), ``source`` writes it out again
+        first. Without a snapshot the PDF directory is ingested again.
+        """
+        self._check_writable()
+        self.pdf_directory = source.pdf_directory
+        
+        # Nothing indexed yet: the copy starts empty
+        if source.chunks and not self.snapshot:
+            await self._ingest_documents(sorted(self.pdf_directory.glob("*.pdf")))
+        elif source.chunks:
+            if not source.holds_snapshot():
+                fingerprint = (source._snapshot_manifest or {}).get("fingerprint", {})
+                await asyncio.to_thread(source._save_snapshot, fingerprint)
+                if not source.holds_snapshot():
+                    raise RuntimeError("Could not write the served index to the snapshot")
+            if not await asyncio.to_thread(self._load_snapshot):
+                raise RuntimeError("Could not load the index snapshot")
+        
+        self.index_version += 1
+        logger.info(f"Copied index with {len(self.chunks)} chunks for an update")
+    
+    def holds_snapshot(self) -> bool:
+        """Whether the snapshot on disk is the one this index was loaded from or last saved to"""
+        return bool(self.snapshot) and self._snapshot_manifest is not None and self.snapshot.read_manifest() == self._snapshot_manifest
+    
+    def snapshot_is_current(self, pdf_directory: Path) -> bool:
+        """Whether the snapshot matches the PDFs and settings (hashes every PDF)"""
+        fingerprint = compute_fingerprint(pdf_directory, self._index_settings(), self.embedding_model_name)
+        return bool(self.snapshot) and self.snapshot.is_valid(fingerprint)
+    
+    async def add_document(self, pdf_path: Path) -> Dict[str, Any]:
+        """Add a guideline PDF, replacing any indexed document with the same name
+        
+        Only the new document is parsed and embedded; BM25 statistics and the
+        embedding matrix are updated in place, so a system that is being
+        served is updated through a copy (``initialize_copy``). Extraction,
+        embedding and the snapshot write run in worker threads, keeping the
+        event loop free.
+        """
+        self._check_writable()
+        if self.pdf_directory is None:
+            self.pdf_directory = pdf_path.parent
+        
+        removed = await asyncio.to_thread(self._remove_document_chunks, pdf_path.name)
+        new_chunks = self._route_chunks(await self._process_pdfs([pdf_path], self.text_store, self.chunk_table), self.parent_chunks)
+        
+        if new_chunks:
+            self.chunks.extend(new_chunks)
+            if self.retriever:
+                await asyncio.to_thread(self.retriever.add_chunks, new_chunks)
+            else:
+                self.retriever = await asyncio.to_thread(self._build_retriever)
+        
+        await self._after_document_update()
+        logger.info(f"{'Replaced' if removed else 'Added'} {pdf_path.name}: {len(new_chunks)} chunks indexed")
+        
+        return {
+            "document": pdf_path.name,
+            "action": "replaced" if removed else "added",
+            "chunks_added": len(new_chunks),
+            "chunks_removed": removed,
+            "total_chunks": len(self.chunks)
+        }
+    
+    async def remove_document(self, source_doc: str) -> Dict[str, Any]:
+        """Remove a guideline PDF from the index (in place) without a full rebuild"""
+        self._check_writable()
+        removed = await asyncio.to_thread(self._remove_document_chunks, source_doc)
+        if removed:
+            await self._after_document_update()
+            logger.info(f"Removed {source_doc}: {removed} chunks")
+        
+        return {
+            "document": source_doc,
+            "action": "removed" if removed else "not_found",
+            "chunks_removed": removed,
+            "total_chunks": len(self.chunks)
+        }
+    
+    def _remove_document_chunks(self, source_doc: str) -> int:
+        """Drop a document's chunks from the chunk list and the retriever"""
+        remaining = [chunk for chunk in self.chunks if chunk.source_doc != source_doc]
+        removed = len(self.chunks) - len(remaining)
+        
+        if removed:
+            self.chunks = remaining
+            self.parent_chunks = {
+                parent_id: parent for parent_id, parent in self.parent_chunks.items()
+                if parent.source_doc != source_doc
+            }
+            if self.retriever:
+                self.retriever.remove_document(source_doc)
+        self.text_store.remove(source_doc)
+        
+        return removed
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise IndexReadOnlyError("The index is read-only (INDEX_READ_ONLY); rebuild the snapshot with build.py and restart")
+    
+    async def _after_document_update(self):
+        """Refresh dependent components and the snapshot after an incremental update"""
+        self.index_version += 1
+        
+        if not self.chunks:
+            self.retriever = None
+            self.verifier = None
+        else:
+            self.verifier = self._build_verifier()
+        self.metadata_index = MetadataIndex(self.chunks)
+        
+        # Hashing every PDF and writing the snapshot block; keep them off the event loop
+        if self.snapshot and self.retriever and self.pdf_directory:
+            fingerprint = await asyncio.to_thread(
+                compute_fingerprint, self.pdf_directory, self._index_settings(), self.embedding_model_name
+            )
+            await asyncio.to_thread(self._save_snapshot, fingerprint)
+    
+    def _build_retriever(self, **index_state) -> SimplifiedHybridRetriever:
+        """Create the retriever over the current chunks"""
+        return SimplifiedHybridRetriever(
+            self.chunks,
+            model_name=self.embedding_model_name,
+            embedding_cache=self.embedding_cache,
+            embedding_precision=self.embedding_precision,
+            embedding_model=self._load_embedding_model(),
+            query_cache=self.query_embedding_cache,
+            query_batcher=self.query_batcher,
+            **self.ann_settings,
+            **index_state
+        )
+    
+    def _build_verifier(self) -> SimplifiedVerifier:
+        """Create the verifier; semantic mode scores against the retriever's embeddings"""
+        return SimplifiedVerifier(
+            self.chunks,
+            retriever=self.retriever,
+            mode=self.verification_mode,
+            similarity_threshold=self.verification_similarity
+        )
+    
+    def _load_embedding_model(self) -> Optional[Any]:
+        """Load the sentence embedding model once; None if it is unavailable"""
+        if self._embedding_model is None:
             try:
-                doc = fitz.open(pdf_path)
+                self._embedding_model = load_sentence_transformer(self.embedding_model_name)
+            except Exception as e:
+                logger.warning(f"Could not load embedding model: {e}")
+                return None
+        
+        if self.query_batcher is None and self.query_batch_size > 1:
+            self.query_batcher = EmbeddingBatcher(
+                self._embedding_model.encode, self.query_batch_size, self.query_batch_wait_ms
+            )
+        return self._embedding_model
+    
+    def _encode_batch(self, embedding_model: Any, texts: List[str]) -> np.ndarray:
+        """Embed one ingestion batch; the cache is written once ingestion finishes"""
+        if self.embedding_cache:
+            return self.embedding_cache.encode(texts, embedding_model.encode)
+        return np.asarray(embedding_model.encode(texts), dtype=np.float32)
+    
+    def _index_settings(self) -> Dict[str, Any]:
+        """Index settings that invalidate a snapshot when changed"""
+        return {
+            "parent_chunk_size": self.parent_chunk_size,
+            "child_chunk_size": self.child_chunk_size,
+            "embedding_precision": self.embedding_precision,
+            "retrieval_mode": self.retrieval_mode,
+            "medical_vocabulary": self.medical_extractor.matcher.digest
+        }
+    
+    def _load_snapshot(self) -> bool:
+        """Restore chunks and indexes from the snapshot"""
+        try:
+            state = self.snapshot.load(BM25Index.load, ann_nprobe=self.ann_settings["ann_nprobe"])
+        except Exception as e:
+            logger.warning(f"Could not load index snapshot, rebuilding: {e}")
+            return False
+        
+        self._snapshot_manifest = self.snapshot.read_manifest()
+        
+        # Rows [0, indexed_chunks) are the indexed chunks, the rest are small-to-big parents
+        self.text_store = state["text_store"]
+        self.chunk_table = state["chunk_table"]
+        self.chunks = [self.chunk_table.view(row) for row in range(state["indexed_chunks"])]
+        self.parent_chunks = {
+            parent.id: parent
+            for parent in (self.chunk_table.view(row) for row in range(state["indexed_chunks"], len(self.chunk_table)))
+        }
+        if self.chunks:
+            self.retriever = self._build_retriever(
+                bm25=state["bm25"],
+                embedding_store=state["embedding_store"],
+                ann_index=state["ann_index"]
+            )
+            self.verifier = self._build_verifier()
+            self.metadata_index = MetadataIndex(self.chunks)
+            
+            # Snapshot was written without a model or with other ANN settings; store the fresh state
+            embeddings_rebuilt = state["embedding_store"] is None and self.retriever.embedding_store is not None
+            ann_rebuilt = self.retriever.ann_index is not None and self.retriever.ann_index is not state["ann_index"]
+            if (embeddings_rebuilt or ann_rebuilt) and self.read_only:
+                logger.warning("Snapshot lacks embeddings or the ANN index for the current settings; built in this process only")
+            elif embeddings_rebuilt or ann_rebuilt:
+                self._save_snapshot(self.snapshot.read_manifest()["fingerprint"])
+        
+        return True
+    
+    def _save_snapshot(self, fingerprint: Dict[str, Any]):
+        """Persist the current index so the next start can skip ingestion"""
+        try:
+            self.snapshot.save(
+                chunk_table=self.chunk_table.take(
+                    [chunk.row for chunk in self.chunks] + [parent.row for parent in self.parent_chunks.values()]
+                ),
+                indexed_chunks=len(self.chunks),
+                text_store=self.text_store,
+                bm25=self.retriever.bm25,
+                embedding_store=self.retriever.embedding_store,
+                fingerprint=fingerprint,
+                ann_index=self.retriever.ann_index
+            )
+        except Exception as e:
+            logger.warning(f"Could not write index snapshot: {e}")
+            return
+        self._snapshot_manifest = self.snapshot.read_manifest()
+        
+        # Serve embeddings from the memory-mapped snapshot instead of private RAM
+        if self.retriever.embedding_store is not None:
+            self.retriever.embedding_store = self.snapshot.load_embedding_store()
+    
+    async def _process_pdfs(self, pdf_paths: List[Path], text_store: TextStore, chunk_table: ChunkTable) -> List[MedicalChunk]:
+        """Process PDFs with hierarchical chunking"""
+        chunks: List[MedicalChunk] = []
+        sections = SectionTracker()
+        async for source_doc, page_num, text, medical_terms, headings in self._extract_pages(pdf_paths):
+            section = sections.page_sections(source_doc, headings)
+            chunks.extend(self._chunk_page(text, source_doc, page_num, medical_terms, section, text_store, chunk_table))
+        return chunks
+    
+    async def _extract_pages(self, pdf_paths: List[Path]):
+        """Yield (source_doc, page_num, text, medical_terms, headings) for every usable page
+        
+        Page extraction and term extraction run in a process pool. At most
+        two page ranges per worker are in flight and results are yielded in
+        task order, so chunk order and IDs do not depend on which worker
+        finishes first and finished ranges cannot pile up ahead of a slow
+        consumer. Workers are spawned, not forked: this runs inside a server
+        whose search, batcher and torch threads may hold locks a forked
+        child would inherit.
+        """
+        tasks = self._plan_ingest_tasks(pdf_paths)
+        workers = min(self.ingest_workers or os.cpu_count() or 1, len(tasks))
+        
+        if workers > 1:
+            logger.info(f"Extracting {len(pdf_paths)} PDFs ({len(tasks)} page ranges) with {workers} processes")
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                pending_tasks = iter(tasks)
+                in_flight = deque()
                 
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    
-                    if len(text.strip()) < 50:
-                        continue
-                    
-                    # Extract medical terms
-                    medical_terms = self.medical_extractor.extract_medical_terms(text)
-                    
-                    # Create parent chunks
-                    parent_chunks = self._create_parent_chunks(text, pdf_path.name, page_num + 1, medical_terms)
-                    self.chunks.extend(parent_chunks)
+                def submit_next():
+                    task = next(pending_tasks, None)
+                    if task is not None:
+                        pdf_path, start, end = task
+                        in_flight.append((task, loop.run_in_executor(pool, _extract_page_range, str(pdf_path), start, end)))
+                
+                for _ in range(2 * workers):
+                    submit_next()
+                
+                while in_flight:
+                    (pdf_path, start, end), future = in_flight.popleft()
+                    try:
+                        pages = await future
+                    except Exception as e:
+                        logger.error(f"Error processing {pdf_path.name} (pages {start + 1}-{end}): {e}")
+                        pages = []
+                    submit_next()
                     
-                    # Create child chunks
-                    for parent_chunk in parent_chunks:
-                        child_chunks = self._create_child_chunks(parent_chunk)
-                        self.chunks.extend(child_chunks)
+                    for page_num, text, medical_terms, headings in pages:
+                        yield pdf_path.name, page_num, text, medical_terms, headings
+        else:
+            # One range at a time in a thread, so other requests are served meanwhile
+            for pdf_path, start, end in tasks:
+                try:
+                    pages = await asyncio.to_thread(_extract_page_range, str(pdf_path), start, end)
+                except Exception as e:
+                    logger.error(f"Error processing {pdf_path.name} (pages {start + 1}-{end}): {e}")
+                    pages = []
+                
+                for page_num, text, medical_terms, headings in pages:
+                    yield pdf_path.name, page_num, text, medical_terms, headings
+    
+    def _chunk_page(self, text: str, source_doc: str, page_num: int, medical_terms: List[str], section: List[str],
+                    text_store: TextStore, chunk_table: ChunkTable) -> List[MedicalChunk]:
+        """Parent chunks for a page, each followed by its child chunks
+        
+        The page is appended to the document's arena once; chunks are rows
+        of the chunk table spanning word ranges of it. The document's
+        metadata is read from its first page.
+        """
+        arena = text_store.arena(source_doc)
+        metadata = extract_document_metadata(source_doc, text) if not len(arena) else None
+        doc = chunk_table.document(source_doc, arena, metadata)
+        starts, ends = arena.append_words(text.split())
+        
+        chunks = []
+        for parent_chunk in self._create_parent_chunks(chunk_table, doc, starts, ends, source_doc, page_num, medical_terms, section):
+            chunks.append(parent_chunk)
+            chunks.extend(self._create_child_chunks(parent_chunk, starts, ends))
+        return chunks
+    
+    def _route_chunks(self, chunks: List[MedicalChunk], parent_chunks: Dict[str, MedicalChunk]) -> List[MedicalChunk]:
+        """Chunks to index; in small-to-big mode parents go to the parent store instead"""
+        if self.retrieval_mode != "small_to_big":
+            return chunks
+        
+        indexed = []
+        for chunk in chunks:
+            if chunk.chunk_type == "parent":
+                parent_chunks[chunk.id] = chunk
+            else:
+                indexed.append(chunk)
+        return indexed
+    
+    async def _ingest_documents(self, pdf_paths: List[Path], fingerprint: Optional[Dict[str, Any]] = None):
+        """Build the chunk list and indexes with a streaming pipeline
+        
+        Pages flow through four stages connected by bounded queues:
+        extract (process pool) -> chunk -> embed (batches, in a thread) ->
+        index (BM25 append, embedding rows written to disk). A full queue
+        pauses the stage feeding it, so only a few batches of pages and
+        embeddings are in memory at any time. Progress per stage is kept in
+        ``ingest_progress``.
+        """
+        self.ingest_progress = {
+            "state": "running",
+            "documents": len(pdf_paths),
+            "pages_extracted": 0,
+            "chunks_created": 0,
+            "chunks_embedded": 0,
+            "chunks_indexed": 0
+        }
+        progress = self.ingest_progress
+        
+        embedding_model = await asyncio.to_thread(self._load_embedding_model)
+        chunks: List[MedicalChunk] = []
+        parent_chunks: Dict[str, MedicalChunk] = {}
+        text_store = TextStore()
+        chunk_table = ChunkTable()
+        bm25 = BM25Index()
+        
+        store_dir = None
+        writer = None
+        if embedding_model is not None:
+            scratch_parent = self.snapshot.snapshot_dir.parent if self.snapshot else None
+            if scratch_parent is not None:
+                scratch_parent.mkdir(parents=True, exist_ok=True)
+            store_dir = Path(tempfile.mkdtemp(prefix="ingest-embeddings-", dir=scratch_parent))
+            writer = EmbeddingStoreWriter(store_dir, self.embedding_precision)
+        
+        chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        index_queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_queue_size)
+        
+        async def chunk_stage():
+            batch: List[MedicalChunk] = []
+            sections = SectionTracker()
+            async for source_doc, page_num, text, medical_terms, headings in self._extract_pages(pdf_paths):
+                progress["pages_extracted"] += 1
+                section = sections.page_sections(source_doc, headings)
+                page_chunks = self._chunk_page(text, source_doc, page_num, medical_terms, section, text_store, chunk_table)
+                batch.extend(self._route_chunks(page_chunks, parent_chunks))
+                if len(batch) >= self.embed_batch_size:
+                    progress["chunks_created"] += len(batch)
+                    await chunk_queue.put(batch)
+                    batch = []
+            
+            progress["chunks_created"] += len(batch)
+            if batch:
+                await chunk_queue.put(batch)
+            await chunk_queue.put(None)
+        
+        async def embed_stage():
+            while True:
+                batch = await chunk_queue.get()
+                if batch is None:
+                    break
+                
+                embeddings = None
+                if embedding_model is not None:
+                    texts = [chunk.text for chunk in batch]
+                    embeddings = await asyncio.to_thread(self._encode_batch, embedding_model, texts)
+                    progress["chunks_embedded"] += len(batch)
+                await index_queue.put((batch, embeddings))
+            await index_queue.put(None)
+        
+        async def index_stage():
+            while True:
+                item = await index_queue.get()
+                if item is None:
+                    break
                 
-                doc.close()
+                batch, embeddings = item
+                bm25.add_documents([chunk.text_lower.split() for chunk in batch])
+                if writer is not None:
+                    if not writer.count and self.embedding_precision != "float32":
+                        recall = measure_precision_recall(embeddings, EmbeddingStore.from_array(embeddings, self.embedding_precision))
+                        logger.info(f"{self.embedding_precision} embeddings: recall@10 vs float32 = {recall:.3f} (first batch)")
+                    writer.append(embeddings)
+                chunks.extend(batch)
                 
+                progress["chunks_indexed"] = len(chunks)
+                logger.info(
+                    f"Ingest progress: {progress['pages_extracted']} pages extracted, "
+                    f"{progress['chunks_created']} chunks created, "
+                    f"{progress['chunks_embedded']} embedded, "
+                    f"{progress['chunks_indexed']} indexed"
+                )
+        
+        tasks = [asyncio.create_task(run()) for run in (chunk_stage, embed_stage, index_stage)]
+        try:
+            await asyncio.gather(*tasks)
+            embedding_store = writer.close() if writer is not None else None
+        except BaseException:
+            progress["state"] = "failed"
+            for task in tasks:
+                task.cancel()
+            if store_dir is not None:
+                shutil.rmtree(store_dir, ignore_errors=True)
+            raise
+        
+        if self.embedding_cache:
+            self.embedding_cache.save()
+            logger.info(f"Embedding cache: {self.embedding_cache.stats()}")
+        
+        self.chunks = chunks
+        self.parent_chunks = parent_chunks
+        self.text_store = text_store
+        self.chunk_table = chunk_table
+        logger.info(
+            f"Chunk storage: {len(chunk_table)} rows, {chunk_table.nbytes / 1e6:.1f} MB metadata, "
+            f"{text_store.nbytes / 1e6:.1f} MB text in {len(text_store.arenas)} arenas"
+        )
+        if chunks:
+            self.retriever = self._build_retriever(bm25=bm25, embedding_store=embedding_store)
+            self.verifier = self._build_verifier()
+            self.metadata_index = MetadataIndex(self.chunks)
+            
+            if self.snapshot:
+                self._save_snapshot(fingerprint)
+            
+            # Not swapped to the snapshot's files: copy the rows out of the scratch files
+            if embedding_store is not None and self.retriever.embedding_store is embedding_store:
+                self.retriever.embedding_store = embedding_store.to_memory()
+        
+        if store_dir is not None:
+            shutil.rmtree(store_dir, ignore_errors=True)
+        
+        progress["state"] = "done"
+    
+    def _plan_ingest_tasks(self, pdf_paths: List[Path]) -> List[Tuple[Path, int, int]]:
+        """Split PDFs into (path, start_page, end_page) ranges for the worker pool"""
+        tasks = []
+        for pdf_path in pdf_paths:
+            logger.info(f"Processing {pdf_path.name}")
+            try:
+                with fitz.open(pdf_path) as doc:
+                    page_count = len(doc)
             except Exception as e:
                 logger.error(f"Error processing {pdf_path.name}: {e}")
+                continue
+            
+            for start in range(0, page_count, self.pages_per_task):
+                tasks.append((pdf_path, start, min(start + self.pages_per_task, page_count)))
+        
+        return tasks
     
-    def _create_parent_chunks(self, text: str, source_doc: str, page_num: int, medical_terms: List[str]) -> List[MedicalChunk]:
-        """Create parent chunks"""
-        words = text.split()
-        chunk_size = 1200  # Approximate tokens
+    def _create_parent_chunks(self, chunk_table: ChunkTable, doc: int, starts: np.ndarray, ends: np.ndarray,
+                              source_doc: str, page_num: int, medical_terms: List[str], section: List[str]) -> List[MedicalChunk]:
+        """Create parent chunks from the page's word offsets in the arena"""
+        chunk_size = self.parent_chunk_size  # Approximate tokens
         
         chunks = []
-        for i in range(0, len(words), chunk_size):
-            chunk_text = ' '.join(words[i:i + chunk_size])
+        for i in range(0, len(starts), chunk_size):
+            last = min(i + chunk_size, len(starts)) - 1
             
-            chunk = MedicalChunk(
-                id=f"{source_doc}_p{page_num}_parent_{i//chunk_size}",
-                text=chunk_text,
-                source_doc=source_doc,
+            chunk = chunk_table.append(
+                chunk_id=f"{source_doc}_p{page_num}_parent_{i//chunk_size}",
+                doc=doc,
                 page_number=page_num,
-                section_hierarchy=[f"Page {page_num}"],
+                section_hierarchy=[*section, f"Page {page_num}"],
                 chunk_type="parent",
+                start=int(starts[i]),
+                end=int(ends[last]),
                 medical_terms=medical_terms
             )
             chunks.append(chunk)
         
         return chunks
     
-    def _create_child_chunks(self, parent_chunk: MedicalChunk) -> List[MedicalChunk]:
-        """Create child chunks"""
-        words = parent_chunk.text.split()
-        chunk_size = 300
+    def _create_child_chunks(self, parent_chunk: MedicalChunk, starts: np.ndarray, ends: np.ndarray) -> List[MedicalChunk]:
+        """Create child chunks over the words of the parent's span"""
+        first = int(np.searchsorted(starts, parent_chunk.start))
+        stop = int(np.searchsorted(ends, parent_chunk.end, side="right"))
+        chunk_size = self.child_chunk_size
         
         chunks = []
-        for i in range(0, len(words), chunk_size):
-            chunk_text = ' '.join(words[i:i + chunk_size])
+        for i in range(first, stop, chunk_size):
+            last = min(i + chunk_size, stop) - 1
             
-            chunk = MedicalChunk(
-                id=f"{parent_chunk.id}_child_{i//chunk_size}",
-                text=chunk_text,
-                source_doc=parent_chunk.source_doc,
-                page_number=parent_chunk.page_number,
-                section_hierarchy=parent_chunk.section_hierarchy,
-                chunk_type="child",
-                parent_chunk_id=parent_chunk.id,
-                medical_terms=parent_chunk.medical_terms
+            chunk = parent_chunk.table.append_child(
+                parent_chunk,
+                chunk_id=f"{parent_chunk.id}_child_{(i - first)//chunk_size}",
+                start=int(starts[i]),
+                end=int(ends[last])
             )
             chunks.append(chunk)
         
         return chunks
     
-    async def search(self, query: str, top_k: int = 10, use_verification: bool = True) -> Dict[str, Any]:
-        """Main search method"""
+    async def search(self, query: str, top_k: int = 10, use_verification: bool = True,
+                     filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Main search method; the blocking work runs in a worker thread"""
+        return await asyncio.to_thread(self.search_sync, query, top_k, use_verification, filters)
+    
+    def search_sync(self, query: str, top_k: int = 10, use_verification: bool = True,
+                    filters: Optional[Dict[str, Any]] = None, include_timings: bool = False) -> Dict[str, Any]:
+        """Blocking search, for callers that run it in a worker thread
+        
+        ``filters`` (society, year, topic, section) restrict the search to
+        matching chunks before any scoring; see MetadataIndex.positions().
+        Every stage is timed into the metrics registry; with
+        ``include_timings`` the per-stage milliseconds of this search are
+        added to the result metadata as ``stages_ms``. Searches slower than
+        the slow query log's threshold are written to it with their trace.
+        """
+        if not self.retriever:
+            raise ValueError("System not initialized")
+        
+        with trace_request() as trace, stage("search"):
+            result = self._search(query, top_k, use_verification, filters)
+        
+        if self.slow_query_log and self.slow_query_log.is_slow(trace.stages_ms["search"]):
+            self._log_slow_query(trace, result, top_k, use_verification, filters)
+        if include_timings:
+            result["metadata"]["stages_ms"] = {name: round(ms, 3) for name, ms in trace.stages_ms.items()}
+        return result
+    
+    def _log_slow_query(self, trace: RequestTrace, result: Dict[str, Any], top_k: int, use_verification: bool,
+                        filters: Optional[Dict[str, Any]]):
+        metadata = result["metadata"]
+        self.slow_query_log.record({
+            "query": result["query"],
+            "duration_ms": round(trace.stages_ms["search"], 3),
+            "top_k": top_k,
+            "use_verification": use_verification,
+            "filters": normalize_filters(filters),
+            "cached": metadata["cached"],
+            "candidates": metadata["total_chunks_searched"],
+            "results": len(result["retrieval_results"]),
+            "index_chunks": len(self.chunks),
+            "index_version": self.index_version,
+            "retrieval_mode": self.retrieval_mode,
+            "ann_mode": self.ann_settings["ann_mode"],
+            "verification_mode": self.verification_mode,
+            "stages_ms": {name: round(ms, 3) for name, ms in trace.stages_ms.items()},
+            "spans": trace.span_dicts()
+        })
+    
+    def _search(self, query: str, top_k: int, use_verification: bool, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # Repeated questions are answered from the result cache
+        cache_key = self._result_cache_key(query, top_k, use_verification, filters)
+        with stage("result_cache"):
+            cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            SEARCHES.inc(cached="true")
+            self._requery(cached, query)
+            cached["metadata"]["cached"] = True
+            return cached
+        SEARCHES.inc(cached="false")
+        
+        # Retrieve relevant chunks (only those passing the filters)
+        with stage("metadata_filter"):
+            positions = self.metadata_index.positions(filters)
+        with stage("retrieve"):
+            retrieval_results = self._retrieve(query, top_k, positions)
+        result = self._build_search_result(query, retrieval_results, use_verification, positions)
+        
+        self.result_cache.put(cache_key, result)
+        return result
+    
+    async def search_batch(self, queries: List[str], top_k: int = 10, use_verification: bool = True,
+                           filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Search many queries at once, returning results in input order (in a worker thread)"""
+        return await asyncio.to_thread(self.search_batch_sync, queries, top_k, use_verification, filters)
+    
+    def search_batch_sync(self, queries: List[str], top_k: int = 10, use_verification: bool = True,
+                          filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Blocking batch search
+        
+        Cached results are reused; the remaining distinct queries go through
+        one batched retrieval, then response generation and verification run
+        per query as in search(). ``filters`` apply to every query, as in
+        search_sync().
+        """
         if not self.retriever:
             raise ValueError("System not initialized")
         
-        # Retrieve relevant chunks
-        retrieval_results = self.retriever.retrieve(query, top_k)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending: Dict[Tuple[str, int, bool, Tuple], List[int]] = {}
+        for position, query in enumerate(queries):
+            cache_key = self._result_cache_key(query, top_k, use_verification, filters)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                self._requery(cached, query)
+                cached["metadata"]["cached"] = True
+                results[position] = cached
+            else:
+                pending.setdefault(cache_key, []).append(position)
+        
+        cache_keys = list(pending)
+        SEARCHES.inc(len(queries) - len(cache_keys), cached="true")
+        SEARCHES.inc(len(cache_keys), cached="false")
+        
+        # One filter for the whole batch
+        with stage("metadata_filter"):
+            chunk_positions = self.metadata_index.positions(filters)
+        with stage("retrieve_batch"):
+            batch_results = self._retrieve_batch([queries[pending[key][0]] for key in cache_keys], top_k, chunk_positions)
+        
+        for cache_key, retrieval_results in zip(cache_keys, batch_results):
+            positions = pending[cache_key]
+            result = self._build_search_result(queries[positions[0]], retrieval_results, use_verification, chunk_positions)
+            self.result_cache.put(cache_key, result)
+            results[positions[0]] = result
+            
+            # Repeats of the same normalized query within the batch
+            for position in positions[1:]:
+                duplicate = copy.deepcopy(result)
+                self._requery(duplicate, queries[position])
+                results[position] = duplicate
+        
+        return results
+    
+    def _retrieve(self, query: str, top_k: int, positions: Optional[np.ndarray] = None) -> List[RetrievalResult]:
+        """Top-k results; in small-to-big mode, the top-k distinct parents of the best child hits"""
+        if self.retrieval_mode != "small_to_big":
+            return self.retriever.retrieve(query, top_k, positions=positions)
+        
+        searchable = len(self.chunks) if positions is None else len(positions)
+        depth = top_k * self.parent_oversample
+        while True:
+            results = self._group_by_parent(self.retriever.retrieve(query, depth, positions=positions), top_k)
+            if len(results) >= top_k or depth >= searchable:
+                return results
+            depth *= 2
+    
+    def _retrieve_batch(self, queries: List[str], top_k: int, positions: Optional[np.ndarray] = None) -> List[List[RetrievalResult]]:
+        """Batched _retrieve()"""
+        if self.retrieval_mode != "small_to_big":
+            return self.retriever.retrieve_batch(queries, top_k, positions=positions)
         
+        searchable = len(self.chunks) if positions is None else len(positions)
+        depth = top_k * self.parent_oversample
+        batch_results = []
+        for query, hits in zip(queries, self.retriever.retrieve_batch(queries, depth, positions=positions)):
+            results = self._group_by_parent(hits, top_k)
+            if len(results) < top_k and depth < searchable:
+                # Too many hits shared a parent; search this query deeper
+                results = self._retrieve(query, top_k, positions)
+            batch_results.append(results)
+        return batch_results
+    
+    def _group_by_parent(self, hits: List[RetrievalResult], top_k: int) -> List[RetrievalResult]:
+        """Keep the best child hit per parent and attach the parent chunk"""
+        grouped: Dict[str, RetrievalResult] = {}
+        for hit in hits:
+            parent_id = hit.chunk.parent_chunk_id or hit.chunk.id
+            if parent_id in grouped:
+                continue
+            if len(grouped) == top_k:
+                break
+            grouped[parent_id] = RetrievalResult(
+                chunk=hit.chunk,
+                score=hit.score,
+                retrieval_method=hit.retrieval_method,
+                parent=self.parent_chunks.get(parent_id),
+                index=hit.index
+            )
+        return list(grouped.values())
+    
+    def _build_search_result(self, query: str, retrieval_results: List[RetrievalResult], use_verification: bool,
+                             positions: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Generate and verify the response for retrieved chunks"""
         # Generate response
-        response = self._generate_response(query, retrieval_results)
+        with stage("generate_response"):
+            response = self._generate_response(query, retrieval_results)
         
         # Verify response
         verification_result = None
         if use_verification and self.verifier:
-            retrieved_chunks = [r.chunk for r in retrieval_results]
-            verification_result = self.verifier.verify_response(response, retrieved_chunks)
+            retrieved_chunks = [r.parent or r.chunk for r in retrieval_results]
+            with stage("verification"):
+                verification_result = self.verifier.verify_response(
+                    response, retrieved_chunks, [r.index for r in retrieval_results]
+                )
         
         return {
             "query": query,
@@ -316,6 +1835,7 @@ class SimplifiedMedGraphRAG:
             "retrieval_results": [
                 {
                     "chunk_id": r.chunk.id,
+                    "parent_chunk_id": r.parent.id if r.parent else r.chunk.parent_chunk_id,
                     "text": r.chunk.text[:200] + "..." if len(r.chunk.text) > 200 else r.chunk.text,
                     "score": r.score,
                     "source": r.chunk.source_doc,
@@ -326,19 +1846,95 @@ class SimplifiedMedGraphRAG:
             ],
             "verification": verification_result,
             "metadata": {
-                "total_chunks_searched": len(self.chunks),
+                "total_chunks_searched": len(self.chunks) if positions is None else len(positions),
                 "retrieval_time": datetime.now().isoformat(),
-                "hallucination_risk": verification_result["hallucination_risk"] if verification_result else "unknown"
+                "hallucination_risk": verification_result["hallucination_risk"] if verification_result else "unknown",
+                "cached": False
             }
         }
     
+    @staticmethod
+    def _requery(result: Dict[str, Any], query: str):
+        """Give a result stored under the normalized query this caller's spelling of it
+        
+        The response quotes the query it was generated for; only that quote
+        depends on the query text, so it is rewritten in place.
+        """
+        if result["query"] != query:
+            result["response"] = result["response"].replace(
+                _response_header(result["query"]), _response_header(query), 1
+            )
+            result["query"] = query
+    
+    @staticmethod
+    def _result_cache_key(query: str, top_k: int, use_verification: bool,
+                          filters: Optional[Dict[str, Any]] = None) -> Tuple[str, int, bool, Tuple]:
+        return (normalize_query(query), top_k, use_verification, tuple(sorted(normalize_filters(filters).items())))
+    
+    def warm_components(self) -> Dict[str, bool]:
+        """Which parts of the search stack are loaded (for readiness probes)"""
+        retriever = self.retriever
+        return {
+            "index": retriever is not None,
+            "embedding_model": retriever is not None and retriever.embedding_model is not None,
+            "ann_index": retriever is not None and retriever.ann_index is not None,
+            "verifier": self.verifier is not None
+        }
+    
+    def index_stats(self) -> Dict[str, int]:
+        """Sizes of the index components, for monitoring"""
+        retriever = self.retriever
+        return {
+            "chunks": len(self.chunks),
+            "parent_chunks": len(self.parent_chunks),
+            "embedding_rows": len(retriever.embedding_store) if retriever and retriever.embedding_store is not None else 0,
+            "bm25_terms": len(retriever.bm25.vocabulary) if retriever else 0,
+            "embedding_bytes": retriever.embedding_store.nbytes if retriever and retriever.embedding_store is not None else 0,
+            "text_bytes": self.text_store.nbytes,
+            "chunk_metadata_bytes": self.chunk_table.nbytes
+        }
+    
+    @property
+    def embedding_model(self) -> Optional[Any]:
+        """The loaded sentence embedding model, if any"""
+        return self._embedding_model
+    
+    def close(self):
+        """Release the index once this system is no longer served (e.g. after a hot swap)
+        
+        Drops the retriever, chunks and tables, so their arrays and memory
+        maps are freed by reference counting rather than whenever the cycle
+        collector gets to the system object. The embedding model is kept; a
+        newer system may share it.
+        """
+        if self.query_batcher:
+            self.query_batcher.close()
+            self.query_batcher = None
+        self.retriever = None
+        self.verifier = None
+        self.metadata_index = MetadataIndex([])
+        self.chunks = []
+        self.parent_chunks = {}
+        self.text_store = TextStore()
+        self.chunk_table = ChunkTable()
+        self.query_embedding_cache.clear()
+        self.result_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and sizes of the query embedding and result caches"""
+        return {
+            "index_version": self.index_version,
+            "query_embeddings": self.query_embedding_cache.stats(),
+            "results": self.result_cache.stats()
+        }
+    
     def _generate_response(self, query: str, results: List[RetrievalResult]) -> str:
         """Generate response from retrieval results"""
         if not results:
             return "No relevant information found in the guidelines."
         
-        # Combine top results
-        context_texts = [r.chunk.text for r in results[:3]]
+        # Combine top results (the surrounding parent passage in small-to-big mode)
+        context_texts = [(r.parent or r.chunk).text for r in results[:3]]
         context = "\n\n".join(context_texts)
         
         # Extract medical terms from query and results
@@ -349,13 +1945,13 @@ class SimplifiedMedGraphRAG:
                 result_terms.extend(result.chunk.medical_terms)
         
         # Create a focused response
-        response = f"""Based on the cardiovascular guidelines, here is the relevant information for your query: "{query}"
+        response = f"""{_response_header(query)}
 
 Key findings from the guidelines:
 
 {context[:1000]}...
 
-Relevant medical terms identified: {', '.join(set(query_terms + result_terms)[:10])}
+Relevant medical terms identified: {', '.join(list(dict.fromkeys(query_terms + result_terms))[:10])}
 
 Sources: {', '.join(set(r.chunk.source_doc for r in results[:3]))}
 Pages: {', '.join(set(str(r.chunk.page_number) for r in results[:3]))}
@@ -0,0 +1,88 @@
+"""
+Slow Query Log
+Searches slower than a threshold, written as JSON lines to a rotating
+file through the standard logging machinery
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SlowQueryLog:
+    """Append one JSON object per slow search to ``path``
+
+    Entries go through a dedicated logger ("slow_queries") with a
+    RotatingFileHandler, so rotation and thread safety come from logging
+    and the entries stay out of the application log.
+    """
+
+    def __init__(self, path: Path, threshold_ms: float = 1000.0,
+                 max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.path = Path(path)
+        self.threshold_ms = threshold_ms
+        self.recorded = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True
+        )
+        self._handler.setFormatter(logging.Formatter("%(message)s"))
+        self._logger = logging.getLogger("slow_queries")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        # One handler per file, also when the system is created more than once
+        for handler in list(self._logger.handlers):
+            if getattr(handler, "baseFilename", None) == self._handler.baseFilename:
+                self._logger.removeHandler(handler)
+                handler.close()
+        self._logger.addHandler(self._handler)
+
+    @classmethod
+    def from_environment(cls) -> Optional["SlowQueryLog"]:
+        """SLOW_QUERY_LOG file and SLOW_QUERY_MS threshold; a threshold of 0 or less turns the log off
+
+        With several server workers (WEB_CONCURRENCY) each writes its own
+        file, suffixed with its pid, since file rotation is per process.
+        """
+        threshold_ms = float(os.environ.get("SLOW_QUERY_MS", "1000"))
+        if threshold_ms <= 0:
+            return None
+        path = Path(os.environ.get("SLOW_QUERY_LOG", "logs/slow_queries.jsonl"))
+        if int(os.environ.get("WEB_CONCURRENCY", "1")) > 1:
+            path = path.with_name(f"{path.stem}.{os.getpid()}{path.suffix}")
+        try:
+            return cls(
+                path,
+                threshold_ms=threshold_ms,
+                max_bytes=int(os.environ.get("SLOW_QUERY_LOG_MAX_MB", "10")) * 1024 * 1024,
+                backup_count=int(os.environ.get("SLOW_QUERY_LOG_BACKUPS", "5"))
+            )
+        except OSError as e:
+            logger.warning(f"Slow query log disabled: {e}")
+            return None
+
+    def is_slow(self, duration_ms: float) -> bool:
+        return duration_ms >= self.threshold_ms
+
+    def record(self, entry: Dict[str, Any]):
+        """Write an entry (a JSON-serializable dict) with a timestamp"""
+        self._logger.info(json.dumps({"timestamp": datetime.now().isoformat(), **entry}, default=str))
+        self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "path": str(self.path),
+            "threshold_ms": self.threshold_ms,
+            "recorded": self.recorded
+        }
+
+    def close(self):
+        self._logger.removeHandler(self._handler)
+        self._handler.close()
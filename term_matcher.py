@@ -0,0 +1,156 @@
+"""
+Medical Term Matcher
+Token trie over a cardiology vocabulary file; one left-to-right pass over a
+text returns every term with its id, character span and category
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOCABULARY = Path(__file__).parent / "data" / "medical_terms.tsv"
+
+# Numbers, and words that may contain digits after the first letter (SGLT2, HbA1c);
+# "5mg" splits into "5" and "mg"
+TOKEN_PATTERN = re.compile(r"\d+(?:[.,]\d+)*|[^\W\d_]+(?:\d+[^\W\d_]*)*")
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+# What may separate the words of a multi-word term ("beta-blocker", "sacubitril/valsartan",
+# a line break inside "heart failure")
+GAP_PATTERN = re.compile(r"[\s\-‐‑/'’()]*")
+
+DOSAGE_UNIT = "dosage_unit"
+
+
+@dataclass
+class Term:
+    """One vocabulary entry"""
+    surface: str
+    category: str
+    canonical: str
+    case_sensitive: bool = False
+
+
+class TermMatch(NamedTuple):
+    term_id: int
+    start: int
+    end: int
+    category: str
+
+
+class _TrieNode:
+    __slots__ = ("children", "term_ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.term_ids: List[int] = []
+
+
+class TermMatcher:
+    """Longest-match term finder over word tokens
+
+    Terms are stored in a trie keyed by lowercase tokens, so finding all
+    terms costs one walk per text token no matter how many terms the
+    vocabulary holds (each step is a dict lookup; walks are bounded by the
+    longest term). Matches are leftmost-longest and do not overlap.
+    Case-sensitive entries (short abbreviations) also require the exact
+    surface form. Dosage units match only right after a number, as in
+    "5 mg" or "5mg".
+    """
+
+    def __init__(self, terms: List[Term], digest: str = ""):
+        self.terms = terms
+        self.digest = digest  # identifies the vocabulary, for snapshot fingerprints
+        self._root = _TrieNode()
+        self._units: Dict[str, int] = {}
+        self._exact: Dict[int, List[str]] = {}  # case-sensitive term -> its surface tokens
+
+        for term_id, term in enumerate(terms):
+            surface_tokens = TOKEN_PATTERN.findall(term.surface)
+            tokens = [token.lower() for token in surface_tokens]
+            if not tokens:
+                continue
+            if term.case_sensitive:
+                self._exact[term_id] = surface_tokens
+            if term.category == DOSAGE_UNIT:
+                self._units.setdefault(tokens[0], term_id)
+                continue
+
+            node = self._root
+            for token in tokens:
+                node = node.children.setdefault(token, _TrieNode())
+            node.term_ids.append(term_id)
+
+    @classmethod
+    def load(cls, path: Path = DEFAULT_VOCABULARY) -> "TermMatcher":
+        """Read a vocabulary TSV: term, category, canonical (optional), case (i or s)"""
+        path = Path(path)
+        content = path.read_text(encoding="utf-8")
+
+        terms = []
+        header_seen = False
+        for line in content.splitlines():
+            if not line.strip() or line.startswith("#"):
+                continue
+            if not header_seen:
+                header_seen = True
+                continue
+
+            fields = line.split("\t") + ["", ""]
+            surface, category, canonical, case = fields[:4]
+            terms.append(Term(
+                surface=surface,
+                category=category,
+                canonical=canonical or surface.lower(),
+                case_sensitive=case.strip() == "s"
+            ))
+
+        logger.info(f"Loaded {len(terms)} medical terms from {path.name}")
+        return cls(terms, hashlib.sha256(content.encode("utf-8")).hexdigest()[:16])
+
+    def find(self, text: str) -> List[TermMatch]:
+        """All terms in text, leftmost-longest, in order"""
+        tokens = list(TOKEN_PATTERN.finditer(text))
+        keys = [token.group().lower() for token in tokens]
+
+        matches = []
+        i = 0
+        while i < len(tokens):
+            best: Optional[tuple] = None
+            node = self._root.children.get(keys[i])
+            j = i
+            while node is not None:
+                term_id = self._accept(node, tokens, i, j)
+                if term_id is not None:
+                    best = (term_id, j)
+                j += 1
+                if j == len(tokens) or not GAP_PATTERN.fullmatch(text, tokens[j - 1].end(), tokens[j].start()):
+                    break
+                node = node.children.get(keys[j])
+
+            if best is None and i + 1 < len(tokens) and keys[i + 1] in self._units \
+                    and NUMBER_PATTERN.fullmatch(keys[i]) and not text[tokens[i].end():tokens[i + 1].start()].strip():
+                best = (self._units[keys[i + 1]], i + 1)
+
+            if best is None:
+                i += 1
+                continue
+
+            term_id, last = best
+            matches.append(TermMatch(term_id, tokens[i].start(), tokens[last].end(), self.terms[term_id].category))
+            i = last + 1
+
+        return matches
+
+    def _accept(self, node: _TrieNode, tokens: List[re.Match], first: int, last: int) -> Optional[int]:
+        """First term ending at this node whose case rule the text span satisfies"""
+        for term_id in node.term_ids:
+            surface_tokens = self._exact.get(term_id)
+            if surface_tokens is None or [token.group() for token in tokens[first:last + 1]] == surface_tokens:
+                return term_id
+        return None
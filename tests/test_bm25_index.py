@@ -0,0 +1,103 @@
+"""BM25Index must score exactly like rank_bm25.BM25Okapi, before and after incremental updates"""
+
+import numpy as np
+import pytest
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+from simplified_medgraph_rag import BM25Index  # noqa: E402
+
+WORDS = (
+    "heart failure atrial fibrillation anticoagulation stroke risk patients recommended therapy "
+    "beta blockers ace inhibitors sglt2 hypertension valve surgery ablation class level evidence "
+    "mortality hospitalization bleeding dose renal function follow up echocardiography diagnosis"
+).split()
+
+QUERIES = [
+    ["heart", "failure"],
+    ["atrial", "fibrillation", "anticoagulation"],
+    ["sglt2", "heart", "failure", "mortality"],
+    ["valve", "valve", "surgery"],  # repeated query term
+    ["patients"],  # in most chunks: epsilon-floored IDF
+    ["unknownterm"],
+    ["ablation", "unknownterm", "bleeding"]
+]
+
+
+def make_corpus(size: int, seed: int = 0):
+    """Zipf-distributed chunks, so some terms are rare and some are in most chunks"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, len(WORDS) + 1)
+    weights /= weights.sum()
+    return [[str(word) for word in rng.choice(WORDS, size=int(rng.integers(5, 40)), p=weights)] for _ in range(size)]
+
+
+def assert_same_scores(index: BM25Index, corpus):
+    reference = rank_bm25.BM25Okapi(corpus)
+    for query in QUERIES:
+        np.testing.assert_allclose(index.get_scores(query), reference.get_scores(query), rtol=1e-9, atol=1e-12)
+
+
+def assert_same_top_k(index: BM25Index, corpus):
+    reference = rank_bm25.BM25Okapi(corpus)
+    for query in QUERIES:
+        dense = reference.get_scores(query)
+        for k in (1, 5, 20):
+            indices, scores = index.top_k(query, k)
+            matched = min(k, int((dense > 0).sum()))
+            assert len(indices) >= matched
+            assert np.all(np.diff(scores) <= 0), "top_k must return the best chunk first"
+            np.testing.assert_allclose(scores[:matched], np.sort(dense)[::-1][:matched], rtol=1e-9)
+            np.testing.assert_allclose(dense[indices], scores, rtol=1e-9)
+
+
+def test_scores_match_bm25okapi():
+    corpus = make_corpus(200)
+    assert_same_scores(BM25Index.build(corpus), corpus)
+
+
+def test_top_k_matches_dense_ranking():
+    corpus = make_corpus(200)
+    assert_same_top_k(BM25Index.build(corpus), corpus)
+
+
+def test_batch_and_subset_scores_match_dense_scores():
+    corpus = make_corpus(120)
+    index = BM25Index.build(corpus)
+    subset = np.array([0, 3, 17, 64, 119])
+
+    np.testing.assert_allclose(index.get_scores_batch(QUERIES), np.stack([index.get_scores(query) for query in QUERIES]))
+    for query in QUERIES:
+        np.testing.assert_allclose(index.score_documents(query, subset), index.get_scores(query)[subset])
+
+
+def test_added_documents_match_a_rebuild():
+    corpus = make_corpus(150)
+    index = BM25Index.build(corpus[:100])
+    index.get_scores(QUERIES[0])  # statistics refreshed before the update
+    index.add_documents(corpus[100:])
+
+    assert index.corpus_size == len(corpus)
+    assert_same_scores(index, corpus)
+    assert_same_top_k(index, corpus)
+
+
+def test_removed_documents_match_a_rebuild():
+    corpus = make_corpus(150)
+    index = BM25Index.build(corpus)
+    index.get_scores(QUERIES[0])
+    keep = np.array([i for i in range(len(corpus)) if i % 3 != 1])
+    index.remove_documents(keep)
+
+    remaining = [corpus[i] for i in keep]
+    assert index.corpus_size == len(remaining)
+    assert_same_scores(index, remaining)
+    assert_same_top_k(index, remaining)
+
+
+def test_saved_index_loads_with_the_same_scores(tmp_path):
+    corpus = make_corpus(80)
+    index = BM25Index.build(corpus)
+    index.save(tmp_path / "bm25")
+
+    assert_same_scores(BM25Index.load(tmp_path / "bm25"), corpus)
@@ -0,0 +1,112 @@
+"""Adding or removing one guideline must give the same index as rebuilding from scratch"""
+
+import asyncio
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from guideline_metadata import find_section_headings
+from simplified_medgraph_rag import SimplifiedMedGraphRAG
+from stub_embedding import HashingEmbeddingModel
+from synthetic_corpus import CorpusSpec, SyntheticCorpus, benchmark_queries
+
+QUERIES = benchmark_queries(12)
+
+
+class InMemoryGuidelinesRAG(SimplifiedMedGraphRAG):
+    """Ingests generated pages looked up by PDF file name; the PDF files themselves may be empty"""
+
+    def __init__(self, pages: Dict[str, List[str]], **kwargs):
+        super().__init__(embedding_model=HashingEmbeddingModel(), query_batch_size=1, **kwargs)
+        self.pages = pages
+
+    async def _extract_pages(self, pdf_paths: List[Path]):
+        for pdf_path in pdf_paths:
+            for page_num, text in enumerate(self.pages[pdf_path.name], start=1):
+                yield pdf_path.name, page_num, text, self.medical_extractor.extract_medical_terms(text), find_section_headings(text)
+
+
+@pytest.fixture(scope="module")
+def pages() -> Dict[str, List[str]]:
+    corpus = SyntheticCorpus(CorpusSpec(chunks=60, words_per_page=400, pages_per_document=4, seed=7))
+    pages = defaultdict(list)
+    for source_doc, _, text in corpus.pages():
+        pages[source_doc].append(text)
+    assert len(pages) >= 3
+    return dict(pages)
+
+
+def build(pages: Dict[str, List[str]], directory: Path, names: List[str], **settings) -> InMemoryGuidelinesRAG:
+    """Ingest the documents in the given order (exact score ties go to the later chunk)"""
+    directory.mkdir()
+    for name in names:
+        (directory / name).touch()
+    system = InMemoryGuidelinesRAG(pages, **settings)
+    system.pdf_directory = directory
+    asyncio.run(system._ingest_documents([directory / name for name in names]))
+    return system
+
+
+def search_results(system: SimplifiedMedGraphRAG) -> List[List[tuple]]:
+    return [
+        [(r["source"], r["page"], r["text"], r["score"]) for r in system.search_sync(query, top_k=10, use_verification=False)["retrieval_results"]]
+        for query in QUERIES
+    ]
+
+
+def assert_same_search_results(system: SimplifiedMedGraphRAG, expected: SimplifiedMedGraphRAG):
+    assert len(system.chunks) == len(expected.chunks)
+    for query in QUERIES:
+        results = system.search_sync(query, top_k=10, use_verification=False)["retrieval_results"]
+        expected_results = expected.search_sync(query, top_k=10, use_verification=False)["retrieval_results"]
+
+        assert [(r["source"], r["page"], r["text"]) for r in results] == \
+            [(r["source"], r["page"], r["text"]) for r in expected_results]
+        np.testing.assert_allclose([r["score"] for r in results], [r["score"] for r in expected_results], rtol=1e-6)
+
+
+def test_added_document_matches_a_rebuild(pages, tmp_path):
+    names = sorted(pages)
+    system = build(pages, tmp_path / "incremental", names[:-1])
+    (tmp_path / "incremental" / names[-1]).touch()
+    result = asyncio.run(system.add_document(tmp_path / "incremental" / names[-1]))
+
+    assert result["action"] == "added"
+    assert_same_search_results(system, build(pages, tmp_path / "rebuilt", names))
+
+
+def test_removed_document_matches_a_rebuild(pages, tmp_path):
+    names = sorted(pages)
+    system = build(pages, tmp_path / "incremental", names)
+    result = asyncio.run(system.remove_document(names[1]))
+
+    assert result["action"] == "removed"
+    assert all(chunk.source_doc != names[1] for chunk in system.chunks)
+    assert_same_search_results(system, build(pages, tmp_path / "rebuilt", names[:1] + names[2:]))
+
+
+def test_replaced_document_matches_a_rebuild(pages, tmp_path):
+    names = sorted(pages)
+    system = build(pages, tmp_path / "incremental", names)
+    result = asyncio.run(system.add_document(tmp_path / "incremental" / names[0]))
+
+    # The replacement's chunks are appended, as if the document were ingested last
+    assert result["action"] == "replaced"
+    assert_same_search_results(system, build(pages, tmp_path / "rebuilt", names[1:] + names[:1]))
+
+
+def test_update_applied_to_a_copy_leaves_the_served_index_unchanged(pages, tmp_path):
+    names = sorted(pages)
+    served = build(pages, tmp_path / "served", names, snapshot_dir=tmp_path / "snapshot")
+    before = search_results(served)
+
+    updated = InMemoryGuidelinesRAG(pages, snapshot_dir=tmp_path / "snapshot")
+    asyncio.run(updated.initialize_copy(served))
+    asyncio.run(updated.remove_document(names[1]))
+
+    assert len(served.chunks) > len(updated.chunks)
+    assert search_results(served) == before
+    assert_same_search_results(updated, build(pages, tmp_path / "rebuilt", names[:1] + names[2:]))
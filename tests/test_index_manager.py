@@ -0,0 +1,99 @@
+"""Swapping index generations never closes one a request still holds"""
+
+import asyncio
+
+import pytest
+
+from index_manager import IndexManager, RebuildFailed
+
+
+class FakeSystem:
+    """Just what IndexManager touches of a SimplifiedMedGraphRAG"""
+
+    def __init__(self, chunks: int, retriever: object = True):
+        self.chunks = list(range(chunks))
+        self.retriever = retriever
+        self.closed = False
+        self.searches = 0
+
+    def search_sync(self, query, top_k=10, use_verification=True):
+        self.searches += 1
+        return {"query": query}
+
+    def close(self):
+        self.closed = True
+
+
+def make_manager(chunks: int = 10) -> IndexManager:
+    async def builder(previous):
+        return FakeSystem(chunks)
+    return IndexManager(builder)
+
+
+def test_update_swaps_in_the_changed_copy_after_pinned_requests_finish():
+    async def scenario():
+        manager = make_manager()
+        await manager.rebuild()
+
+        async def remove_some(current):
+            return FakeSystem(len(current.chunks) - 8), "removed"
+
+        with manager.acquire() as pinned:
+            generation, result = await manager.update(remove_some)
+            assert result == "removed"
+            assert manager.current is generation.system is not pinned
+            assert len(pinned.chunks) == 10  # the running request still sees its generation
+            assert not pinned.closed
+        assert pinned.closed
+        assert generation.system.searches == 1  # validated with the probe query before the swap
+        assert manager.stats()["updates"] == {"succeeded": 1, "failed": 0}
+
+    asyncio.run(scenario())
+
+
+def test_failed_update_keeps_serving_the_current_generation():
+    async def scenario():
+        manager = make_manager()
+        current = (await manager.rebuild()).system
+        broken = FakeSystem(10, retriever=None)
+
+        async def break_index(current):
+            return broken, None
+
+        with pytest.raises(RebuildFailed):
+            await manager.update(break_index)
+        assert manager.current is current and not current.closed
+        assert broken.closed
+        assert manager.stats()["updates"] == {"succeeded": 0, "failed": 1}
+
+    asyncio.run(scenario())
+
+
+def test_rebuild_that_loses_most_chunks_needs_force():
+    async def scenario():
+        sizes = iter([10, 2, 2])
+
+        async def builder(previous):
+            return FakeSystem(next(sizes))
+
+        manager = IndexManager(builder, min_chunk_ratio=0.5)
+        await manager.rebuild()
+        with pytest.raises(RebuildFailed):
+            await manager.rebuild()
+        assert len(manager.current.chunks) == 10
+
+        await manager.rebuild(force=True)
+        assert len(manager.current.chunks) == 2
+
+    asyncio.run(scenario())
+
+
+def test_call_runs_on_the_current_generation():
+    async def scenario():
+        manager = make_manager()
+        await manager.rebuild()
+        result = await asyncio.to_thread(manager.call, "search_sync", "atrial fibrillation")
+        assert result == {"query": "atrial fibrillation"}
+        assert manager.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
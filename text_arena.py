@@ -0,0 +1,151 @@
+"""
+Text Arena
+Each document's text stored once as contiguous UTF-8 bytes, with a
+lowercase view at the same byte offsets; chunks reference (start, end)
+spans instead of holding their own strings
+"""
+
+import json
+import logging
+import mmap
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SPACE = ord(" ")
+
+
+def _lower_bytes(text: str, encoded: bytes) -> bytes:
+    """UTF-8 lowercase of text with exactly the same byte layout as ``encoded``
+
+    A few characters change length when lowercased (e.g. U+0130); those are
+    left as they are so every offset stays valid in both views.
+    """
+    if text.isascii():
+        return text.lower().encode("ascii")
+
+    lowered = text.lower().encode("utf-8")
+    if len(lowered) == len(encoded) and len(text.lower()) == len(text):
+        return lowered
+
+    return "".join(
+        lower if len(lower) == 1 and len(lower.encode("utf-8")) == len(char.encode("utf-8")) else char
+        for char, lower in ((char, char.lower()) for char in text)
+    ).encode("utf-8")
+
+
+class TextArena:
+    """Text of one document: original and lowercase UTF-8 views with shared offsets
+
+    While a document is being ingested its arena grows in ``bytearray``
+    buffers; an arena loaded from a snapshot is a read-only view of a
+    memory-mapped file.
+    """
+
+    def __init__(self, name: str, data: Union[bytearray, memoryview, None] = None, lower: Union[bytearray, memoryview, None] = None):
+        self.name = name
+        self._data = bytearray() if data is None else data
+        self._lower = bytearray() if lower is None else lower
+
+    def __repr__(self) -> str:
+        return f"TextArena({self.name!r}, {len(self)} bytes)"
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def append_words(self, words: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Append a page as space-joined words; return each word's (start, end) byte offsets"""
+        if len(self._data):
+            self._data += b"\n"
+            self._lower += b"\n"
+        base = len(self._data)
+
+        page = " ".join(words)
+        encoded = page.encode("utf-8")
+        self._data += encoded
+        self._lower += _lower_bytes(page, encoded)
+
+        # Words never contain whitespace and 0x20 never occurs inside a multi-byte UTF-8 sequence
+        separators = np.flatnonzero(np.frombuffer(encoded, dtype=np.uint8) == SPACE)
+        starts = np.concatenate([[0], separators + 1]) + base if words else np.zeros(0, dtype=np.int64)
+        ends = np.concatenate([separators, [len(encoded)]]) + base if words else np.zeros(0, dtype=np.int64)
+        return starts.astype(np.int64), ends.astype(np.int64)
+
+    def text(self, start: int, end: int) -> str:
+        return bytes(self._data[start:end]).decode("utf-8")
+
+    def lower_text(self, start: int, end: int) -> str:
+        return bytes(self._lower[start:end]).decode("utf-8")
+
+    def buffers(self) -> Tuple[Union[bytearray, memoryview], Union[bytearray, memoryview]]:
+        """The original and lowercase byte buffers (not copied)"""
+        return self._data, self._lower
+
+
+class TextStore:
+    """Text arenas for every indexed document"""
+
+    TEXT_FILE = "text.bin"
+    LOWER_FILE = "text_lower.bin"
+    INDEX_FILE = "documents.json"
+
+    def __init__(self):
+        self.arenas: Dict[str, TextArena] = {}
+        self._maps: List[mmap.mmap] = []
+
+    def arena(self, source_doc: str) -> TextArena:
+        """The document's arena, created empty on first use"""
+        if source_doc not in self.arenas:
+            self.arenas[source_doc] = TextArena(source_doc)
+        return self.arenas[source_doc]
+
+    def remove(self, source_doc: str):
+        self.arenas.pop(source_doc, None)
+
+    @property
+    def nbytes(self) -> int:
+        return 2 * sum(len(arena) for arena in self.arenas.values())
+
+    def save(self, directory: Path):
+        """Concatenate every arena into two files plus a (document -> offset, length) index"""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        index = {}
+        offset = 0
+        with open(directory / self.TEXT_FILE, "wb") as text_file, open(directory / self.LOWER_FILE, "wb") as lower_file:
+            for name, arena in self.arenas.items():
+                data, lower = arena.buffers()
+                text_file.write(data)
+                lower_file.write(lower)
+                index[name] = [offset, len(data)]
+                offset += len(data)
+
+        with open(directory / self.INDEX_FILE, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    @classmethod
+    def load(cls, directory: Path) -> "TextStore":
+        """Memory-map the arenas written by save()"""
+        directory = Path(directory)
+        with open(directory / cls.INDEX_FILE, "r", encoding="utf-8") as f:
+            index = json.load(f)
+
+        store = cls()
+        data = store._map(directory / cls.TEXT_FILE)
+        lower = store._map(directory / cls.LOWER_FILE)
+        for name, (offset, length) in index.items():
+            store.arenas[name] = TextArena(name, data[offset:offset + length], lower[offset:offset + length])
+        return store
+
+    def _map(self, path: Path) -> memoryview:
+        """Read-only memory map of a file (mmap cannot map an empty file)"""
+        with open(path, "rb") as f:
+            if not path.stat().st_size:
+                return memoryview(b"")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return memoryview(mapped)
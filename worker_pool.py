@@ -0,0 +1,80 @@
+"""
+Bounded Worker Pool
+Runs blocking search work off the event loop with a concurrency limit and
+a bounded wait queue
+"""
+
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolSaturated(Exception):
+    """Raised instead of queueing when the pool and its wait queue are full"""
+
+    def __init__(self, pool_name: str, retry_after: float):
+        super().__init__(f"{pool_name} pool is saturated, retry in {retry_after:g}s")
+        self.retry_after = retry_after
+
+
+class BoundedWorkerPool:
+    """Thread pool that sheds load instead of letting requests pile up
+
+    At most ``max_workers`` calls run at once and at most ``max_queue``
+    more wait for a thread. Any further call fails immediately with
+    ``WorkerPoolSaturated`` so the caller can answer 429 while the event
+    loop keeps serving other requests. Threads (rather than processes)
+    share the in-memory index; NumPy and the embedding model release the
+    GIL for the heavy parts. Calls run in a copy of the caller's context,
+    so context variables set by the request are visible in the worker.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 32, retry_after: float = 1.0, name: str = "search"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.name = name
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+        self._in_flight = 0  # running + waiting; only touched on the event loop thread
+
+        self.completed = 0
+        self.rejected = 0
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run func(*args, **kwargs) in the pool and await its result"""
+        if self._in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise WorkerPoolSaturated(self.name, self.retry_after)
+
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+
+        # Release the slot when the work finishes; shield so a cancelled request
+        # (client disconnect) does not free the slot while its thread is still busy
+        self._in_flight += 1
+        future.add_done_callback(self._release)
+        return await asyncio.shield(future)
+
+    def _release(self, _future):
+        self._in_flight -= 1
+        self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "queued": max(self._in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)